@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""Benchmark the cat-projects pipeline on a deterministic synthetic tree.
+
+The generator builds a tree of Python files with mixed sizes, nested
+packages, deep ignored directories (``node_modules``, ``.venv``, ``data``)
+and a sprinkling of files with syntax errors. Each phase of the pipeline -
+walk, read, summarise, join - is timed separately for every worker count and
+executor, plus an end-to-end ``write_snapshot`` run. Results are written as
+JSON and, given a baseline, compared phase by phase so regressions stand out.
+
+Examples::
+
+    python scripts/bench_cat_projects.py --files 10000 --output bench.json
+    python scripts/bench_cat_projects.py --files 10000 --baseline bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures as cf
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from pytools import cat_projects  # noqa: E402
+from pytools.cat_projects import (  # noqa: E402
+    DEFAULT_IGNORES,
+    iter_paths,
+    load_text,
+    summarise_python,
+    write_snapshot,
+)
+
+IGNORED_DIRS = ("node_modules", ".venv", "data")
+# "data" is not a default ignore; the synthetic tree relies on it being skipped.
+IGNORES = DEFAULT_IGNORES + ("data",)
+TREE_MARKER = ".bench-tree.json"
+
+
+def _python_source(rng: random.Random, n_defs: int, broken: bool) -> str:
+    lines = ['"""Synthetic module."""', "", "import os", ""]
+    for i in range(n_defs):
+        if rng.random() < 0.3:
+            lines += [f"class C{i}:", f'    """Class {i}."""', ""]
+            for j in range(rng.randint(1, 4)):
+                lines += [f"    def m{j}(self, x: int, y: str = 'a') -> int:", f'        """Method {j}."""', "        return x", ""]
+        else:
+            lines += [f"def f{i}(a, b=None, *args, **kwargs):", f'    """Function {i}."""', "    total = 0"]
+            lines += [f"    total += {k}  # step {k}" for k in range(rng.randint(1, 30))]
+            lines += ["    return total", ""]
+    if broken:
+        lines.append("def broken(:")
+    return "\n".join(lines) + "\n"
+
+
+def generate_tree(root: Path, n_files: int, seed: int = 0) -> Path:
+    """Create (or reuse) a deterministic synthetic tree of about n_files files.
+
+    Roughly 80% of files are snapshot candidates spread across nested
+    packages; the rest live under deeply nested ignored directories. About 1%
+    of candidates contain a syntax error. Sizes follow a long-tailed mix of
+    tiny, medium and large modules.
+    """
+    marker = root / TREE_MARKER
+    spec = {"files": n_files, "seed": seed}
+    if marker.exists() and json.loads(marker.read_text()) == spec:
+        return root
+
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    n_ignored = n_files // 5
+    for i in range(n_files - n_ignored):
+        depth = rng.randint(0, 5)
+        parts = [f"pkg{rng.randint(0, 9)}" for _ in range(depth)]
+        directory = root.joinpath("src", *parts)
+        directory.mkdir(parents=True, exist_ok=True)
+        n_defs = rng.choice((0, 1, 3, 8, 20, 60))
+        (directory / f"mod{i}.py").write_text(_python_source(rng, n_defs, rng.random() < 0.01))
+    for i in range(n_ignored):
+        ignored = rng.choice(IGNORED_DIRS)
+        parts = [f"d{rng.randint(0, 3)}" for _ in range(rng.randint(3, 8))]
+        directory = root.joinpath(ignored, *parts)
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"dep{i}.py").write_text("X = 1\n")
+    marker.write_text(json.dumps(spec))
+    return root
+
+
+def _summarise_safe(item: tuple[str, str]) -> str:
+    text, rel = item
+    try:
+        return summarise_python(text, rel)
+    except SyntaxError:
+        return text
+
+
+def _read(path: Path) -> str:
+    return load_text(path)[0]
+
+
+def _timed(fn: Callable[[], Any], repeat: int) -> tuple[float, Any]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _pool(executor: str, workers: int) -> cf.Executor:
+    if executor == "process":
+        return cf.ProcessPoolExecutor(max_workers=workers)
+    return cf.ThreadPoolExecutor(max_workers=workers)
+
+
+def run_benchmarks(
+    tree: Path, workers: list[int], executors: list[str], repeat: int
+) -> dict[str, dict[str, float]]:
+    """Return {case: {phase: seconds}} for every worker count and executor."""
+    results: dict[str, dict[str, float]] = {}
+
+    walk_s, files = _timed(lambda: list(iter_paths([tree], [".py"], IGNORES)), repeat)
+    rels = [str(p.relative_to(tree)) for p in files]
+    print(f"walk: {len(files)} files in {walk_s:.3f}s", file=sys.stderr)
+
+    for executor in executors:
+        for n in workers:
+            case = f"{executor}-w{n}"
+            with _pool(executor, n) as pool:
+                chunksize = 16 if executor == "process" else 1
+                read_s, texts = _timed(
+                    lambda pool=pool, chunksize=chunksize: list(pool.map(_read, files, chunksize=chunksize)),
+                    repeat,
+                )
+                items = list(zip(texts, rels, strict=True))
+                sum_s, _ = _timed(
+                    lambda pool=pool, items=items, chunksize=chunksize: list(
+                        pool.map(_summarise_safe, items, chunksize=chunksize)
+                    ),
+                    repeat,
+                )
+            blocks = [f"<{r}>\n{t}\n</{r}>" for r, t in zip(rels, texts, strict=True)]
+            join_s, _ = _timed(lambda blocks=blocks: "\n".join(blocks), repeat)
+
+            def _end_to_end(n: int = n, executor: str = executor) -> None:
+                cat_projects._SUMMARY_MEMO.clear()  # measure cold summarising
+                with open(os.devnull, "w", encoding="utf-8") as out:
+                    write_snapshot(
+                        out,
+                        [tree],
+                        prefix="",
+                        workers=n,
+                        executor=executor,
+                        summarise=True,
+                        ignore_patterns=IGNORES,
+                    )
+
+            e2e_s, _ = _timed(_end_to_end, repeat)
+            results[case] = {
+                "walk": walk_s,
+                "read": read_s,
+                "summarise": sum_s,
+                "join": join_s,
+                "snapshot": e2e_s,
+            }
+            print(
+                f"{case}: read {read_s:.3f}s  summarise {sum_s:.3f}s  "
+                f"join {join_s:.3f}s  snapshot {e2e_s:.3f}s",
+                file=sys.stderr,
+            )
+    return results
+
+
+def compare(
+    current: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]], threshold: float
+) -> list[str]:
+    """Print a phase-by-phase comparison and return the regressed entries."""
+    regressions: list[str] = []
+    print(f"{'case':<16}{'phase':<12}{'baseline':>10}{'current':>10}{'ratio':>8}")
+    for case, phases in sorted(current.items()):
+        for phase, seconds in phases.items():
+            base = baseline.get(case, {}).get(phase)
+            if base is None:
+                continue
+            ratio = seconds / base if base else float("inf")
+            flag = ""
+            if ratio > 1 + threshold:
+                flag = "  REGRESSION"
+                regressions.append(f"{case}/{phase}")
+            print(f"{case:<16}{phase:<12}{base:>10.3f}{seconds:>10.3f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=10_000, help="Synthetic tree size (default: 10000).")
+    parser.add_argument("--seed", type=int, default=0, help="Generator seed (default: 0).")
+    parser.add_argument(
+        "--tree",
+        type=Path,
+        help="Directory for the synthetic tree (default: .bench/tree-FILES-SEED).",
+    )
+    parser.add_argument("--workers", default="1,4,8", help="Comma-separated worker counts.")
+    parser.add_argument("--executors", default="thread,process", help="Comma-separated executors.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per phase; the best is kept.")
+    parser.add_argument("--output", type=Path, help="Write results JSON here.")
+    parser.add_argument("--baseline", type=Path, help="Compare against a previous results JSON.")
+    parser.add_argument(
+        "--threshold", type=float, default=0.10, help="Allowed slowdown before flagging (default: 0.10)."
+    )
+    args = parser.parse_args()
+
+    try:
+        from loguru import logger
+
+        logger.remove()
+        logger.add(sys.stderr, level="ERROR")
+    except ImportError:
+        pass
+
+    tree = args.tree or ROOT / ".bench" / f"tree-{args.files}-{args.seed}"
+    start = time.perf_counter()
+    generate_tree(tree, args.files, args.seed)
+    print(f"tree ready at {tree} ({time.perf_counter() - start:.1f}s)", file=sys.stderr)
+
+    results = run_benchmarks(
+        tree,
+        [int(w) for w in args.workers.split(",") if w],
+        [e for e in args.executors.split(",") if e],
+        args.repeat,
+    )
+    report = {
+        "files": args.files,
+        "seed": args.seed,
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"wrote {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
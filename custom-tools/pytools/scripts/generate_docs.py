@@ -35,6 +35,10 @@ def generate_cli_docs():
         md.append(f"\n**Safety:** `{tool.safety}`\n")
         md.append(f"\n**Tags:** {', '.join(sorted(tool.tags))}\n")
 
+        notes = get_notes(tool.name)
+        if notes:
+            md.append(f"\n**Notes:**\n{notes}\n")
+
         # Add examples based on tool name
         examples = get_examples(tool.name)
         if examples:
@@ -48,7 +52,7 @@ def generate_cli_docs():
 def get_examples(tool_name: str) -> str:
     """Get example usage for a tool."""
     examples_map = {
-    "cat-projects": "# Snapshot Python project\npytools run cat-projects src/ --extensions .py\n\n# With AI summarization\npytools run cat-projects . --summarize",
+    "cat-projects": "# Snapshot Python project\npytools run cat-projects src/ --extensions .py\n\n# With AI summarization\npytools run cat-projects . --summarize\n\n# Index symbols, then look up a definition\npytools run cat-projects index src/\npytools run cat-projects query --defs Store\n\n# Compare two snapshots\npytools run cat-projects diff old.txt new.txt\n\n# Snapshot a directory named index\npytools run cat-projects ./index",
         "pyinit": "# Create a new project\npytools run pyinit my-project\n\n# With virtual environment\npytools run pyinit my-project --venv",
         "organize-downloads": "# Preview organization\npytools run organize-downloads --dry-run\n\n# Organize by modified date\npytools run organize-downloads --by modified --yes\n\n# Organize only PDFs\npytools run organize-downloads --pattern '*.pdf'",
         "print-ipv4": "pytools run print-ipv4",
@@ -66,6 +70,26 @@ def get_examples(tool_name: str) -> str:
     return examples_map.get(tool_name, "")
 
 
+def get_notes(tool_name: str) -> str:
+    """Get defaults and subcommands worth knowing for a tool."""
+    notes_map = {
+        "cat-projects": "\n".join(
+            [
+                "- Rendered blocks are cached on disk under `~/.cache/pytools` (or `$PYTOOLS_CACHE_DIR`) by default; `--no-cache` turns the cache off.",
+                "- `.gitignore` and `.ignore` rules are honoured; `--no-gitignore` turns this off.",
+                "- Identical files of 256 bytes or more are emitted once, and later copies reference the first; `--no-dedupe` emits every copy in full.",
+                "- Files larger than 1 MB are cut to head/tail excerpts; `--max-file-bytes N` changes the cap and `0` disables it.",
+                "- JSON/JSONL/CSV files of 64 KB or more are emitted as their first 5 records with an inferred schema, and notebooks as their cell sources without outputs; `--sample-rows 0` emits them in full.",
+                "- `cat-projects index [paths...]` builds or updates the symbol index of Python files.",
+                "- `cat-projects query (--defs NAME | --refs NAME) [paths...]` looks up definitions or references in that index.",
+                "- `cat-projects diff OLD NEW` emits only the blocks added or modified between two snapshots.",
+                "- A first argument of `index`, `query` or `diff` is always read as a subcommand, so snapshot a directory with one of those names as `./index`, `./query` or `./diff`.",
+            ]
+        ),
+    }
+    return notes_map.get(tool_name, "")
+
+
 if __name__ == "__main__":
     docs = generate_cli_docs()
     output_path = "docs/CLI.md"
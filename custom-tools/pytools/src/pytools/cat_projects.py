@@ -9,10 +9,22 @@ of the codebase, suitable for ingestion by LLMs or diff tools.
 import argparse
 import ast
 import concurrent.futures as cf
+import csv
+import hashlib
+import io
+import itertools
+import mmap
+import os
 import re
+import sqlite3
 import sys
+import time
+import tokenize
+from collections import Counter, deque
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from dataclasses import replace
 from pathlib import Path
-from typing import Iterable, List, Sequence, Tuple
+from typing import Any, NamedTuple, TextIO
 
 try:
     from loguru import logger
@@ -22,14 +34,97 @@ except ImportError:
     logger = logging.getLogger(__name__)
     logging.basicConfig(level=logging.INFO)
 
+from .snapshot import BlockCache, FileIndex
+from .snapshot.archive import ArchiveError, is_virtual_root, iter_virtual_root
+from .snapshot.budget import (
+    Candidate,
+    ImportRef,
+    estimate_tokens,
+    module_name,
+    pack,
+    python_imports,
+    score_candidates,
+)
+from .snapshot.clip import SNIFF_BYTES, Clipped, content_size
+from .snapshot.closure import EdgeCache, import_closure
+from .snapshot.diff import DiffSummary, block_hash, diff_snapshots, snapshot_hashes
+from .snapshot.gitsrc import (
+    Change,
+    GitBlobReader,
+    GitError,
+    changed_files,
+    git_toplevel,
+)
+from .snapshot.manifest import Manifest, manifest_path
+from .snapshot.minify import minify_python
+from .snapshot.neardup import NearDuplicateIndex
+from .snapshot.output import compression_for, open_output, zstd_available
+from .snapshot.profile import SnapshotProfile
+from .snapshot.samplers import SAMPLE_ROWS, sampler_for
+from .snapshot.search import SearchIndex, scan_terms
+from .snapshot.selectors import (
+    SEPARATOR,
+    PositionCache,
+    SelectorError,
+    extract,
+    parse_selector,
+)
+from .snapshot.shard import ShardWriter, shard_index_path
+from .snapshot.summarisers import register_summariser, summariser_for
+from .snapshot.symbols import SymbolIndex, scan_file
+from .snapshot.walk import IgnoreMatcher, file_filter, walk_files, walk_order
+from .snapshot.watch import SnapshotDaemon
 
 # Configuration
-DEFAULT_EXTS: Tuple[str, ...] = (".py",)
-DEFAULT_IGNORES: Tuple[str, ...] = (
+DEFAULT_EXTS: tuple[str, ...] = (".py",)
+DEFAULT_IGNORES: tuple[str, ...] = (
     ".venv", "venv", "__pycache__", ".git", ".mypy_cache",
     ".FOLDER", "node_modules", "demo", "legacy",
 )
 MAX_LINE_LEN = 120
+MINIFY_EXTS: tuple[str, ...] = (".py", ".pyi")
+EXECUTORS: tuple[str, ...] = ("thread", "process", "auto")
+PROCESS_CHUNKSIZE = 16
+
+# Files smaller than this are never replaced by duplicate references.
+DEDUPE_MIN_BYTES = 256
+SUMMARY_MEMO_SIZE = 4096
+DEFAULT_MAX_FILE_BYTES = 1_000_000
+
+# (path, relpath, preloaded content or None to read from disk)
+Source = tuple[Path, Path, bytes | None]
+
+
+class Rendered(NamedTuple):
+    """Body produced for one file, the mode actually used and any read note."""
+
+    body: str
+    mode: str = "raw"  # raw, summary, minified or sample
+    note: str | None = None  # binary, truncated, error
+    digest: str | None = None  # sha1 of the full source content
+    source_len: int = 0  # characters of source text read
+    read_s: float = 0.0
+    summarise_s: float = 0.0
+
+
+class Entry(NamedTuple):
+    """One block of snapshot output before it is framed in <relpath> tags."""
+
+    rel: str
+    body: str
+    mode: str  # raw, summary, minified, sample, symbols, duplicate, near-duplicate, or meta
+
+
+class Job(NamedTuple):
+    """Unit of work shipped to snapshot workers."""
+
+    path: Path
+    rel: Path
+    summarise: bool
+    data: bytes | None = None
+    max_bytes: int | None = None
+    minify: bool = False
+    sample_rows: int = SAMPLE_ROWS
 
 # Copilot prompt framework
 PROMPT = """
@@ -127,40 +222,116 @@ def iter_paths(
     root_paths: Sequence[Path],
     exts: Sequence[str],
     ignore_patterns: Sequence[str] = DEFAULT_IGNORES,
+    use_gitignore: bool = True,
+    on_dir: Callable[[str], None] | None = None,
+    walk_workers: int = 0,
 ) -> Iterable[Path]:
     """Yield files under root_paths whose suffix is in exts and whose path
-    does not contain any string in ignore_patterns."""
+    does not contain any string in ignore_patterns.
+
+    Ignored directories are pruned before they are listed, and .gitignore /
+    .ignore rules are honoured unless use_gitignore is False. on_dir is
+    called with every directory listed. walk_workers > 0 lists directories
+    on that many threads (for network file systems); order is unchanged.
+    """
+    return walk_files(
+        root_paths,
+        exts,
+        ignore_patterns,
+        use_ignore_files=use_gitignore,
+        on_dir=on_dir,
+        workers=walk_workers,
+    )
 
-    exts_set = {e.lower() for e in exts}
-    ignore_patterns_set = {p for p in ignore_patterns}
 
-    def _should_ignore(p: Path) -> bool:
-        return any(pat in str(p) for pat in ignore_patterns_set)
+def _decode(data: bytes) -> str:
+    """Decode UTF-8 with replacement and universal‑newline handling."""
+    return data.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
 
-    for root in root_paths:
-        if _should_ignore(root):
-            continue
-        if root.is_file() and root.suffix.lower() in exts_set:
-            yield root
-            continue
 
-        for file in root.rglob("*"):
-            if not file.is_file():
-                continue
-            if file.suffix.lower() not in exts_set:
-                continue
-            if _should_ignore(file):
-                continue
-            yield file
+def _excerpt(buf: Any, size: int, max_bytes: int) -> str:
+    """Return head and tail excerpts of buf (bytes or mmap) cut at line breaks."""
+    half = max_bytes // 2
+    return _join_excerpt(bytes(buf[:half]), bytes(buf[size - half:]), size)
 
 
-def read_text(path: Path) -> str:
-    """Return file content with universal‑newline handling."""
+def _join_excerpt(head: bytes, tail: bytes, size: int) -> str:
+    head = head[: head.rfind(b"\n") + 1] or head
+    tail = tail[tail.find(b"\n") + 1:] or tail
+    omitted = size - len(head) - len(tail)
+    return f"{_decode(head)}… [{omitted} bytes omitted] …\n{_decode(tail)}"
+
+
+def _load_source(
+    path: Path | None, data: bytes | None, max_bytes: int | None
+) -> tuple[str, str | None, str | None]:
+    """Return (text, note, digest) for path, or for data when it is given.
+
+    digest is the sha1 of the complete content, or None when the content was
+    skipped or only sampled.
+    """
+    if data is not None:
+        if b"\0" in data[:SNIFF_BYTES]:
+            return "", "binary", None
+        if isinstance(data, Clipped):
+            return _join_excerpt(data.head_bytes, data.tail_bytes, data.size), "truncated", None
+        if max_bytes and len(data) > max_bytes:
+            return _excerpt(data, len(data), max_bytes), "truncated", None
+        return _decode(data), None, hashlib.sha1(data).hexdigest()
+
     try:
-        return path.read_text(encoding="utf‑8", errors="replace")
+        with open(path, "rb") as f:  # type: ignore[arg-type]
+            size = os.fstat(f.fileno()).st_size
+            head = f.read(SNIFF_BYTES)
+            if b"\0" in head:
+                return "", "binary", None
+            if not max_bytes or size <= max_bytes:
+                data = head + f.read()
+                return _decode(data), None, hashlib.sha1(data).hexdigest()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return _excerpt(mm, len(mm), max_bytes), "truncated", None
     except Exception:
         logger.warning(f"Failed reading {path}")
-        return ""
+        return "", "error", None
+
+
+def _sample_source(path: Path, data: bytes | None, rows: int, max_bytes: int | None) -> str | None:
+    """Return the head/schema sample of a large data file or notebook, else None."""
+    try:
+        size = content_size(data) if data is not None else path.stat().st_size
+        sampler = sampler_for(path.suffix, size, max_bytes)
+        if sampler is None:
+            return None
+        if isinstance(data, Clipped):
+            data = data.head_bytes
+        with io.BytesIO(data) if data is not None else open(path, "rb") as f:
+            return sampler(f, size, rows)
+    except (OSError, ValueError, csv.Error, RecursionError):
+        logger.warning(f"Could not sample {path}, emitting it as text")
+        return None
+
+
+def text_from_bytes(data: bytes, max_bytes: int | None = None) -> tuple[str, str | None]:
+    """Return (text, note) for in-memory content; see load_text."""
+    text, note, _ = _load_source(None, data, max_bytes)
+    return text, note
+
+
+def load_text(path: Path, max_bytes: int | None = None) -> tuple[str, str | None]:
+    """Return (text, note) for path.
+
+    note is "binary" when a NUL byte appears in the first SNIFF_BYTES (text is
+    then empty), "truncated" when the file exceeds max_bytes and only head and
+    tail excerpts are returned, "error" when the file cannot be read, or None.
+    Oversized files are sampled through mmap without being fully loaded.
+    """
+    text, note, _ = _load_source(path, None, max_bytes)
+    return text, note
+
+
+def read_text(path: Path) -> str:
+    """Return file content with universal‑newline handling ("" for binaries)."""
+    return load_text(path)[0]
 
 
 def _truncate(text: str, limit: int = MAX_LINE_LEN) -> str:
@@ -205,7 +376,20 @@ def _params_returns(node) -> str:
 
 def summarise_python(code: str, path: str) -> str:
     """Return structured summary of code or raise on syntax error."""
-    tree = ast.parse(code, filename=path)
+    return _summarise_tree(ast.parse(code, filename=path))
+
+
+def _summarise_python_source(code: str, path: str) -> str | None:
+    """Registry adapter: leave files without class/def raw."""
+    if re.search(r"\b(class|def)\b", code) is None:
+        return None
+    return summarise_python(code, path)
+
+
+register_summariser((".py", ".pyi"), _summarise_python_source)
+
+
+def _summarise_tree(tree: ast.Module) -> str:
     lines: list[str] = []
 
     for node in tree.body:
@@ -226,25 +410,984 @@ def summarise_python(code: str, path: str) -> str:
     return "\n".join(lines)
 
 
-def file_to_block(path: Path, root: Path, summarise: bool) -> str:
-    """Return <relpath>\ncontent\n</relpath> block for path."""
+def render_body(
+    path: Path,
+    rel: Path,
+    summarise: bool,
+    data: bytes | None = None,
+    max_bytes: int | None = None,
+    minify: bool = False,
+    sample_rows: int = SAMPLE_ROWS,
+) -> Rendered:
+    """Return the body emitted for path, the mode used, any load_text note,
+    the content digest and read/summarise timings.
+
+    data, when given, is used instead of reading path (e.g. content from git).
+    Files are summarised by the summariser registered for their extension
+    (see snapshot.summarisers); other files are emitted raw. Summaries are
+    memoised per process by extension and digest, so identical files are only
+    parsed once. With minify, Python files that are emitted in full lose their
+    comments, docstrings and blank lines (see snapshot.minify).
+
+    With sample_rows > 0, large JSON/JSONL/CSV files are replaced by their
+    first sample_rows records and an inferred schema, and notebooks by their
+    cell sources; these files are not read past the sample (see
+    snapshot.samplers).
+    """
+    start = time.perf_counter()
+    sample = _sample_source(path, data, sample_rows, max_bytes) if sample_rows else None
+    if sample is not None:
+        read_s = time.perf_counter() - start
+        return Rendered(sample, "sample", None, None, len(sample), read_s)
+    text, note, digest = _load_source(path, data, max_bytes)
+    read_s = time.perf_counter() - start
+    body, mode = _render_text(path, rel, text, note, digest, summarise, minify)
+    summarise_s = time.perf_counter() - start - read_s
+    return Rendered(body, mode, note, digest, len(text), read_s, summarise_s)
+
+
+def _render_text(
+    path: Path,
+    rel: Path,
+    text: str,
+    note: str | None,
+    digest: str | None,
+    summarise: bool,
+    minify: bool,
+) -> tuple[str, str]:
+    """Return (body, mode) for text loaded by _load_source; see render_body."""
+    body, mode = text, "raw"
+    summariser = summariser_for(path) if summarise and note is None else None
+    if summariser is not None:
+        key = f"{path.suffix.lower()}:{digest}"
+        if key in _SUMMARY_MEMO:
+            body, mode = _SUMMARY_MEMO[key], "summary"
+        else:
+            try:
+                summary = summariser(text, str(rel))
+            except SyntaxError:
+                logger.warning(f"SyntaxError in {rel}, falling back to raw")
+            else:
+                if summary is not None:
+                    body, mode = summary, "summary"
+                    if digest is not None:
+                        if len(_SUMMARY_MEMO) >= SUMMARY_MEMO_SIZE:
+                            _SUMMARY_MEMO.clear()
+                        _SUMMARY_MEMO[key] = body
+    if minify and mode == "raw" and note is None and path.suffix.lower() in MINIFY_EXTS:
+        body, mode = _minify_or_raw(text, rel), "minified"
+    return body, mode
+
+
+_SUMMARY_MEMO: dict[str, str] = {}
+
+
+def _minify_or_raw(text: str, rel: Path) -> str:
     try:
-        rel = path.relative_to(root)
-        text = read_text(path)
+        return minify_python(text)
+    except (tokenize.TokenError, SyntaxError):
+        logger.warning(f"Could not tokenize {rel}, emitting it unminified")
+        return text
+
+
+def _format_block(rel: Path, body: str) -> str:
+    return f"<{rel}>\n{body}\n</{rel}>"
 
-        if summarise:
-            has_defs = re.search(r"\b(class|def)\b", text) is not None
-            if has_defs:
-                try:
-                    text = summarise_python(text, str(rel))
-                except SyntaxError:
-                    logger.warning(f"SyntaxError in {rel}, falling back to raw")
 
-        return f"<{rel}>\n{text}\n</{rel}>"
+def file_to_block(path: Path, root: Path, summarise: bool, minify: bool = False) -> str:
+    """Return <relpath>\ncontent\n</relpath> block for path.
+
+    The body is the file's summary, its minified source or its raw text.
+    """
+    try:
+        rel = path.relative_to(root)
+        return _format_block(rel, render_body(path, rel, summarise, minify=minify).body)
     except Exception:
         return ""
 
 
+def _render_job(job: Job) -> Rendered:
+    try:
+        return render_body(
+            job.path, job.rel, job.summarise, job.data, job.max_bytes, job.minify, job.sample_rows
+        )
+    except Exception:
+        return Rendered("", "raw", "error", None)
+
+
+def _render_chunk(jobs: list[Job]) -> list[Rendered]:
+    return [_render_job(job) for job in jobs]
+
+
+def _resolve_executor(executor: str, cpu_bound: bool) -> str:
+    """Map 'auto' to processes for CPU-bound rendering (summarising, minifying),
+    threads for raw reads."""
+    if executor not in EXECUTORS:
+        raise ValueError(f"executor must be one of {', '.join(EXECUTORS)}, got {executor!r}")
+    if executor == "auto":
+        return "process" if cpu_bound else "thread"
+    return executor
+
+
+def _log_skipped(notes: dict[str, list[Path]], over_budget: int) -> None:
+    """Log a summary of files that were skipped or cut short."""
+    labels = {"binary": "skipped (binary)", "error": "skipped (unreadable)", "truncated": "truncated"}
+    for note, label in labels.items():
+        rels = notes.get(note, [])
+        if rels:
+            shown = ", ".join(str(r) for r in rels[:10])
+            more = f" … and {len(rels) - 10} more" if len(rels) > 10 else ""
+            logger.warning(f"{len(rels)} files {label}: {shown}{more}")
+    if over_budget:
+        logger.warning(f"{over_budget} files skipped after reaching the total byte cap")
+
+
+def _make_pool(kind: str, workers: int) -> cf.Executor:
+    if kind == "process":
+        return cf.ProcessPoolExecutor(max_workers=workers)
+    return cf.ThreadPoolExecutor(max_workers=workers)
+
+
+def _iter_sources(
+    roots: Sequence[Path],
+    exts: Sequence[str],
+    ignore_patterns: Sequence[str],
+    use_gitignore: bool,
+    on_dir: Callable[[str], None] | None = None,
+    walk_workers: int = 0,
+) -> Iterator[Source]:
+    """Yield (path, relpath, None) for every file to snapshot, in walk order."""
+    roots = [p.resolve() for p in roots]
+
+    # Always include .github/copilot-instructions.md if it exists
+    copilot_path = Path(".github/copilot-instructions.md").resolve()
+    walked = iter_paths(
+        roots,
+        exts,
+        ignore_patterns=ignore_patterns,
+        use_gitignore=use_gitignore,
+        on_dir=on_dir,
+        walk_workers=walk_workers,
+    )
+    files: Iterable[Path] = (p for p in walked if p != copilot_path)
+    if copilot_path.exists():
+        files = itertools.chain([copilot_path], files)
+
+    def _root_for(p: Path) -> Path:
+        # If copilot-instructions, use project root as base
+        if p == copilot_path:
+            return copilot_path.parent.parent.parent if copilot_path.parent.name == 'github' else roots[0]
+        return next(r for r in roots if r in p.parents or r == p)
+
+    for p in files:
+        try:
+            yield p, p.relative_to(_root_for(p)), None
+        except Exception:
+            continue
+
+
+def _virtual_sources(
+    specs: Sequence[str],
+    exts: Sequence[str],
+    ignore_patterns: Sequence[str],
+    max_bytes: int | None = None,
+) -> Iterator[Source]:
+    """Yield (spec/relpath, relpath, content) for git revision and archive roots.
+
+    Content larger than max_bytes is Clipped to its head and tail while reading.
+    """
+    exts_set = {e.lower() for e in exts}
+    ignored = IgnoreMatcher(ignore_patterns)
+
+    def _keep(rel: str) -> bool:
+        return os.path.splitext(rel)[1].lower() in exts_set and not ignored(rel)
+
+    for spec in specs:
+        for rel, data in iter_virtual_root(spec, _keep, max_bytes):
+            yield Path(spec) / rel, Path(rel), data
+
+
+def _root_sources(
+    roots: Sequence[Path],
+    exts: Sequence[str],
+    ignore_patterns: Sequence[str],
+    use_gitignore: bool,
+    walk_workers: int = 0,
+    max_bytes: int | None = None,
+) -> Iterator[Source]:
+    """Yield sources for directory roots (walked) followed by git/archive roots."""
+    local = [r for r in roots if not is_virtual_root(str(r))]
+    virtual = [str(r) for r in roots if is_virtual_root(str(r))]
+    if local:
+        yield from _iter_sources(local, exts, ignore_patterns, use_gitignore, walk_workers=walk_workers)
+    if virtual:
+        yield from _virtual_sources(virtual, exts, ignore_patterns, max_bytes)
+
+
+def _selected_entries(selectors: Sequence[str], cache: PositionCache | None) -> Iterator[Entry]:
+    """Yield one entry per ``path::pattern`` selector with the matching symbols' source."""
+    for arg in selectors:
+        parsed = parse_selector(arg)
+        if parsed is None:
+            raise SelectorError(f"{arg} is not a path::symbol selector")
+        path, pattern = parsed
+        # Tags must not start with "/": show absolute paths relative to the cwd
+        # or, outside it, without their anchor.
+        rel = Path(path)
+        if rel.is_absolute():
+            try:
+                rel = rel.relative_to(Path.cwd())
+            except ValueError:
+                rel = rel.relative_to(rel.anchor)
+        body = extract(Path(path), pattern, cache)
+        yield Entry(f"{rel.as_posix()}{SEPARATOR}{pattern}", body, "symbols")
+
+
+def _sync_file_index(
+    index: FileIndex,
+    files: Sequence[tuple[Path, tuple[Any, ...]]],
+    roots: Sequence[Path],
+    scan: Callable[..., Any],
+    store: Callable[[Path, os.stat_result, tuple[Any, ...], Any], None],
+    workers: int,
+    executor: str,
+) -> tuple[int, int, int]:
+    """Bring index up to date for files, given as (path, extra scan arguments).
+
+    Files whose size or mtime changed are scanned with scan(path, *args) in a
+    worker pool and stored with store(path, stat, args, result); indexed
+    files under roots that are not in files are dropped. Returns (files seen,
+    files re-indexed, files removed).
+    """
+    stale: list[tuple[Path, os.stat_result, tuple[Any, ...]]] = []
+    seen = set()
+    for p, args in files:
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        seen.add(p)
+        if not index.is_fresh(p, st):
+            stale.append((p, st, args))
+
+    kind = _resolve_executor(executor, cpu_bound=True)
+    chunksize = PROCESS_CHUNKSIZE if kind == "process" else 1
+    if stale:
+        with _make_pool(kind, workers) as pool:
+            calls = zip(*[(p, *args) for p, _, args in stale], strict=True)
+            for (p, st, args), result in zip(stale, pool.map(scan, *calls, chunksize=chunksize), strict=True):
+                store(p, st, args, result)
+
+    removed = [p for root in roots for p in index.indexed_under(root) if p not in seen]
+    index.remove(removed)
+    return len(seen), len(stale), len(removed)
+
+
+def update_search_index(
+    files: Sequence[Path],
+    roots: Sequence[Path],
+    index: SearchIndex,
+    *,
+    workers: int = 8,
+    executor: str = "auto",
+) -> tuple[int, int]:
+    """Re-scan the files whose size or mtime changed and drop indexed files
+    under roots that are no longer in files. Returns (re-indexed, removed)."""
+
+    def _store(p: Path, st: os.stat_result, _: tuple[Any, ...], counts: Counter[str] | None) -> None:
+        index.replace(p, st, counts if counts is not None else Counter())
+
+    _, updated, removed = _sync_file_index(
+        index, [(p, ()) for p in files], roots, scan_terms, _store, workers, executor
+    )
+    return updated, removed
+
+
+def _query_sources(
+    roots: Sequence[Path],
+    exts: Sequence[str],
+    ignore_patterns: Sequence[str],
+    use_gitignore: bool,
+    query: str,
+    top: int,
+    index: SearchIndex,
+    workers: int,
+    walk_workers: int = 0,
+) -> tuple[list[tuple[float, Path]], Iterator[Source]]:
+    """Return (scores, sources) for the top files ranked by BM25 against query.
+
+    The search index is brought up to date for the walked files first, so
+    only changed files are read.
+    """
+    walked = {
+        p: rel
+        for p, rel, _ in _iter_sources(roots, exts, ignore_patterns, use_gitignore, walk_workers=walk_workers)
+    }
+    resolved = [r.resolve() for r in roots]
+    try:
+        updated, removed = update_search_index(list(walked), resolved, index, workers=workers)
+        ranking = index.rank(query, resolved)
+    except sqlite3.OperationalError as exc:
+        logger.warning(f"search index unavailable ({exc}), ranking in memory")
+        with SearchIndex(Path(":memory:")) as memory:
+            updated, removed = update_search_index(list(walked), resolved, memory, workers=workers)
+            ranking = memory.rank(query, resolved)
+    logger.info(f"search index: {updated} file(s) re-indexed, {removed} removed")
+
+    ranked = [(score, p) for score, p in ranking if p in walked][:top]
+    scores = [(score, walked[p]) for score, p in ranked]
+    return scores, iter([(p, walked[p], None) for _, p in ranked])
+
+
+def _ranking_entry(query: str, scores: list[tuple[float, Path]]) -> Entry:
+    lines = [f"query: {query}"] + [f"{score:.3f} {rel}" for score, rel in scores]
+    return Entry("query-results", "\n".join(lines), "meta")
+
+
+def _git_sources(
+    roots: Sequence[Path],
+    exts: Sequence[str],
+    ignore_patterns: Sequence[str],
+    since: str | None,
+    staged: bool,
+    max_bytes: int | None = None,
+) -> tuple[list[tuple[Path, Change]], Iterator[Source]]:
+    """Return (changes, sources) for files changed since a revision.
+
+    changes pairs each matching change with its path relative to its root;
+    the old path of a rename or copy is made relative to that root as well.
+    Staged content is read from the index via ``git cat-file --batch``;
+    otherwise files are read from the working tree.
+    """
+    roots = [p.resolve() for p in roots]
+    exts_set = {e.lower() for e in exts}
+    ignored = IgnoreMatcher(ignore_patterns)
+    toplevels = {root: git_toplevel(root) for root in roots}
+    diffs = {top: changed_files(top, since, staged) for top in set(toplevels.values())}
+
+    matched: list[tuple[Path, Path, Change]] = []
+    for root, top in toplevels.items():
+        for change in diffs[top]:
+            path = top / change.path
+            if root != path and root not in path.parents:
+                continue
+            if path.suffix.lower() not in exts_set or ignored(str(path)):
+                continue
+            matched.append((top, path, change))
+
+    def _root_for(p: Path) -> Path:
+        return next(r for r in roots if r in p.parents or r == p)
+
+    def _relative(top: Path, p: Path, change: Change) -> tuple[Path, Change]:
+        root = _root_for(p)
+        if change.old_path:
+            old = Path(os.path.relpath(top / change.old_path, root)).as_posix()
+            change = Change(change.status, change.path, old)
+        return p.relative_to(root), change
+
+    changes = [_relative(top, p, change) for top, p, change in matched]
+
+    def _sources() -> Iterator[Source]:
+        readers: dict[Path, GitBlobReader] = {}
+        try:
+            for top, p, change in matched:
+                if change.status == "D":
+                    continue
+                rel = p.relative_to(_root_for(p))
+                if not staged:
+                    yield p, rel, None
+                    continue
+                if top not in readers:
+                    readers[top] = GitBlobReader(top)
+                data = readers[top].read(f":{change.path}", max_bytes)
+                if data is not None:
+                    yield p, rel, data
+        finally:
+            for reader in readers.values():
+                reader.close()
+
+    return changes, _sources()
+
+
+def _closure_sources(
+    roots: Sequence[Path],
+    entries: Sequence[Path],
+    ignore_patterns: Sequence[str],
+    use_gitignore: bool,
+    import_cache: EdgeCache | None,
+) -> Iterator[Source]:
+    """Yield the Python files reachable from entries, in dependency order."""
+    files = [
+        (p, rel)
+        for p, rel, _ in _iter_sources(roots, (".py",), ignore_patterns, use_gitignore)
+        if p.suffix == ".py"
+    ]
+    closure = import_closure([e.resolve() for e in entries], files, import_cache)
+    logger.info(f"import closure: {len(closure)} of {len(files)} files reachable")
+    for p, rel in closure:
+        yield p, rel, None
+
+
+def _changes_entry(changes: Sequence[tuple[Path, Change]], since: str | None, staged: bool) -> Entry:
+    what = "index" if staged else "working tree"
+    lines = [f"{what} vs {since or 'HEAD'}"]
+    lines += [Change(c.status, str(rel), c.old_path).describe() for rel, c in changes]
+    return Entry("git-changes", "\n".join(lines), "meta")
+
+
+def _content_digest(path: Path, data: bytes | None) -> str | None:
+    """Return the sha1 _load_source reports for a text file, None for binaries."""
+    try:
+        if data is None:
+            data = path.read_bytes()
+    except OSError:
+        return None
+    if b"\0" in data[:SNIFF_BYTES]:
+        return None
+    return hashlib.sha1(data).hexdigest()
+
+
+class _PreRenderDedupe:
+    """Spots exact duplicates before they are rendered.
+
+    Content that is already in memory (git and archive roots) is hashed
+    straight away and only its digest is kept. Files on disk are hashed only
+    once a second file of the same size shows up (the first one with it), so
+    unique files are not read an extra time. Files that would be excerpted or
+    sampled are left alone, as their rendered digest is None and iter_entries
+    never dedupes them either.
+    """
+
+    def __init__(self, max_file_bytes: int | None, sample_rows: int) -> None:
+        self.max_file_bytes = max_file_bytes
+        self.sample_rows = sample_rows
+        # size -> first file on disk of that size, None once files of that size are hashed
+        self._first_of_size: dict[int, tuple[Path, str] | None] = {}
+        self._first_of_digest: dict[str, str] = {}
+
+    def check(self, path: Path, rel: Path, data: bytes | None) -> str | None:
+        """Return the relpath of an earlier file with the same content, else None."""
+        try:
+            size = content_size(data) if data is not None else path.stat().st_size
+        except OSError:
+            return None
+        if (
+            size < DEDUPE_MIN_BYTES
+            or (self.max_file_bytes and size > self.max_file_bytes)
+            or (self.sample_rows and sampler_for(path.suffix, size, self.max_file_bytes) is not None)
+        ):
+            return None
+        if data is None and size not in self._first_of_size:
+            self._first_of_size[size] = (path, str(rel))
+            return None
+        first = self._first_of_size.get(size)
+        self._first_of_size[size] = None
+        if first is not None:
+            digest = _content_digest(first[0], None)
+            if digest is not None:
+                self._first_of_digest.setdefault(digest, first[1])
+        digest = _content_digest(path, data)
+        if digest is None:
+            return None
+        earlier = self._first_of_digest.setdefault(digest, str(rel))
+        return earlier if earlier != str(rel) else None
+
+
+BudgetResult = tuple[str, str | None, list[ImportRef], float, str, str | None]
+
+
+def _budget_job(job: Job) -> BudgetResult:
+    """Return (full, summary, imports, mtime, mode of full, load_text note) for a
+    budget candidate; full is empty for binary and unreadable files.
+
+    full is rendered as render_body would render it; summary is the file's
+    summary whether or not the job summarises.
+    """
+    try:
+        return _budget_candidate(job)
+    except Exception:
+        return "", None, [], 0.0, "raw", "error"
+
+
+def _budget_candidate(job: Job) -> BudgetResult:
+    path, rel = job.path, job.rel
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        mtime = 0.0
+    sample = (
+        _sample_source(path, job.data, job.sample_rows, job.max_bytes) if job.sample_rows else None
+    )
+    if sample is not None:
+        return sample, None, [], mtime, "sample", None
+    text, note, digest = _load_source(path, job.data, job.max_bytes)
+    if note is not None:
+        return text, None, [], mtime, "raw", note
+    full, full_mode = _render_text(path, rel, text, note, digest, job.summarise, job.minify)
+    if full_mode == "summary":
+        summary: str | None = full
+    elif job.summarise:
+        summary = None  # no summariser, or it failed
+    else:
+        body, mode = _render_text(path, rel, text, note, digest, True, False)
+        summary = body if mode == "summary" else None
+    imports: list[ImportRef] = []
+    if path.suffix.lower() == ".py":
+        try:
+            imports = python_imports(ast.parse(text, filename=str(rel)))
+        except (SyntaxError, ValueError):
+            pass
+    return full, summary, imports, mtime, full_mode, None
+
+
+# (representative rel, own candidate, own mode) of a duplicate or near-duplicate
+_Reference = tuple[str, Candidate, str]
+
+
+def _pack_with_references(
+    candidates: list[Candidate],
+    modes: list[str],
+    references: dict[int, _Reference],
+    max_tokens: int,
+) -> list[str | None]:
+    """Pack candidates so every emitted reference points at a file emitted in full.
+
+    A duplicate or near-duplicate diff whose representative ends up
+    summarised or dropped gets its own content back (candidates and modes
+    are updated in place) and the candidates are packed again.
+    """
+    index = {cand.rel: i for i, cand in enumerate(candidates)}
+    while True:
+        score_candidates(candidates)
+        chosen = pack(
+            candidates,
+            max_tokens,
+            lambda c, body: estimate_tokens(_format_block(Path(c.rel), body) + "\n"),
+        )
+        broken = [
+            i
+            for i, (first, _, _) in references.items()
+            if chosen[i] is not None
+            and chosen[i] is candidates[i].full
+            and (chosen[index[first]] is not candidates[index[first]].full or index[first] in references)
+        ]
+        if not broken:
+            return chosen
+        for i in broken:
+            _, candidates[i], modes[i] = references.pop(i)
+
+
+def _iter_budgeted_entries(
+    sources: Iterable[Source],
+    summarise: bool,
+    workers: int,
+    kind: str,
+    max_tokens: int,
+    max_file_bytes: int | None,
+    minify: bool = False,
+    sample_rows: int = SAMPLE_ROWS,
+    dedupe: bool = False,
+    near_dupes: bool = False,
+    max_total_bytes: int | None = None,
+) -> Iterator[Entry]:
+    """Yield the entries that best fit max_tokens, in walk order.
+
+    Every file is rendered both in full and summarised, scored by import
+    centrality, recency and size, then packed greedily by importance.
+    Exact duplicates are found before rendering and near duplicates before
+    packing, so copies cost a one-line reference or a diff rather than the
+    budget of a full file. max_total_bytes caps the emitted content as in
+    iter_entries.
+    """
+    items = list(sources)
+    duplicates = _PreRenderDedupe(max_file_bytes, sample_rows) if dedupe else None
+    first_of = [duplicates.check(p, rel, data) if duplicates is not None else None for p, rel, data in items]
+    jobs = [
+        Job(p, rel, summarise, data, max_file_bytes, minify, sample_rows)
+        for (p, rel, data), first in zip(items, first_of, strict=True)
+        if first is None
+    ]
+    chunksize = PROCESS_CHUNKSIZE if kind == "process" else 1
+    with _make_pool(kind, workers) as pool:
+        rendered = iter(list(pool.map(_budget_job, jobs, chunksize=chunksize)))
+
+    notes: dict[str, list[Path]] = {}
+    near = NearDuplicateIndex() if near_dupes else None
+    candidates: list[Candidate] = []
+    modes: list[str] = []
+    own: dict[str, tuple[Candidate, str]] = {}  # rel -> candidate and mode before collapsing
+    references: dict[int, _Reference] = {}
+    for (_, rel, _), first in zip(items, first_of, strict=True):
+        if first is not None:
+            if first not in own:  # the original was left out (unreadable)
+                continue
+            original, original_mode = own[first]
+            references[len(candidates)] = (first, replace(original, rel=str(rel)), original_mode)
+            candidates.append(Candidate(rel=str(rel), full=f"[duplicate of {first}]"))
+            modes.append("duplicate")
+            continue
+        full, summary, imports, mtime, full_mode, note = next(rendered)
+        if note is not None:
+            notes.setdefault(note, []).append(rel)
+            if note in ("binary", "error"):
+                continue
+        cand = Candidate(rel=str(rel), full=full, summary=summary, mtime=mtime, imports=imports)
+        own[str(rel)] = (cand, full_mode)
+        if near is not None and full_mode != "sample" and len(full) >= DEDUPE_MIN_BYTES:
+            collapsed = near.collapse(str(rel), full)
+            if collapsed is not None:
+                references[len(candidates)] = (collapsed[0], cand, full_mode)
+                cand = replace(cand, full=f"[near-duplicate of {collapsed[0]}]\n{collapsed[1]}")
+                full_mode = "near-duplicate"
+        candidates.append(cand)
+        modes.append(full_mode)
+
+    chosen = _pack_with_references(candidates, modes, references, max_tokens)
+
+    n_full = sum(1 for c, body in zip(candidates, chosen, strict=True) if body is not None and body is c.full)
+    n_kept = sum(1 for body in chosen if body is not None)
+    logger.info(
+        f"budget {max_tokens} tokens: {n_full} full, {n_kept - n_full} summarised, "
+        f"{len(candidates) - n_kept} dropped"
+    )
+    total = over_budget = 0
+    for cand, body, full_mode in zip(candidates, chosen, modes, strict=True):
+        if body is None:
+            continue
+        if max_total_bytes and total >= max_total_bytes:
+            over_budget += 1
+            continue
+        if max_total_bytes:
+            total += len(body.encode("utf-8"))
+        summarised = body is not cand.full or (summarise and cand.summary is not None)
+        yield Entry(cand.rel, body, "summary" if summarised else full_mode)
+    logger.info(f"{len(items)} files processed")
+    _log_skipped(notes, over_budget)
+
+
+def iter_blocks(roots: Sequence[Path], **options: Any) -> Iterator[str]:
+    """Yield one <relpath> block per file under roots, in deterministic walk order.
+
+    Accepts the same keyword options as iter_entries.
+    """
+    for entry in iter_entries(roots, **options):
+        yield _format_block(entry.rel, entry.body)
+
+
+def iter_entries(
+    roots: Sequence[Path],
+    *,
+    exts: Sequence[str] = DEFAULT_EXTS,
+    summarise: bool = False,
+    workers: int = 8,
+    ignore_patterns: Sequence[str] = DEFAULT_IGNORES,
+    cache: BlockCache | None = None,
+    use_gitignore: bool = True,
+    executor: str = "thread",
+    max_tokens: int | None = None,
+    since: str | None = None,
+    staged: bool = False,
+    max_file_bytes: int | None = DEFAULT_MAX_FILE_BYTES,
+    max_total_bytes: int | None = None,
+    dedupe: bool = False,
+    profile: SnapshotProfile | None = None,
+    walk_workers: int = 0,
+    closure: Sequence[Path] | None = None,
+    import_cache: EdgeCache | None = None,
+    minify: bool = False,
+    sample_rows: int = SAMPLE_ROWS,
+    near_dupes: bool = False,
+    selectors: Sequence[str] = (),
+    position_cache: PositionCache | None = None,
+    query: str | None = None,
+    top: int = 10,
+    search_index: SearchIndex | None = None,
+) -> Iterator[Entry]:
+    """Yield one entry per file under roots, in deterministic walk order.
+
+    Files are handed to the worker pool as the walk discovers them and results
+    are drained through a bounded reorder buffer, so memory stays flat
+    regardless of tree size. With ``executor="process"`` files are sent to
+    worker processes in chunks of PROCESS_CHUNKSIZE to amortise IPC; "auto"
+    uses processes when summarising or minifying and threads otherwise. When cache is
+    given, files whose size and mtime are unchanged reuse their stored body.
+
+    With max_tokens, the whole file set is rendered up front and packed to
+    fit the budget (see _iter_budgeted_entries); the cache is not consulted.
+
+    With since and/or staged, the file list comes from ``git diff`` instead of
+    a tree walk and a leading <git-changes> block lists every change, including
+    renames and deletions (see _git_sources).
+
+    Binary files (NUL in the first SNIFF_BYTES) are skipped, files larger than
+    max_file_bytes are cut to head/tail excerpts, and once max_total_bytes of
+    content has been emitted the remaining files are skipped. A summary of
+    skipped and truncated files is logged at the end.
+
+    With dedupe, a file whose content hash matches an earlier file of at
+    least DEDUPE_MIN_BYTES is emitted as a short reference to the first path.
+    With near_dupes, a file of at least DEDUPE_MIN_BYTES that is similar to
+    an earlier one (MinHash/LSH, see snapshot.neardup) is emitted as a diff
+    against it.
+
+    With profile, walk time and per-file read/summarise timings are recorded.
+
+    With walk_workers > 0, directories are listed by that many threads ahead
+    of the reader pool, for roots on high-latency file systems.
+
+    Roots of the form ``git:<repo>@<rev>`` and tar/zip archives are read
+    without checkout or extraction (see snapshot.archive), after any
+    directory roots.
+
+    With closure, only the Python files transitively imported by those entry
+    files are emitted, in dependency order (see snapshot.closure); exts is
+    ignored. Resolved import edges are stored in import_cache when given.
+
+    With minify, Python files that are not summarised are emitted without
+    comments, docstrings or blank lines (see snapshot.minify).
+
+    With sample_rows > 0, JSON/JSONL/CSV files of at least SAMPLE_MIN_BYTES
+    are emitted as their first sample_rows records with an inferred schema
+    and an estimated row count, and notebooks as their cell sources without
+    outputs (see snapshot.samplers); 0 emits them like any other file.
+
+    selectors (``path::Class.method``, see snapshot.selectors) are emitted
+    first, one entry each holding only the matching symbols' source; symbol
+    positions are cached in position_cache when given. With selectors and no
+    roots, nothing is walked.
+
+    With query, files are ranked with BM25 over an inverted index of their
+    identifiers and comments (see snapshot.search) and only the top files
+    are emitted, best first, after a <query-results> block listing their
+    scores. search_index is updated incrementally; without it an in-memory
+    index is built for this call.
+    """
+    mode = (
+        ("summary" if summarise else "raw")
+        + ("+minify" if minify else "")
+        + (f"+sample{sample_rows}" if sample_rows else "")
+        + (f":{max_file_bytes}" if max_file_bytes else "")
+    )
+    kind = _resolve_executor(executor, summarise or minify)
+    if selectors:
+        yield from _selected_entries(selectors, position_cache)
+        if not roots:
+            return
+    if since is not None or staged:
+        changes, sources = _git_sources(roots, exts, ignore_patterns, since, staged, max_file_bytes)
+        yield _changes_entry(changes, since, staged)
+    elif closure:
+        sources = _closure_sources(roots, closure, ignore_patterns, use_gitignore, import_cache)
+    elif query is not None:
+        index = search_index if search_index is not None else SearchIndex(Path(":memory:"))
+        scores, sources = _query_sources(
+            roots, exts, ignore_patterns, use_gitignore, query, top, index, workers, walk_workers
+        )
+        if search_index is None:
+            index.close()
+        yield _ranking_entry(query, scores)
+    else:
+        sources = _root_sources(
+            roots, exts, ignore_patterns, use_gitignore, walk_workers, max_file_bytes
+        )
+    if profile is not None:
+        sources = profile.timed_iter("walk", sources)
+    if max_tokens is not None:
+        yield from _iter_budgeted_entries(
+            sources,
+            summarise,
+            workers,
+            kind,
+            max_tokens,
+            max_file_bytes,
+            minify,
+            sample_rows,
+            dedupe=dedupe,
+            near_dupes=near_dupes,
+            max_total_bytes=max_total_bytes,
+        )
+        return
+
+    chunksize = PROCESS_CHUNKSIZE if kind == "process" else 1
+    window = max(1, workers) * 4 * chunksize
+
+    # Items are [path, rel, stat, result, data] drained in walk order. result
+    # is a cached (body, kind, digest) triple, a (future, index-in-chunk) pair, or None
+    # while the item still sits in the unsubmitted batch.
+    pending: deque[list[Any]] = deque()
+    batch: list[list[Any]] = []
+    count = 0
+    total = 0
+    notes: dict[str, list[Path]] = {}
+    over_budget = 0
+    seen: dict[str, str] = {}
+    duplicates = _PreRenderDedupe(max_file_bytes, sample_rows) if dedupe else None
+    near = NearDuplicateIndex() if near_dupes else None
+
+    def _submit_batch(pool: cf.Executor) -> None:
+        if not batch:
+            return
+        fut = pool.submit(
+            _render_chunk,
+            [Job(e[0], e[1], summarise, e[4], max_file_bytes, minify, sample_rows) for e in batch],
+        )
+        for i, entry in enumerate(batch):
+            entry[3] = (fut, i)
+        batch.clear()
+
+    def _drain(pool: cf.Executor) -> Entry | None:
+        nonlocal total, over_budget
+        if pending[0][3] is None:
+            _submit_batch(pool)
+        p, rel, st, result, _ = pending.popleft()
+        if isinstance(result, tuple) and isinstance(result[0], cf.Future):
+            fut, i = result
+            rendered = fut.result()[i]
+            body, kind, note, digest = rendered[:4]
+            if cache is not None and st is not None and body and note is None:
+                cache.put(p, mode, st, body, kind, digest)
+            if profile is not None:
+                profile.add_file(str(rel), rendered.source_len, rendered.read_s, rendered.summarise_s)
+        else:
+            (body, kind, digest), note = result, None
+            if profile is not None and kind != "duplicate":
+                profile.cached += 1
+        if note is not None:
+            notes.setdefault(note, []).append(rel)
+            if note in ("binary", "error"):
+                return None
+        if dedupe and digest is not None and len(body) >= DEDUPE_MIN_BYTES:
+            first = seen.setdefault(digest, str(rel))
+            if first != str(rel):
+                body, kind = f"[duplicate of {first}]", "duplicate"
+        if near is not None and kind != "duplicate" and len(body) >= DEDUPE_MIN_BYTES:
+            collapsed = near.collapse(str(rel), body)
+            if collapsed is not None:
+                body, kind = f"[near-duplicate of {collapsed[0]}]\n{collapsed[1]}", "near-duplicate"
+        if max_total_bytes and total >= max_total_bytes:
+            # Work already in flight when the cap was reached is discarded.
+            over_budget += 1
+            return None
+        if max_total_bytes:
+            total += len(body.encode("utf-8"))
+        return Entry(str(rel), body, kind)
+
+    with _make_pool(kind, workers) as pool:
+        for p, rel, data in sources:
+            if max_total_bytes and total >= max_total_bytes:
+                over_budget += 1
+                continue
+            try:
+                st = p.stat() if cache is not None and data is None else None
+            except OSError:
+                continue
+            count += 1
+            cached = cache.get(p, mode, st) if cache is not None and st is not None else None
+            if cached is None and duplicates is not None:
+                first = duplicates.check(p, rel, data)
+                if first is not None:
+                    cached = (f"[duplicate of {first}]", "duplicate", None)
+            entry = [p, rel, st, cached, data]
+            pending.append(entry)
+            if cached is None:
+                batch.append(entry)
+                if len(batch) >= chunksize:
+                    _submit_batch(pool)
+            while len(pending) >= window:
+                drained = _drain(pool)
+                if drained is not None:
+                    yield drained
+        while pending:
+            drained = _drain(pool)
+            if drained is not None:
+                yield drained
+
+    logger.info(f"{count} files processed")
+    _log_skipped(notes, over_budget)
+    if cache is not None:
+        logger.info(f"cache: {cache.hits} hits, {cache.misses} misses")
+
+
+def write_snapshot(
+    out: TextIO,
+    roots: Sequence[Path],
+    *,
+    prefix: str = PROMPT,
+    manifest: Manifest | None = None,
+    against: Mapping[str, str] | None = None,
+    **options: Any,
+) -> DiffSummary | None:
+    """Stream the snapshot for roots to out as blocks are rendered.
+
+    When manifest is given, the UTF-8 byte offset, length, hash and mode of
+    every block are recorded in it. With against, a {relpath: block sha256}
+    map of an earlier snapshot (see snapshot.diff.snapshot_hashes), only
+    added and modified blocks are written, followed by a <snapshot-diff>
+    block; the summary is returned. Accepts the same keyword options as
+    iter_entries.
+    """
+    if options.get("max_tokens") is not None:
+        options["max_tokens"] = max(0, options["max_tokens"] - estimate_tokens(prefix.strip()))
+    offset = 0
+    sep = ""
+    if prefix.strip():
+        out.write(prefix.strip())
+        offset = len(prefix.strip().encode("utf-8"))
+        sep = "\n"
+    profile: SnapshotProfile | None = options.get("profile")
+    summary = DiffSummary(against) if against is not None else None
+    for entry in iter_entries(roots, **options):
+        block = _format_block(entry.rel, entry.body)
+        if summary is not None and not summary.check(entry.rel, block_hash(block)):
+            continue
+        if profile is not None:
+            with profile.phase("write"):
+                out.write(sep + block)
+        else:
+            out.write(sep + block)
+        if manifest is not None:
+            offset += len(sep)
+            offset += manifest.add(entry.rel, block, entry.mode, offset)
+        sep = "\n"
+    if summary is not None:
+        out.write(sep + summary.block())
+    if profile is not None:
+        profile.finish()
+    return summary
+
+
+def write_shards(
+    output: Path,
+    roots: Sequence[Path],
+    *,
+    shard_size: int,
+    unit: str = "bytes",
+    prefix: str = PROMPT,
+    on_shard: Callable[[Path], None] | None = None,
+    **options: Any,
+) -> ShardWriter:
+    """Write the snapshot for roots as shards of at most shard_size bytes or tokens.
+
+    Shards are named after output (see snapshot.shard) and on_shard is called
+    with each shard's path as soon as it is complete. Returns the writer, whose
+    ``save_index`` writes the shard index. Accepts the same keyword options as
+    iter_entries.
+    """
+    profile: SnapshotProfile | None = options.get("profile")
+    writer = ShardWriter(output, shard_size, unit=unit, prefix=prefix, on_shard=on_shard)
+    with writer:
+        for entry in iter_entries(roots, **options):
+            block = _format_block(entry.rel, entry.body)
+            if profile is not None:
+                with profile.phase("write"):
+                    writer.add(entry.rel, block, entry.mode)
+            else:
+                writer.add(entry.rel, block, entry.mode)
+    if profile is not None:
+        profile.finish()
+    return writer
+
+
 def make_snapshot(
     roots: Sequence[Path],
     *,
@@ -253,42 +1396,226 @@ def make_snapshot(
     workers: int = 8,
     ignore_patterns: Sequence[str] = DEFAULT_IGNORES,
     prefix: str = PROMPT,
+    **options: Any,
 ) -> str:
-    """Return concatenated snapshot for roots."""
-    roots = [p.resolve() for p in roots]
-    all_files = list(iter_paths(roots, exts, ignore_patterns=ignore_patterns))
+    """Return concatenated snapshot for roots.
+
+    Accepts the same keyword options as iter_entries.
+    """
+    buf = io.StringIO()
+    write_snapshot(
+        buf,
+        roots,
+        prefix=prefix,
+        exts=exts,
+        summarise=summarise,
+        workers=workers,
+        ignore_patterns=ignore_patterns,
+        **options,
+    )
+    return buf.getvalue().strip()
 
-    # Always include .github/copilot-instructions.md if it exists
-    copilot_path = Path(".github/copilot-instructions.md").resolve()
-    if copilot_path.exists() and copilot_path not in all_files:
-        all_files.insert(0, copilot_path)
 
-    logger.info(f"{len(all_files)} files found")
+def watch_snapshot(
+    roots: Sequence[Path],
+    *,
+    exts: Sequence[str] = DEFAULT_EXTS,
+    summarise: bool = False,
+    workers: int = 8,
+    ignore_patterns: Sequence[str] = DEFAULT_IGNORES,
+    use_gitignore: bool = True,
+    max_file_bytes: int | None = DEFAULT_MAX_FILE_BYTES,
+    prefix: str = PROMPT,
+    walk_workers: int = 0,
+    minify: bool = False,
+    sample_rows: int = SAMPLE_ROWS,
+) -> SnapshotDaemon:
+    """Return a daemon that keeps the snapshot for roots hot in memory.
+
+    Call ``refresh()`` to pick up changes (only modified files are re-rendered)
+    or ``run()`` to follow the tree with inotify/polling and serve it.
+    Binary and unreadable files are left out, as in iter_entries.
+    """
+    resolved = [p.resolve() for p in roots]
+    wanted = file_filter(exts, ignore_patterns, use_gitignore)
+
+    def _list_files(on_dir: Callable[[str], None]) -> Iterator[tuple[Path, Path]]:
+        for p, rel, _ in _iter_sources(roots, exts, ignore_patterns, use_gitignore, on_dir, walk_workers):
+            yield p, rel
+
+    def _render(path: Path, rel: Path) -> str | None:
+        rendered = _render_job(Job(path, rel, summarise, None, max_file_bytes, minify, sample_rows))
+        if rendered.note in ("binary", "error"):
+            return None
+        return _format_block(rel, rendered.body)
+
+    def _root_index(path: Path) -> int | None:
+        return next((i for i, r in enumerate(resolved) if r == path or r in path.parents), None)
+
+    def _accept(path: Path) -> Path | None:
+        i = _root_index(path)
+        if i is None or not wanted(resolved[i], path):
+            return None
+        return path.relative_to(resolved[i])
+
+    def _order_key(path: Path) -> tuple[int, tuple]:
+        # Files outside every root (copilot instructions) come first, as in _iter_sources.
+        i = _root_index(path)
+        return (-1, ()) if i is None else (i, walk_order(path.relative_to(resolved[i])))
+
+    return SnapshotDaemon(
+        _list_files, _render, prefix=prefix, workers=workers, accept=_accept, order_key=_order_key
+    )
 
-    def _one(p: Path) -> str:
-        # If copilot-instructions, use project root as base
-        if p == copilot_path:
-            root = copilot_path.parent.parent.parent if copilot_path.parent.name == 'github' else roots[0]
-        else:
-            root = next(r for r in roots if r in p.parents or r == p)
-        return file_to_block(p, root, summarise)
 
-    with cf.ThreadPoolExecutor(max_workers=workers) as pool:
-        blocks: List[str] = list(pool.map(_one, all_files))
+def index_tree(
+    roots: Sequence[Path],
+    index: SymbolIndex,
+    *,
+    ignore_patterns: Sequence[str] = DEFAULT_IGNORES,
+    use_gitignore: bool = True,
+    workers: int = 8,
+    executor: str = "auto",
+) -> tuple[int, int, int]:
+    """Bring the symbol index up to date for the Python files under roots.
+
+    Only files whose size or mtime changed are re-parsed; indexed files that
+    no longer exist under roots are dropped. Returns (files seen, files
+    re-indexed, files removed).
+    """
+    files = [
+        (p, (module_name(rel.as_posix()),))
+        for p, rel, _ in _iter_sources(roots, (".py",), ignore_patterns, use_gitignore)
+        if p.suffix == ".py"  # .github/copilot-instructions.md is always added
+    ]
+
+    def _store(p: Path, st: os.stat_result, args: tuple[Any, ...], symbols: Any) -> None:
+        if symbols is None:
+            logger.warning(f"Could not parse {p}, indexing it without symbols")
+            symbols = ([], [])
+        index.replace(p, st, args[0], *symbols)
+
+    return _sync_file_index(
+        index, files, [root.resolve() for root in roots], scan_file, _store, workers, executor
+    )
 
-    ret = "\n".join(blocks)
-    if prefix:
-        ret = f"{prefix}\n{ret}"
-    return ret.strip()
+
+def _index_main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="cat-projects index",
+        description="Build or update the symbol index for Python files.",
+    )
+    parser.add_argument("paths", nargs="*", default=["."], help="Directories to index (default: .).")
+    parser.add_argument("-w", "--workers", type=int, default=8, help="Number of workers (default: 8).")
+    parser.add_argument(
+        "-i", "--ignore",
+        default="",
+        help="Comma‑separated list of additional substrings to ignore.",
+    )
+    parser.add_argument("--no-gitignore", action="store_true", help="Do not honour .gitignore / .ignore files.")
+    parser.add_argument("--db", type=Path, help="Index database (default: ~/.cache/pytools).")
+    args = parser.parse_args(argv)
+
+    extra_ignores = tuple(p.strip() for p in args.ignore.split(",") if p.strip())
+    start = time.perf_counter()
+    with SymbolIndex(args.db) as index:
+        seen, updated, removed = index_tree(
+            [Path(p) for p in args.paths],
+            index,
+            ignore_patterns=DEFAULT_IGNORES + extra_ignores,
+            use_gitignore=not args.no_gitignore,
+            workers=args.workers,
+        )
+    logger.info(
+        f"indexed {seen} files ({updated} updated, {removed} removed) "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    return 0
+
+
+def _query_main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="cat-projects query",
+        description="Look up definitions or references in the symbol index.",
+    )
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--defs", metavar="NAME", help="Where NAME (or a dotted qualname) is defined.")
+    group.add_argument("--refs", metavar="NAME", help="Files that import or use NAME.")
+    parser.add_argument("paths", nargs="*", help="Only report files under these paths.")
+    parser.add_argument("--files", action="store_true", help="Print matching file paths only.")
+    parser.add_argument("--db", type=Path, help="Index database (default: ~/.cache/pytools).")
+    args = parser.parse_args(argv)
+
+    roots = [Path(p).resolve() for p in args.paths]
+    with SymbolIndex(args.db) as index:
+        hits = index.definitions(args.defs, roots) if args.defs else index.references(args.refs, roots)
+    if args.files:
+        for path in dict.fromkeys(h.path for h in hits):
+            print(path)
+    else:
+        for hit in hits:
+            print(hit)
+    return 0 if hits else 1
+
+
+def _diff_main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="cat-projects diff",
+        description="Emit only the blocks added or modified between two snapshots, "
+        "followed by a <snapshot-diff> block listing every change.",
+    )
+    parser.add_argument("old", type=Path, help="Earlier snapshot (.gz/.zst allowed).")
+    parser.add_argument("new", type=Path, help="Later snapshot (.gz/.zst allowed).")
+    parser.add_argument(
+        "-o", "--output",
+        help="Write the diff to this file instead of stdout (compressed for .gz/.zst).",
+    )
+    args = parser.parse_args(argv)
+    if args.output and compression_for(Path(args.output)) == "zstd" and not zstd_available():
+        parser.error("--output *.zst needs Python 3.14+ or the 'zstandard' package")
+
+    out = open_output(Path(args.output)) if args.output else sys.stdout
+    try:
+        summary = diff_snapshots(args.old, args.new, out)
+    except (OSError, ValueError) as exc:
+        logger.error(str(exc))
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    logger.info(
+        f"{len(summary.added)} added, {len(summary.modified)} modified, {len(summary.removed)} removed"
+    )
+    return 0
+
+
+SUBCOMMANDS = {"index": _index_main, "query": _query_main, "diff": _diff_main}
 
 
 def main():
-    """Main entry point for the cat-projects command."""
+    """Main entry point for the cat-projects command.
+
+    ``cat-projects index`` and ``cat-projects query`` manage the symbol index
+    and ``cat-projects diff`` compares two snapshots; anything else creates a
+    snapshot (use ``./index`` for a directory of that name).
+    """
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        try:
+            return SUBCOMMANDS[sys.argv[1]](sys.argv[2:])
+        except sqlite3.OperationalError as exc:
+            logger.error(f"Index database unavailable: {exc}")
+            return 1
     parser = argparse.ArgumentParser(
         description="Create code snapshot for LLMs.",
         epilog="Example: cat-projects src/ --extensions .py,.js --summarize"
     )
-    parser.add_argument("paths", nargs="+", help="Files or directories to scan.")
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="Files or directories to scan, git:REPO@REV revisions, .tar(.gz)/.zip "
+        "archives (read without checkout or extraction), or FILE::SYMBOL selectors "
+        "such as mod.py::Registry.get or mod.py::* (only those symbols are emitted).",
+    )
     parser.add_argument(
         "-e", "--extensions",
         default=",".join(DEFAULT_EXTS),
@@ -297,37 +1624,328 @@ def main():
     parser.add_argument(
         "-s", "--summarize",
         action="store_true",
-        help="Summarize Python files (extract signatures and docstrings)."
+        help="Summarize source files (signatures, classes, exports and doc lines) for "
+        "Python, JS/TS, Go, Rust and shell; other files are emitted raw."
     )
     parser.add_argument(
         "-w", "--workers",
         type=int,
         default=8,
-        help="Number of thread workers (default: 8).",
+        help="Number of workers (default: 8).",
+    )
+    parser.add_argument(
+        "--executor",
+        choices=EXECUTORS,
+        default="auto",
+        help="Worker pool: threads, processes, or auto (processes when summarizing or minifying).",
+    )
+    parser.add_argument(
+        "--walk-workers",
+        type=int,
+        default=0,
+        help="List directories with N threads ahead of the readers; helps on NFS/sshfs "
+        "where every readdir is a round trip (default: 0, serial walk).",
     )
     parser.add_argument(
         "-i", "--ignore",
         default="",
         help="Comma‑separated list of additional substrings to ignore.",
     )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="Strip comments, docstrings and blank lines from Python files emitted "
+        "in full and indent them with one space per level.",
+    )
+    parser.add_argument(
+        "--sample-rows",
+        type=int,
+        default=SAMPLE_ROWS,
+        help="Emit large .json/.jsonl/.csv files as their first N records with an "
+        "inferred schema, and notebooks without outputs; 0 emits them in full "
+        f"(default: {SAMPLE_ROWS}).",
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        help="Fit the snapshot into N estimated tokens, summarizing or dropping "
+        "the least important files.",
+    )
+    parser.add_argument(
+        "--max-file-bytes",
+        type=int,
+        default=DEFAULT_MAX_FILE_BYTES,
+        help="Cut files larger than this to head/tail excerpts; 0 disables "
+        f"(default: {DEFAULT_MAX_FILE_BYTES}).",
+    )
+    parser.add_argument(
+        "--max-total-bytes",
+        type=int,
+        default=0,
+        help="Skip remaining files once this much content has been emitted; 0 disables.",
+    )
+    parser.add_argument(
+        "--no-dedupe",
+        action="store_true",
+        help="Emit identical files in full instead of referencing the first copy.",
+    )
+    parser.add_argument(
+        "--near-dupes",
+        action="store_true",
+        help="Emit files that closely resemble an earlier file (generated clients, "
+        "versioned migrations, forks) as a diff against it.",
+    )
+    parser.add_argument(
+        "--query",
+        metavar="TEXT",
+        help="Only snapshot the files most relevant to TEXT, ranked with BM25 over an "
+        "incrementally updated index of identifiers and comments.",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        metavar="K",
+        help="Number of files to keep with --query (default: 10).",
+    )
+    parser.add_argument(
+        "--since",
+        metavar="REV",
+        help="Only snapshot files changed since REV (working tree vs REV, plus untracked).",
+    )
+    parser.add_argument(
+        "--staged",
+        action="store_true",
+        help="Only snapshot staged changes, reading content from the git index.",
+    )
+    parser.add_argument(
+        "--closure",
+        action="append",
+        type=Path,
+        metavar="ENTRY",
+        help="Only snapshot the Python files ENTRY transitively imports within the "
+        "given paths, in dependency order (repeatable).",
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="Write the snapshot to this file instead of stdout, compressed on the "
+        "fly when it ends in .gz or .zst.",
+    )
+    parser.add_argument(
+        "--against",
+        type=Path,
+        metavar="OLD",
+        help="Only emit blocks added or modified since snapshot OLD (hashes come from "
+        "OLD.manifest.json when present), followed by a <snapshot-diff> block.",
+    )
+    parser.add_argument(
+        "--manifest",
+        action="store_true",
+        help="With --output, also write OUTPUT.manifest.json listing each block's "
+        "byte offset (in the uncompressed stream), length, sha256 and mode.",
+    )
+    shard = parser.add_mutually_exclusive_group()
+    shard.add_argument(
+        "--shard-size",
+        type=int,
+        metavar="BYTES",
+        help="With --output, split the snapshot into shards OUTPUT.001, OUTPUT.002, ... "
+        "of at most BYTES each, keeping directories together, and write "
+        "OUTPUT.shards.json listing which files went where.",
+    )
+    shard.add_argument(
+        "--shard-tokens",
+        type=int,
+        metavar="TOKENS",
+        help="Like --shard-size, with the limit in estimated tokens.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Report per-phase timings and the slowest files to stderr.",
+    )
+    parser.add_argument(
+        "--profile-json",
+        metavar="PATH",
+        help="Profile as with --profile and also write the report to PATH as JSON.",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=20,
+        help="Number of slowest files to report with --profile (default: 20).",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running, re-render only changed files and serve the snapshot "
+        "over --socket and/or rewrite --output on every change.",
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="With --watch, serve the current snapshot on this Unix socket.",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="With --watch, seconds between checks when inotify is unavailable (default: 1).",
+    )
+    parser.add_argument(
+        "--no-gitignore",
+        action="store_true",
+        help="Do not honour .gitignore / .ignore files.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or update the on-disk block cache (~/.cache/pytools).",
+    )
 
     args = parser.parse_args()
-
-    paths = [Path(p) for p in args.paths]
+    if args.manifest and not args.output:
+        parser.error("--manifest requires --output")
+    shard_size = args.shard_size or args.shard_tokens
+    if shard_size is not None:
+        if not args.output:
+            parser.error("--shard-size/--shard-tokens require --output")
+        if args.manifest or args.watch:
+            parser.error("--shard-size/--shard-tokens cannot be combined with --manifest or --watch")
+        if shard_size <= 0:
+            parser.error("shard size must be positive")
+    if args.against and (args.watch or shard_size is not None):
+        parser.error("--against cannot be combined with --watch or sharding")
+    if args.watch and not (args.socket or args.output):
+        parser.error("--watch requires --socket or --output")
+    if args.closure and (args.since or args.staged or args.watch):
+        parser.error("--closure cannot be combined with --since, --staged or --watch")
+    selectors = [p for p in args.paths if parse_selector(p) is not None]
+    if selectors and (args.since or args.staged or args.closure or args.watch):
+        parser.error("FILE::SYMBOL selectors cannot be combined with --since, --staged, --closure or --watch")
+    if any(is_virtual_root(p) for p in args.paths) and (
+        args.since or args.staged or args.closure or args.watch or args.query
+    ):
+        parser.error(
+            "git:/archive paths cannot be combined with --since, --staged, --closure, --watch or --query"
+        )
+    if args.query is not None and (args.since or args.staged or args.closure or args.watch):
+        parser.error("--query cannot be combined with --since, --staged, --closure or --watch")
+    if args.top <= 0:
+        parser.error("--top must be positive")
+    if args.sample_rows < 0:
+        parser.error("--sample-rows cannot be negative")
+    if args.socket and not args.watch:
+        parser.error("--socket requires --watch")
+    if args.output and compression_for(Path(args.output)) == "zstd" and not zstd_available():
+        parser.error("--output *.zst needs Python 3.14+ or the 'zstandard' package")
+
+    paths = [Path(p) for p in args.paths if p not in selectors]
     exts = [e if e.startswith(".") else f".{e}" for e in args.extensions.split(",") if e]
 
     extra_ignores = tuple(p.strip() for p in args.ignore.split(",") if p.strip())
     ignore_patterns = DEFAULT_IGNORES + extra_ignores
 
-    snapshot = make_snapshot(
-        paths,
+    if args.watch:
+        daemon = watch_snapshot(
+            paths,
+            exts=exts,
+            summarise=args.summarize,
+            workers=args.workers,
+            ignore_patterns=ignore_patterns,
+            use_gitignore=not args.no_gitignore,
+            max_file_bytes=args.max_file_bytes or None,
+            walk_workers=args.walk_workers,
+            minify=args.minify,
+            sample_rows=args.sample_rows,
+        )
+        where = " and ".join(x for x in (args.socket, args.output) if x)
+        logger.info(f"watching {len(paths)} path(s), serving on {where}")
+        try:
+            daemon.run(
+                socket_path=Path(args.socket) if args.socket else None,
+                output=Path(args.output) if args.output else None,
+                poll_interval=args.poll_interval,
+                on_refresh=lambda n: logger.info(f"snapshot refreshed: {n} file(s) changed"),
+            )
+        except FileExistsError as exc:
+            logger.error(str(exc))
+            return 1
+        return 0
+
+    cache = None if args.no_cache else BlockCache.open_or_none()
+    import_cache = EdgeCache.open_or_none() if args.closure and not args.no_cache else None
+    position_cache = PositionCache.open_or_none() if selectors and not args.no_cache else None
+    search_index = (
+        SearchIndex.open_or_none() if args.query is not None and not args.no_cache else None
+    )
+    manifest = Manifest(Path(args.output).name) if args.manifest else None
+    profile = SnapshotProfile() if args.profile or args.profile_json else None
+    sharder = None
+    out = open_output(Path(args.output)) if args.output and shard_size is None else sys.stdout
+    options: dict[str, Any] = dict(
         exts=exts,
         summarise=args.summarize,
         workers=args.workers,
         ignore_patterns=ignore_patterns,
+        cache=cache,
+        use_gitignore=not args.no_gitignore,
+        executor=args.executor,
+        max_tokens=args.max_tokens,
+        since=args.since,
+        staged=args.staged,
+        max_file_bytes=args.max_file_bytes or None,
+        max_total_bytes=args.max_total_bytes or None,
+        dedupe=not args.no_dedupe,
+        near_dupes=args.near_dupes,
+        profile=profile,
+        walk_workers=args.walk_workers,
+        closure=args.closure,
+        import_cache=import_cache,
+        minify=args.minify,
+        sample_rows=args.sample_rows,
+        selectors=selectors,
+        position_cache=position_cache,
+        query=args.query,
+        top=args.top,
+        search_index=search_index,
     )
-
-    sys.stdout.write(snapshot)
+    try:
+        if shard_size is not None:
+            sharder = write_shards(
+                Path(args.output),
+                paths,
+                shard_size=shard_size,
+                unit="bytes" if args.shard_size else "tokens",
+                on_shard=lambda shard: logger.info(f"shard written: {shard}"),
+                **options,
+            )
+        else:
+            against = snapshot_hashes(args.against) if args.against else None
+            write_snapshot(out, paths, manifest=manifest, against=against, **options)
+    except (GitError, FileNotFoundError, ArchiveError, SelectorError) as exc:
+        logger.error(str(exc))
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if cache is not None:
+            cache.close()
+        if import_cache is not None:
+            import_cache.close()
+        if position_cache is not None:
+            position_cache.close()
+        if search_index is not None:
+            search_index.close()
+    if manifest is not None:
+        manifest.save(manifest_path(Path(args.output)))
+    if sharder is not None:
+        sharder.save_index(shard_index_path(Path(args.output)))
+        logger.info(f"{len(sharder.shards)} shard(s), index in {shard_index_path(Path(args.output))}")
+    if profile is not None:
+        profile.report(sys.stderr, args.profile_top)
+        if args.profile_json:
+            profile.save(Path(args.profile_json), args.profile_top)
     return 0
 
 
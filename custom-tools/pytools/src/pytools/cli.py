@@ -174,9 +174,9 @@ def build_registry() -> Registry:
             runner=lambda a: run_module_main(
                 _cat.main, "cat-projects", a, capture=True
             )[0],
-            usage="cat-projects <paths...> [--extensions .py,.js] [--summarize]",
+            usage="cat-projects <paths...> [--extensions .py,.js] [--summarize] [-o FILE]",
             tags=["dev", "snapshot"],
-            safety="safe",
+            safety="write",
         )
     )
 
@@ -0,0 +1,5 @@
+"""Supporting machinery for the cat-projects snapshot tool."""
+
+from .cache import BlockCache, FileIndex, SQLiteStore, default_cache_dir
+
+__all__ = ["BlockCache", "FileIndex", "SQLiteStore", "default_cache_dir"]
@@ -0,0 +1,118 @@
+"""Snapshot sources that are not directories: git revisions and archives.
+
+A root may be given as ``git:<repo>@<rev>`` (``@<rev>`` defaults to HEAD)
+or as a ``.tar``/``.tar.gz``/``.tgz``/``.tar.bz2``/``.tar.xz``/``.zip``
+file. Content is read straight from the object store or the archive and
+handed to the renderer as bytes, so nothing is checked out or extracted::
+
+    cat-projects git:.@v1.2.0 git:../other@main~10
+    cat-projects dist/project-1.0.tar.gz
+
+Tar archives are read as a stream (``r|*``) in archive order; git trees are
+listed with ``git ls-tree`` and their blobs read through one ``git cat-file
+--batch`` process, in tree order. Paths are relative to the archive or tree
+root.
+
+Members and blobs larger than max_bytes are read as their head and tail
+only (see snapshot.clip), so one huge member cannot exhaust memory.
+"""
+
+from __future__ import annotations
+
+import tarfile
+import zipfile
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+from .clip import read_capped
+from .gitsrc import GitBlobReader, GitError, tree_files
+
+GIT_PREFIX = "git:"
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+ZIP_SUFFIXES = (".zip",)
+
+# Decides from a relative path whether a member is snapshotted.
+Keep = Callable[[str], bool]
+
+
+class ArchiveError(ValueError):
+    """Raised when an archive cannot be read."""
+
+
+def parse_git_root(spec: str) -> tuple[Path, str] | None:
+    """Return (repo, rev) for a ``git:<repo>@<rev>`` root, else None."""
+    if not spec.startswith(GIT_PREFIX):
+        return None
+    repo, sep, rev = spec[len(GIT_PREFIX):].rpartition("@")
+    if not sep:
+        repo, rev = rev, "HEAD"
+    return Path(repo or "."), rev or "HEAD"
+
+
+def is_archive(spec: str) -> bool:
+    """Return True if spec names a tar or zip archive."""
+    name = spec.lower()
+    return name.endswith(TAR_SUFFIXES + ZIP_SUFFIXES)
+
+
+def is_virtual_root(spec: str) -> bool:
+    """Return True if spec is read without walking the file system."""
+    return spec.startswith(GIT_PREFIX) or is_archive(spec)
+
+
+def iter_git_tree(
+    repo: Path, rev: str, keep: Keep, max_bytes: int | None = None
+) -> Iterator[tuple[str, bytes]]:
+    """Yield (path, content) for the kept files of rev's tree."""
+    files = [(path, sha) for path, sha in tree_files(repo, rev) if keep(path)]
+    with GitBlobReader(repo) as reader:
+        for path, sha in files:
+            data = reader.read(sha, max_bytes)
+            if data is None:
+                raise GitError(f"Object {sha} ({path}) is missing from {repo}")
+            yield path, data
+
+
+def iter_archive(
+    path: Path, keep: Keep, max_bytes: int | None = None
+) -> Iterator[tuple[str, bytes]]:
+    """Yield (member path, content) for the kept regular files of an archive."""
+    if path.name.lower().endswith(ZIP_SUFFIXES):
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                name = info.filename.lstrip("/")
+                if not info.is_dir() and keep(name):
+                    with zf.open(info) as f:
+                        yield name, read_capped(f, info.file_size, max_bytes)
+        return
+    with tarfile.open(path, "r|*") as tf:
+        for member in tf:
+            name = member.name.lstrip("/")
+            if name.startswith("./"):
+                name = name[2:]
+            if not member.isfile() or not keep(name):
+                continue
+            f = tf.extractfile(member)
+            if f is not None:
+                yield name, read_capped(f, member.size, max_bytes)
+
+
+def iter_virtual_root(
+    spec: str, keep: Keep, max_bytes: int | None = None
+) -> Iterator[tuple[str, bytes]]:
+    """Yield (relpath, content) for a git or archive root.
+
+    Raises FileNotFoundError for a missing archive, ArchiveError for a
+    corrupt one and GitError for a bad repository or revision.
+    """
+    git = parse_git_root(spec)
+    if git is not None:
+        yield from iter_git_tree(*git, keep, max_bytes)
+        return
+    path = Path(spec)
+    if not path.is_file():
+        raise FileNotFoundError(f"Archive {spec} does not exist")
+    try:
+        yield from iter_archive(path, keep, max_bytes)
+    except (tarfile.TarError, zipfile.BadZipFile, EOFError, OSError) as exc:
+        raise ArchiveError(f"Cannot read archive {spec}: {exc}") from exc
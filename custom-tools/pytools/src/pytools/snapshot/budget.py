@@ -0,0 +1,169 @@
+"""Token-budgeted packing for cat-projects snapshots.
+
+Each file is a :class:`Candidate` with a full body and, where available, a
+cheaper summary. :func:`pack` keeps the most important files, first in their
+cheapest form and then upgrading to full text while the budget allows.
+Importance combines import centrality, recency and size.
+"""
+
+from __future__ import annotations
+
+import ast
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+
+# (relative level, module, imported names) as found in ``import`` statements.
+ImportRef = tuple[int, str, tuple[str, ...]]
+# Leading directories that hold importable packages rather than being one.
+SOURCE_DIRS = ("src",)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for code)."""
+    return (len(text) + 3) // 4
+
+
+@dataclass
+class Candidate:
+    """A file that may be included in a budgeted snapshot."""
+
+    rel: str
+    full: str
+    summary: str | None = None
+    mtime: float = 0.0
+    imports: Sequence[ImportRef] = ()
+    score: float = 0.0
+
+
+def module_name(rel: str) -> str:
+    """Return the dotted module name for a relative ``.py`` path."""
+    parts = rel.replace("\\", "/").split("/")
+    parts[-1] = parts[-1].rsplit(".", 1)[0]
+    if parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def python_imports(tree: ast.Module) -> list[ImportRef]:
+    """Return every import in a parsed module, in source order."""
+    refs: list[ImportRef] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            refs.extend((0, alias.name, ()) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            names = tuple(alias.name for alias in node.names if alias.name != "*")
+            refs.append((node.level, node.module or "", names))
+    return refs
+
+
+def module_index(names: Sequence[str]) -> dict[str, int]:
+    """Map each root-relative module name to its (first) index.
+
+    Modules under a leading source directory (SOURCE_DIRS, e.g. ``src/``) are
+    also registered without it, so ``src/pkg/mod.py`` answers to ``pkg.mod``.
+    Exact names win over stripped ones.
+    """
+    by_name: dict[str, int] = {}
+    for i, name in enumerate(names):
+        by_name.setdefault(name, i)
+    for i, name in enumerate(names):
+        head, _, rest = name.partition(".")
+        if head in SOURCE_DIRS and rest:
+            by_name.setdefault(rest, i)
+    return by_name
+
+
+def import_targets(
+    name: str, is_package: bool, imports: Sequence[ImportRef], by_name: dict[str, int]
+) -> list[int]:
+    """Resolve the imports of module name to indices in by_name, in import order.
+
+    Absolute imports are matched against root-relative module names (see
+    module_index), so ``import json`` never resolves to ``app/vendor/json.py``.
+    ``from pkg import mod`` resolves to the submodule when one exists.
+    """
+    package = name.split(".")
+    if not is_package:
+        package = package[:-1]
+    self_index = by_name.get(name)
+    targets: dict[int, None] = {}
+    for level, module, imported in imports:
+        if level:
+            base = package[: len(package) - (level - 1)]
+            base_name = ".".join(base + ([module] if module else []))
+        else:
+            base_name = module
+        for target in [base_name] + [f"{base_name}.{n}" for n in imported]:
+            j = by_name.get(target.strip("."))
+            if j is not None and j != self_index:
+                targets[j] = None
+    return list(targets)
+
+
+def import_centrality(candidates: Sequence[Candidate]) -> list[int]:
+    """Count, for each candidate, how many other candidates import it."""
+    names = [module_name(c.rel) for c in candidates]
+    by_name = module_index(names)
+    counts = [0] * len(candidates)
+    for i, cand in enumerate(candidates):
+        for j in import_targets(names[i], cand.rel.endswith("__init__.py"), cand.imports, by_name):
+            if j != i:
+                counts[j] += 1
+    return counts
+
+
+def score_candidates(candidates: Sequence[Candidate]) -> None:
+    """Assign an importance score in [0, 1.75] to each candidate in place."""
+    n = len(candidates)
+    if not n:
+        return
+    centrality = import_centrality(candidates)
+    top = max(centrality) or 1
+    by_mtime = sorted(range(n), key=lambda i: candidates[i].mtime)
+    by_size = sorted(range(n), key=lambda i: len(candidates[i].full))
+    recency_rank = {i: r for r, i in enumerate(by_mtime)}
+    size_rank = {i: r for r, i in enumerate(by_size)}
+    denom = max(1, n - 1)
+    for i, cand in enumerate(candidates):
+        cand.score = (
+            centrality[i] / top
+            + 0.5 * recency_rank[i] / denom
+            + 0.25 * (1 - size_rank[i] / denom)
+        )
+
+
+def pack(
+    candidates: Sequence[Candidate],
+    budget: int,
+    block_tokens: Callable[[Candidate, str], int],
+) -> list[str | None]:
+    """Choose a body (or None to drop) per candidate so the total fits budget.
+
+    block_tokens(candidate, body) returns the cost of emitting that body,
+    including any framing. Candidates are considered in descending score
+    order; ties keep their original order.
+    """
+    order = sorted(range(len(candidates)), key=lambda i: -candidates[i].score)
+    chosen: list[str | None] = [None] * len(candidates)
+    costs = [0] * len(candidates)
+    is_full = [False] * len(candidates)
+    remaining = budget
+
+    for i in order:
+        cand = candidates[i]
+        cheap = cand.summary is not None and len(cand.summary) < len(cand.full)
+        body = cand.summary if cheap else cand.full
+        cost = block_tokens(cand, body)
+        if cost <= remaining:
+            chosen[i], costs[i], is_full[i] = body, cost, not cheap
+            remaining -= cost
+
+    for i in order:
+        cand = candidates[i]
+        if chosen[i] is None or is_full[i]:
+            continue
+        cost = block_tokens(cand, cand.full)
+        if cost - costs[i] <= remaining:
+            remaining -= cost - costs[i]
+            chosen[i], costs[i], is_full[i] = cand.full, cost, True
+    return chosen
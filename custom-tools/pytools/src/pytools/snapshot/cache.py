@@ -0,0 +1,258 @@
+"""Persistent block cache for cat-projects snapshots.
+
+SQLiteStore is the shared base of every SQLite database cat-projects keeps
+under default_cache_dir(): the block cache here, the symbol index, the
+import edge cache, the symbol position cache and the search index.
+FileIndex adds the per-file bookkeeping of the two indexes.
+
+Several runs may share a store (e.g. agents snapshotting in a loop). Stores
+use WAL journaling so readers never block, wait up to BUSY_TIMEOUT_S for a
+concurrent writer, and commit every COMMIT_EVERY writes or COMMIT_INTERVAL_S
+seconds, so no run holds the write lock for long. Caches that still hit a locked or broken database
+disable themselves with a warning and the run continues uncached.
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import os
+import sqlite3
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any, TypeVar
+
+# Bump when the rendered body format changes so stale entries are discarded.
+CACHE_VERSION = 5
+BUSY_TIMEOUT_S = 10.0
+COMMIT_EVERY = 256
+COMMIT_INTERVAL_S = 0.25
+
+logger = logging.getLogger(__name__)
+
+_Store = TypeVar("_Store", bound="SQLiteStore")
+
+
+def default_cache_dir() -> Path:
+    """Return the pytools cache directory (``$PYTOOLS_CACHE_DIR`` or ~/.cache/pytools)."""
+    cache_dir = os.getenv("PYTOOLS_CACHE_DIR")
+    if cache_dir:
+        return Path(cache_dir)
+    return Path.home() / ".cache" / "pytools"
+
+
+def path_scope(roots: Iterable[Path], column: str = "path") -> tuple[str, list]:
+    """Return an SQL condition matching column at or below any of roots, and its arguments.
+
+    The condition is "1" (always true) when roots is empty.
+    """
+    clauses, args = [], []
+    for root in roots:
+        prefix = str(root).rstrip(os.sep) + os.sep
+        clauses.append(f"({column} = ? OR substr({column}, 1, ?) = ?)")
+        args += [str(root), len(prefix), prefix]
+    return ("(" + " OR ".join(clauses) + ")" if clauses else "1"), args
+
+
+def best_effort(default: Any = None) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorate a cache method to return default once the store hit an OperationalError.
+
+    The first error disables the store (see SQLiteStore.error), so a locked
+    cache degrades to a miss instead of failing the run.
+    """
+
+    def _decorate(method: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(method)
+        def _wrapper(self: SQLiteStore, *args: Any, **kwargs: Any) -> Any:
+            if self.error is not None:
+                return default
+            try:
+                return method(self, *args, **kwargs)
+            except sqlite3.OperationalError as exc:
+                self._disable(exc)
+                return default
+
+        return _wrapper
+
+    return _decorate
+
+
+class SQLiteStore:
+    """Versioned SQLite database, by default FILENAME under default_cache_dir().
+
+    Subclasses set SCHEMA (idempotent CREATE statements), the TABLES it
+    creates and VERSION. When the version stored in the database differs,
+    TABLES are dropped and recreated, so bumping VERSION discards stale data.
+    Pass ``Path(":memory:")`` for a throwaway in-memory store.
+    """
+
+    FILENAME = ""
+    VERSION = 1
+    TABLES: tuple[str, ...] = ()
+    SCHEMA = ""
+
+    def __init__(self, path: Path | None = None) -> None:
+        if path is None:
+            path = default_cache_dir() / self.FILENAME
+        if str(path) != ":memory:":
+            path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.error: sqlite3.OperationalError | None = None
+        self._pending = 0
+        self._committed_at = time.monotonic()
+        self._conn = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT_S)
+        if str(path) != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        (version,) = self._conn.execute("PRAGMA user_version").fetchone()
+        if version != self.VERSION:
+            for table in self.TABLES:
+                self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self._conn.execute(f"PRAGMA user_version = {self.VERSION}")
+        self._conn.executescript(self.SCHEMA)
+        self._conn.commit()
+
+    @classmethod
+    def open_or_none(cls: type[_Store], path: Path | None = None) -> _Store | None:
+        """Return the store, or None with a warning when the database cannot be opened."""
+        try:
+            return cls(path)
+        except sqlite3.OperationalError as exc:
+            logger.warning(f"{cls.__name__} unavailable, continuing without it: {exc}")
+            return None
+
+    def _wrote(self, n: int = 1) -> None:
+        """Count n writes; commit after COMMIT_EVERY writes or COMMIT_INTERVAL_S."""
+        self._pending += n
+        if self._pending >= COMMIT_EVERY or time.monotonic() - self._committed_at >= COMMIT_INTERVAL_S:
+            self.commit()
+
+    def commit(self) -> None:
+        self._conn.commit()
+        self._pending = 0
+        self._committed_at = time.monotonic()
+
+    def _disable(self, exc: sqlite3.OperationalError) -> None:
+        if self.error is None:
+            logger.warning(f"{type(self).__name__} disabled for this run: {exc}")
+            self.error = exc
+
+    def close(self) -> None:
+        """Flush pending writes and close the database."""
+        try:
+            if self.error is None:
+                self.commit()
+        except sqlite3.OperationalError as exc:
+            self._disable(exc)
+        finally:
+            self._conn.close()
+
+    def __enter__(self: _Store) -> _Store:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class FileIndex(SQLiteStore):
+    """SQLiteStore with a ``files`` table of (id, path, size, mtime_ns, ...).
+
+    Rows derived from a file live in FILE_TABLES, keyed by a ``file_id``
+    column; remove() drops them together with the file.
+    """
+
+    FILE_TABLES: tuple[str, ...] = ()
+
+    def is_fresh(self, path: Path, st: os.stat_result) -> bool:
+        """Return True if path is indexed with the same size and mtime."""
+        row = self._conn.execute(
+            "SELECT size, mtime_ns FROM files WHERE path = ?", (str(path),)
+        ).fetchone()
+        return row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns
+
+    def remove(self, paths: Iterable[Path]) -> None:
+        """Drop paths from the index."""
+        for path in paths:
+            row = self._conn.execute("SELECT id FROM files WHERE path = ?", (str(path),)).fetchone()
+            if row is None:
+                continue
+            for table in self.FILE_TABLES:
+                self._conn.execute(f"DELETE FROM {table} WHERE file_id = ?", row)
+            self._conn.execute("DELETE FROM files WHERE id = ?", row)
+
+    def indexed_under(self, root: Path) -> list[Path]:
+        """Return the indexed paths at or below root."""
+        scope, args = path_scope([root])
+        rows = self._conn.execute(f"SELECT path FROM files WHERE {scope}", args)
+        return [Path(p) for (p,) in rows]
+
+
+class BlockCache(SQLiteStore):
+    """SQLite-backed cache of rendered file bodies.
+
+    Entries are keyed by absolute path and render mode and are only reused
+    when the file's size and mtime still match the values recorded at write
+    time. The connection is not shared across threads: look up and store from
+    the thread that drives the snapshot, and let workers do the rendering.
+    """
+
+    FILENAME = "cat-projects.sqlite"
+    VERSION = CACHE_VERSION
+    TABLES = ("blocks",)
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS blocks (
+            path TEXT NOT NULL,
+            mode TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            body TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            digest TEXT,
+            PRIMARY KEY (path, mode)
+        );
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        super().__init__(path)
+        self.hits = 0
+        self.misses = 0
+
+    @best_effort()
+    def get(
+        self, path: Path, mode: str, st: os.stat_result
+    ) -> tuple[str, str, str | None] | None:
+        """Return (body, kind, digest) for path if the entry is still fresh.
+
+        mode is the requested render mode; kind is what was actually produced
+        (e.g. "raw" when summarising fell back on a syntax error) and digest
+        is the content hash of the source file, if known.
+        """
+        row = self._conn.execute(
+            "SELECT size, mtime_ns, body, kind, digest FROM blocks"
+            " WHERE path = ? AND mode = ?",
+            (str(path), mode),
+        ).fetchone()
+        if row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            self.hits += 1
+            return row[2], row[3], row[4]
+        self.misses += 1
+        return None
+
+    @best_effort()
+    def put(
+        self,
+        path: Path,
+        mode: str,
+        st: os.stat_result,
+        body: str,
+        kind: str = "raw",
+        digest: str | None = None,
+    ) -> None:
+        """Store body for path under the given stat signature."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO blocks (path, mode, size, mtime_ns, body, kind, digest)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (str(path), mode, st.st_size, st.st_mtime_ns, body, kind, digest),
+        )
+        self._wrote()
@@ -0,0 +1,68 @@
+"""Bounded reads of oversized content from streams.
+
+Archive members and git blobs are only available as streams of known size.
+read_capped() keeps the head and tail of content larger than a cap and
+skips the middle without holding it, so a multi-gigabyte member costs no
+more memory than the cap. The result is a Clipped value that remembers the
+full size, which the renderer reports as an excerpt.
+"""
+
+from __future__ import annotations
+
+from typing import IO
+
+# Content with a NUL byte in its first SNIFF_BYTES is treated as binary.
+SNIFF_BYTES = 8192
+_SKIP_CHUNK = 1 << 20
+
+
+class Clipped(bytes):
+    """Head and tail of content too large to keep whole.
+
+    The bytes are the head followed by the tail; ``head`` is the length of
+    the head and ``size`` the size of the full content.
+    """
+
+    size: int
+    head: int
+
+    def __new__(cls, head: bytes, tail: bytes, size: int) -> Clipped:
+        self = super().__new__(cls, head + tail)
+        self.size = size
+        self.head = len(head)
+        return self
+
+    def __reduce__(self) -> tuple:
+        return Clipped, (self[: self.head], self[self.head :], self.size)
+
+    @property
+    def head_bytes(self) -> bytes:
+        return bytes(self[: self.head])
+
+    @property
+    def tail_bytes(self) -> bytes:
+        return bytes(self[self.head :])
+
+
+def content_size(data: bytes) -> int:
+    """Return the full size of data, which may be Clipped."""
+    return data.size if isinstance(data, Clipped) else len(data)
+
+
+def skip(f: IO[bytes], n: int) -> None:
+    """Consume n bytes of a stream without keeping them."""
+    while n > 0:
+        chunk = f.read(min(n, _SKIP_CHUNK))
+        if not chunk:
+            return
+        n -= len(chunk)
+
+
+def read_capped(f: IO[bytes], size: int, max_bytes: int | None) -> bytes:
+    """Read size bytes from f, or only its head and tail when size exceeds max_bytes."""
+    if not max_bytes or size <= max_bytes:
+        return f.read(size)
+    half = max_bytes // 2
+    head = f.read(half)
+    skip(f, size - 2 * half)
+    return Clipped(head, f.read(half), size)
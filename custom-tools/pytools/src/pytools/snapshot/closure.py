@@ -0,0 +1,145 @@
+"""Import closure of entry modules for cat-projects.
+
+Starting from one or more entry files, imports are resolved statically with
+``ast`` against the Python files under the snapshot roots and followed
+transitively. The reachable files are returned in dependency order (every
+module after the modules it imports, cycles broken at first visit), so a
+reader meets definitions before their uses.
+
+Resolved edges are cached in SQLite per file, keyed by the file's size and
+mtime and by a fingerprint of the module set, so unchanged files are not
+re-parsed between runs and edges are recomputed when files come or go.
+"""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import os
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+
+from .budget import import_targets, module_index, module_name, python_imports
+from .cache import SQLiteStore, best_effort
+
+
+class EdgeCache(SQLiteStore):
+    """SQLite cache of resolved import edges (absolute target paths)."""
+
+    FILENAME = "cat-projects-imports.sqlite"
+    VERSION = 2
+    TABLES = ("edges",)
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS edges (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            modules TEXT NOT NULL,
+            targets TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        super().__init__(path)
+        self.hits = 0
+        self.misses = 0
+
+    @best_effort()
+    def get(self, path: Path, st: os.stat_result, modules: str) -> list[str] | None:
+        """Return the cached targets of path if the file and module set are unchanged."""
+        row = self._conn.execute(
+            "SELECT size, mtime_ns, modules, targets FROM edges WHERE path = ?", (str(path),)
+        ).fetchone()
+        if row is not None and (row[0], row[1], row[2]) == (st.st_size, st.st_mtime_ns, modules):
+            self.hits += 1
+            return row[3].split("\0") if row[3] else []
+        self.misses += 1
+        return None
+
+    @best_effort()
+    def put(self, path: Path, st: os.stat_result, modules: str, targets: Sequence[str]) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO edges (path, size, mtime_ns, modules, targets)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (str(path), st.st_size, st.st_mtime_ns, modules, "\0".join(targets)),
+        )
+        self._wrote()
+
+
+def _package_inits(path: Path, root: Path) -> Iterator[Path]:
+    """Yield the __init__.py files of the packages containing path, outermost first."""
+    inits = []
+    parent = path.parent
+    while parent != root and root in parent.parents:
+        init = parent / "__init__.py"
+        if not init.is_file():
+            break
+        inits.append(init)
+        parent = parent.parent
+    yield from reversed(inits)
+
+
+def import_closure(
+    entries: Sequence[Path],
+    files: Sequence[tuple[Path, Path]],
+    cache: EdgeCache | None = None,
+) -> list[tuple[Path, Path]]:
+    """Return the (path, relpath) pairs reachable from entries, in dependency order.
+
+    files are the candidate (absolute path, path relative to its root) pairs.
+    Importing a module also pulls in the __init__.py of its enclosing
+    packages. Raises FileNotFoundError for an entry that is not in files.
+    """
+    rels = {path: rel for path, rel in files}
+    names = [module_name(rel.as_posix()) for _, rel in files]
+    paths = [path for path, _ in files]
+    by_name = module_index(names)
+    fingerprint = hashlib.sha1(
+        "\n".join(sorted(f"{p}\t{n}" for p, n in zip(paths, names, strict=True))).encode("utf-8")
+    ).hexdigest()
+    index = {path: i for i, path in enumerate(paths)}
+
+    def _edges(path: Path) -> list[Path]:
+        try:
+            st = path.stat()
+        except OSError:
+            return []
+        cached = cache.get(path, st, fingerprint) if cache is not None else None
+        if cached is not None:
+            return [Path(t) for t in cached]
+        try:
+            imports = python_imports(ast.parse(path.read_bytes(), filename=str(path)))
+        except (OSError, SyntaxError, ValueError):
+            imports = []
+        i = index[path]
+        targets: list[Path] = []
+        for j in import_targets(names[i], path.name == "__init__.py", imports, by_name):
+            root = paths[j].parents[len(rels[paths[j]].parts) - 1]
+            for dep in [*_package_inits(paths[j], root), paths[j]]:
+                if dep in index and dep != path and dep not in targets:
+                    targets.append(dep)
+        if cache is not None:
+            cache.put(path, st, fingerprint, [str(t) for t in targets])
+        return targets
+
+    for entry in entries:
+        if entry not in index:
+            raise FileNotFoundError(f"Closure entry {entry} is not a Python file under the snapshot roots")
+
+    order: list[Path] = []
+    visited: set[Path] = set()
+    for entry in entries:
+        if entry in visited:
+            continue
+        visited.add(entry)
+        stack = [(entry, iter(_edges(entry)))]
+        while stack:
+            node, deps = stack[-1]
+            dep = next(deps, None)
+            if dep is None:
+                stack.pop()
+                order.append(node)
+            elif dep not in visited:
+                visited.add(dep)
+                stack.append((dep, iter(_edges(dep))))
+    return [(path, rels[path]) for path in order]
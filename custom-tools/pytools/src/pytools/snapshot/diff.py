@@ -0,0 +1,146 @@
+"""Block-level diffs between two snapshots.
+
+Snapshots are compared per ``<relpath>`` block by sha256, so only added and
+modified blocks are emitted, followed by a ``<snapshot-diff>`` block that
+lists every change::
+
+    cat-projects diff yesterday.txt today.txt > changes.txt
+    cat-projects src/ --against yesterday.txt > changes.txt
+
+When a snapshot has a manifest (``--manifest``), its hashes are taken from
+the manifest and, for uncompressed snapshots, changed blocks are read by
+seeking to their offsets, so the cost grows with the number of changed
+files rather than with the snapshot size. Otherwise the snapshot is parsed
+in one streaming pass (``.gz`` and ``.zst`` snapshots are decompressed on
+the fly).
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import io
+import re
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+from typing import IO, TextIO
+
+from .manifest import load_manifest, manifest_path
+from .output import compression_for
+
+DIFF_TAG = "snapshot-diff"
+_OPEN = re.compile(r"<([^/<>\n][^<>\n]*)>\n?")
+
+
+def block_hash(block: str) -> str:
+    """Return the sha256 of a block as recorded in manifests."""
+    return hashlib.sha256(block.encode("utf-8")).hexdigest()
+
+
+def _open_text(path: Path) -> IO[str]:
+    compression = compression_for(path)
+    if compression == "gzip":
+        raw: IO[bytes] = gzip.open(path, "rb")
+    elif compression == "zstd":
+        try:
+            from compression import zstd  # type: ignore[import-not-found]
+
+            raw = zstd.open(path, "rb")
+        except ImportError:
+            import zstandard
+
+            raw = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    else:
+        raw = open(path, "rb")
+    return io.TextIOWrapper(raw, encoding="utf-8", newline="")
+
+
+def iter_snapshot_blocks(path: Path) -> Iterator[tuple[str, str]]:
+    """Yield (relpath, block) for every block of a snapshot, in file order.
+
+    Text before the first block (the prompt prefix) is skipped. A block ends
+    at the first line that is exactly its closing tag.
+    """
+    with _open_text(path) as f:
+        rel: str | None = None
+        close = ""
+        lines: list[str] = []
+        for line in f:
+            if rel is None:
+                m = _OPEN.fullmatch(line)
+                if m:
+                    rel, close, lines = m.group(1), f"</{m.group(1)}>", [line]
+                continue
+            lines.append(line)
+            if line.rstrip("\n") == close:
+                yield rel, "".join(lines).rstrip("\n")
+                rel = None
+
+
+def _manifest(path: Path) -> dict | None:
+    mpath = manifest_path(path)
+    return load_manifest(mpath) if mpath.is_file() else None
+
+
+def snapshot_hashes(path: Path) -> dict[str, str]:
+    """Return {relpath: block sha256} for a snapshot, from its manifest if present."""
+    manifest = _manifest(path)
+    if manifest is not None:
+        return {rel: rec["sha256"] for rel, rec in manifest["files"].items()}
+    return {rel: block_hash(block) for rel, block in iter_snapshot_blocks(path)}
+
+
+class DiffSummary:
+    """Collects the status of every block and renders the <snapshot-diff> block."""
+
+    def __init__(self, old: Mapping[str, str]) -> None:
+        self.old = old
+        self.added: list[str] = []
+        self.modified: list[str] = []
+        self._seen: set[str] = set()
+
+    def check(self, rel: str, digest: str) -> bool:
+        """Record rel with its new hash; return True if its block must be emitted."""
+        if rel == DIFF_TAG:
+            return False
+        self._seen.add(rel)
+        before = self.old.get(rel)
+        if before == digest:
+            return False
+        (self.added if before is None else self.modified).append(rel)
+        return True
+
+    @property
+    def removed(self) -> list[str]:
+        return [rel for rel in self.old if rel not in self._seen and rel != DIFF_TAG]
+
+    def block(self) -> str:
+        lines = [f"{len(self.added)} added, {len(self.modified)} modified, {len(self.removed)} removed"]
+        lines += [f"A {rel}" for rel in self.added]
+        lines += [f"M {rel}" for rel in self.modified]
+        lines += [f"D {rel}" for rel in self.removed]
+        body = "\n".join(lines)
+        return f"<{DIFF_TAG}>\n{body}\n</{DIFF_TAG}>"
+
+
+def diff_snapshots(old: Path, new: Path, out: TextIO) -> DiffSummary:
+    """Write the added and modified blocks of new, then the <snapshot-diff> block."""
+    summary = DiffSummary(snapshot_hashes(old))
+    sep = ""
+    manifest = _manifest(new)
+    if manifest is not None and compression_for(new) is None:
+        changed = [
+            (rel, rec) for rel, rec in manifest["files"].items() if summary.check(rel, rec["sha256"])
+        ]
+        with new.open("rb") as f:
+            for _, rec in changed:
+                f.seek(rec["offset"])
+                out.write(sep + f.read(rec["length"]).decode("utf-8"))
+                sep = "\n"
+    else:
+        for rel, block in iter_snapshot_blocks(new):
+            if summary.check(rel, block_hash(block)):
+                out.write(sep + block)
+                sep = "\n"
+    out.write(sep + summary.block())
+    return summary
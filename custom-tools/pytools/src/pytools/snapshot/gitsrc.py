@@ -0,0 +1,147 @@
+"""Git-backed file sources for cat-projects.
+
+Instead of walking the tree, review snapshots take their file list from
+``git diff`` and, for staged snapshots, read content straight from the index
+through a single long-lived ``git cat-file --batch`` process. Snapshots of a
+revision list its tree with ``git ls-tree`` and read blobs the same way.
+"""
+
+from __future__ import annotations
+
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO
+
+from .clip import read_capped
+
+
+class GitError(RuntimeError):
+    """Raised when a git command fails or a path is not inside a repository."""
+
+
+@dataclass(frozen=True)
+class Change:
+    """One entry of ``git diff --name-status``."""
+
+    status: str  # A, M, D, R, C, T, U or ? (untracked)
+    path: str  # repo-relative, forward slashes
+    old_path: str | None = None  # source path for renames and copies
+
+    def describe(self) -> str:
+        if self.old_path:
+            return f"{self.status} {self.old_path} -> {self.path}"
+        return f"{self.status} {self.path}"
+
+
+def _git(repo: Path, *args: str) -> bytes:
+    try:
+        proc = subprocess.run(
+            ["git", "-C", str(repo), *args], capture_output=True, check=False
+        )
+    except FileNotFoundError as exc:
+        raise GitError("git executable not found") from exc
+    if proc.returncode != 0:
+        msg = proc.stderr.decode("utf-8", errors="replace").strip()
+        raise GitError(f"git {' '.join(args)} failed: {msg}")
+    return proc.stdout
+
+
+def git_toplevel(path: Path) -> Path:
+    """Return the top-level directory of the repository containing path."""
+    start = path if path.is_dir() else path.parent
+    out = _git(start, "rev-parse", "--show-toplevel")
+    return Path(out.decode().strip()).resolve()
+
+
+def changed_files(repo: Path, since: str | None = None, staged: bool = False) -> list[Change]:
+    """Return changes relative to since (default HEAD).
+
+    With staged, the index is compared against the revision; otherwise the
+    working tree is, and untracked (non-ignored) files are reported as ``?``.
+    """
+    args = ["diff", "--name-status", "-z", "-M"]
+    if staged:
+        args.append("--cached")
+    args.append(since or "HEAD")
+    args.append("--")
+    fields = _git(repo, *args).decode("utf-8", errors="surrogateescape").split("\0")
+
+    changes: list[Change] = []
+    i = 0
+    while i < len(fields) and fields[i]:
+        status = fields[i][0]
+        if status in "RC":
+            changes.append(Change(status, fields[i + 2], old_path=fields[i + 1]))
+            i += 3
+        else:
+            changes.append(Change(status, fields[i + 1]))
+            i += 2
+
+    if not staged:
+        out = _git(repo, "ls-files", "--others", "--exclude-standard", "-z")
+        for name in out.decode("utf-8", errors="surrogateescape").split("\0"):
+            if name:
+                changes.append(Change("?", name))
+    changes.sort(key=lambda c: c.path)
+    return changes
+
+
+def tree_files(repo: Path, rev: str) -> list[tuple[str, str]]:
+    """Return (path, blob sha) for every regular file in rev's tree, in tree order.
+
+    Symlinks and submodules are skipped.
+    """
+    out = _git(repo, "ls-tree", "-r", "-z", "--full-tree", rev)
+    files: list[tuple[str, str]] = []
+    for record in out.decode("utf-8", errors="surrogateescape").split("\0"):
+        if not record:
+            continue
+        meta, path = record.split("\t", 1)
+        mode, kind, sha = meta.split()
+        if kind == "blob" and mode in ("100644", "100755"):
+            files.append((path, sha))
+    return files
+
+
+class GitBlobReader:
+    """Read blobs through one persistent ``git cat-file --batch`` process.
+
+    Object names use normal revision syntax: ``:path`` for the index,
+    ``REV:path`` for a commit's tree, or a blob sha.
+    """
+
+    def __init__(self, repo: Path) -> None:
+        self._proc = subprocess.Popen(
+            ["git", "-C", str(repo), "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def read(self, name: str, max_bytes: int | None = None) -> bytes | None:
+        """Return the blob content for name, or None if it does not exist.
+
+        Blobs larger than max_bytes come back Clipped to their head and tail
+        (see snapshot.clip); the rest is skipped without being held.
+        """
+        stdin: IO[bytes] = self._proc.stdin  # type: ignore[assignment]
+        stdout: IO[bytes] = self._proc.stdout  # type: ignore[assignment]
+        stdin.write(name.encode("utf-8", errors="surrogateescape") + b"\n")
+        stdin.flush()
+        header = stdout.readline().split()
+        if len(header) != 3:  # "<name> missing" / "ambiguous"
+            return None
+        data = read_capped(stdout, int(header[2]), max_bytes)
+        stdout.read(1)  # trailing newline
+        return data
+
+    def close(self) -> None:
+        if self._proc.stdin:
+            self._proc.stdin.close()
+        self._proc.wait()
+
+    def __enter__(self) -> GitBlobReader:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
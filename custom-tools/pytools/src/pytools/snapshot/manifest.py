@@ -0,0 +1,65 @@
+"""Byte-offset manifest sidecar for snapshot files.
+
+The manifest lists, for every block in a snapshot, its UTF-8 byte offset and
+length, a sha256 of the block and the mode it was rendered in. Consumers can
+``seek`` straight to one file's block instead of re-scanning the snapshot::
+
+    m = load_manifest(manifest_path(Path("snap.txt")))
+    block = read_block(Path("snap.txt"), m["files"]["pkg/mod.py"])
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+def manifest_path(snapshot: Path) -> Path:
+    """Return the sidecar manifest path for a snapshot file."""
+    return snapshot.with_name(snapshot.name + MANIFEST_SUFFIX)
+
+
+class Manifest:
+    """Collects per-block records while a snapshot is being written."""
+
+    def __init__(self, snapshot: str = "") -> None:
+        self.snapshot = snapshot
+        self.files: dict[str, dict[str, Any]] = {}
+
+    def add(self, rel: str, block: str, mode: str, offset: int) -> int:
+        """Record block written at byte offset and return its length in bytes."""
+        data = block.encode("utf-8")
+        self.files[rel] = {
+            "offset": offset,
+            "length": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "mode": mode,
+        }
+        return len(data)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"version": MANIFEST_VERSION, "snapshot": self.snapshot, "files": self.files}
+
+    def save(self, path: Path) -> None:
+        """Write the manifest as JSON."""
+        path.write_text(json.dumps(self.to_dict(), indent=1) + "\n", encoding="utf-8")
+
+
+def load_manifest(path: Path) -> dict[str, Any]:
+    """Load a manifest written by :meth:`Manifest.save`."""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if data.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest version in {path}: {data.get('version')}")
+    return data
+
+
+def read_block(snapshot: Path, record: dict[str, Any]) -> str:
+    """Read one block from an uncompressed snapshot using its manifest record."""
+    with snapshot.open("rb") as f:
+        f.seek(record["offset"])
+        return f.read(record["length"]).decode("utf-8")
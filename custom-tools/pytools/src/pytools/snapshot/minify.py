@@ -0,0 +1,124 @@
+"""Token-minimising transform for Python source.
+
+:func:`minify_python` drops comments, docstrings and blank lines and
+re-indents code with one space per level, using :mod:`tokenize` so the
+result is still valid Python with the same AST apart from the docstrings.
+A docstring that is the only statement of its block becomes ``...``.
+The contents of other strings (including multi-line ones) are never touched.
+"""
+
+from __future__ import annotations
+
+import io
+import tokenize
+
+_SKIP = (tokenize.NL, tokenize.COMMENT)
+_STATEMENT_START = (tokenize.INDENT, tokenize.DEDENT, tokenize.NEWLINE, tokenize.ENCODING)
+# f-strings are split into several tokens from Python 3.12 on.
+_FSTRING_START = getattr(tokenize, "FSTRING_START", -1)
+_FSTRING_END = getattr(tokenize, "FSTRING_END", -1)
+
+
+def _next_significant(tokens: list[tokenize.TokenInfo], i: int) -> int:
+    while i < len(tokens) and tokens[i].type in _SKIP:
+        i += 1
+    return i
+
+
+def minify_python(code: str) -> str:
+    """Return code without comments, docstrings and blank lines, re-indented.
+
+    Raises tokenize.TokenError or SyntaxError (e.g. IndentationError) when
+    code cannot be tokenised.
+    """
+    tokens = list(tokenize.generate_tokens(io.StringIO(code).readline))
+    lines = code.split("\n")
+
+    cuts: dict[int, list[tuple[int, int, str]]] = {}  # row -> (start, end, replacement)
+    dropped: set[int] = set()  # rows removed entirely
+    verbatim: set[int] = set()  # rows inside multi-line strings
+    string_starts: set[int] = set()  # first rows of multi-line strings: no rstrip
+    string_ends: set[int] = set()  # last rows of multi-line strings: no re-indent
+    starts: dict[int, int] = {}  # row of each logical line start -> depth
+    fstrings: list[int] = []  # start rows of open f-strings (Python 3.12+)
+    kept: list[bool] = [True]  # per open block: has a statement survived yet?
+
+    def _cut(tok: tokenize.TokenInfo, replacement: str = "") -> None:
+        (srow, scol), (erow, ecol) = tok.start, tok.end
+        if srow == erow:
+            cuts.setdefault(srow, []).append((scol, ecol, replacement))
+            return
+        cuts.setdefault(srow, []).append((scol, len(lines[srow - 1]), replacement))
+        dropped.update(range(srow + 1, erow))
+        cuts.setdefault(erow, []).append((0, ecol, ""))
+
+    def _span(srow: int, erow: int) -> None:
+        if srow < erow:
+            string_starts.add(srow)
+            verbatim.update(range(srow + 1, erow))
+            string_ends.add(erow)
+
+    depth = 0
+    prev = tokenize.ENCODING
+    at_line_start = True
+    for i, tok in enumerate(tokens):
+        kind = tok.type
+        if kind == tokenize.COMMENT:
+            _cut(tok)
+            continue
+        if kind == tokenize.NL:
+            continue
+        if kind in (tokenize.NEWLINE, tokenize.ENDMARKER):
+            at_line_start, prev = True, kind
+            continue
+        if kind == tokenize.INDENT:
+            depth += 1
+            kept.append(False)
+        elif kind == tokenize.DEDENT:
+            depth -= 1
+            kept.pop()
+        elif at_line_start:
+            starts[tok.start[0]] = depth
+            at_line_start = False
+
+        if kind == tokenize.STRING and prev in _STATEMENT_START:
+            j = _next_significant(tokens, i + 1)
+            if j < len(tokens) and tokens[j].type in (tokenize.NEWLINE, tokenize.ENDMARKER):
+                after = tokens[_next_significant(tokens, j + 1)] if j + 1 < len(tokens) else tokens[j]
+                sole = not kept[-1] and after.type in (tokenize.DEDENT, tokenize.ENDMARKER)
+                _cut(tok, "..." if sole else "")
+                prev = kind
+                continue
+
+        if kind not in (tokenize.INDENT, tokenize.DEDENT):
+            kept[-1] = True
+        if kind == _FSTRING_START:
+            fstrings.append(tok.start[0])
+        elif kind == _FSTRING_END:
+            _span(fstrings.pop(), tok.end[0])
+        elif kind == tokenize.STRING:
+            _span(tok.start[0], tok.end[0])
+        prev = kind
+
+    out: list[str] = []
+    depth = 0
+    for row, line in enumerate(lines, start=1):
+        if row in verbatim:
+            out.append(line)
+            continue
+        if row in dropped:
+            continue
+        for start, end, replacement in sorted(cuts.get(row, ()), reverse=True):
+            line = line[:start] + replacement + line[end:]
+        if row not in string_starts:
+            line = line.rstrip()
+        if not line.strip():
+            continue
+        if row in string_ends:
+            out.append(line)  # leading whitespace belongs to the string
+        elif row in starts:
+            depth = starts[row]
+            out.append(" " * depth + line.lstrip())
+        else:
+            out.append(" " * (depth + 1) + line.lstrip())
+    return "\n".join(out) + "\n" if out else ""
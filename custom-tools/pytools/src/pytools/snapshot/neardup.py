@@ -0,0 +1,126 @@
+"""Near-duplicate detection for cat-projects with MinHash and LSH banding.
+
+Each body is cut into shingles of SHINGLE_TOKENS consecutive tokens, and
+the shingles are hashed once with crc32. The signature uses one-permutation
+MinHash: the low bits of each hash pick one of NUM_PERM bins, and each bin
+keeps its minimum. Empty bins borrow the value of the next non-empty bin.
+This costs a single pass over the shingles rather than one pass per
+permutation. The signature is split into BANDS bands. Two bodies become candidates when any
+band is identical. Each candidate is verified by the fraction of equal
+signature slots, which estimates Jaccard similarity. Each file only touches
+its own buckets, so a pass over the tree takes close to linear time.
+
+Matching is incremental and keeps walk order. A file is compared against the
+representatives seen before it. When it is similar enough, it is emitted as
+a compact diff against that representative instead of in full::
+
+    [near-duplicate of api/v1/client.py]
+    @@ -3,3 +3,3 @@
+     def fetch(self):
+    -    return self.get("/v1/items")
+    +    return self.get("/v2/items")
+"""
+
+from __future__ import annotations
+
+import difflib
+import itertools
+import re
+import zlib
+
+SHINGLE_TOKENS = 5
+NUM_PERM = 64  # power of two: bins are picked by the low bits of each hash
+BANDS = 16
+# Candidates verified per file, so a bucket of boilerplate cannot go quadratic.
+MAX_CANDIDATES = 32
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_BIN_BITS = NUM_PERM.bit_length() - 1
+_EMPTY = 1 << 32
+
+
+def signature(text: str) -> tuple[int, ...]:
+    """Return the MinHash signature of text's token shingles."""
+    tokens = _TOKEN.findall(text)
+    k = min(SHINGLE_TOKENS, len(tokens)) or 1
+    hashes = {
+        zlib.crc32(" ".join(tokens[i : i + k]).encode("utf-8")) for i in range(len(tokens) - k + 1)
+    }
+    bins = [_EMPTY] * NUM_PERM
+    mask = NUM_PERM - 1
+    for h in hashes:
+        b, v = h & mask, h >> _BIN_BITS
+        if v < bins[b]:
+            bins[b] = v
+    filled = [i for i, v in enumerate(bins) if v != _EMPTY]
+    if not filled:
+        return (0,) * NUM_PERM
+    for i in range(NUM_PERM):
+        if bins[i] == _EMPTY:
+            j = next((f for f in filled if f > i), filled[0])
+            bins[i] = bins[j]
+    return tuple(bins)
+
+
+def similarity(a: tuple[int, ...], b: tuple[int, ...]) -> float:
+    """Estimate the Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(a, b, strict=True)) / len(a)
+
+
+def compact_diff(old: str, new: str) -> str:
+    """Return a unified diff (one line of context, no file headers) from old to new."""
+    lines = difflib.unified_diff(old.splitlines(), new.splitlines(), lineterm="", n=1)
+    return "\n".join(itertools.islice(lines, 2, None))
+
+
+class NearDuplicateIndex:
+    """LSH index of representative bodies, queried in walk order."""
+
+    def __init__(self, threshold: float = 0.8) -> None:
+        self.threshold = threshold
+        self._rows = NUM_PERM // BANDS
+        self._buckets: list[dict[tuple[int, ...], list[str]]] = [{} for _ in range(BANDS)]
+        self._signatures: dict[str, tuple[int, ...]] = {}
+        self._bodies: dict[str, str] = {}
+
+    def _bands(self, sig: tuple[int, ...]) -> list[tuple[int, ...]]:
+        r = self._rows
+        return [sig[i * r : (i + 1) * r] for i in range(BANDS)]
+
+    def match(self, body: str) -> tuple[str | None, tuple[int, ...]]:
+        """Return (most similar representative at or above threshold or None, signature)."""
+        sig = signature(body)
+        seen: set[str] = set()
+        best, best_sim = None, self.threshold
+        for bucket, band in zip(self._buckets, self._bands(sig), strict=True):
+            for key in bucket.get(band, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                sim = similarity(sig, self._signatures[key])
+                if sim >= best_sim:
+                    best, best_sim = key, sim
+                if len(seen) >= MAX_CANDIDATES:
+                    return best, sig
+        return best, sig
+
+    def add(self, key: str, body: str, sig: tuple[int, ...]) -> None:
+        """Make body (with signature sig from match) a representative."""
+        self._signatures[key] = sig
+        self._bodies[key] = body
+        for bucket, band in zip(self._buckets, self._bands(sig), strict=True):
+            bucket.setdefault(band, []).append(key)
+
+    def collapse(self, key: str, body: str) -> tuple[str, str] | None:
+        """Return (representative, diff) when body is a near duplicate worth collapsing.
+
+        Otherwise body becomes a representative itself and None is returned.
+        The diff is used only when it is under half the size of body.
+        """
+        first, sig = self.match(body)
+        if first is not None:
+            diff = compact_diff(self._bodies[first], body)
+            if len(diff) < len(body) // 2:
+                return first, diff
+        self.add(key, body, sig)
+        return None
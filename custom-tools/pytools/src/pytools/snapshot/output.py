@@ -0,0 +1,77 @@
+"""Output targets for cat-projects snapshots, compressed by file extension.
+
+``.gz`` files are written with gzip and ``.zst`` files with zstd, using the
+standard library ``compression.zstd`` module (Python 3.14+) or the
+``zstandard`` package. Data is compressed as it is written, so a snapshot
+never has to be held in memory.
+"""
+
+from __future__ import annotations
+
+import gzip
+import io
+from pathlib import Path
+from typing import IO
+
+COMPRESSIONS: dict[str, str] = {".gz": "gzip", ".zst": "zstd"}
+
+
+def compression_for(path: Path) -> str | None:
+    """Return the compression implied by path's extension, or None."""
+    return COMPRESSIONS.get(path.suffix.lower())
+
+
+def zstd_available() -> bool:
+    """Return True if zstd output can be written."""
+    for name in ("compression.zstd", "zstandard"):
+        try:
+            __import__(name)
+        except ImportError:
+            continue
+        return True
+    return False
+
+
+def _open_zstd(path: Path, level: int | None) -> IO[bytes]:
+    try:
+        from compression import zstd  # type: ignore[import-not-found]
+
+        return zstd.open(path, "wb", level=level)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError(
+            f"Cannot write {path}: zstd output needs Python 3.14+ or the 'zstandard' package"
+        ) from None
+    cctx = zstandard.ZstdCompressor(level=3 if level is None else level)
+    return cctx.stream_writer(open(path, "wb"), closefd=True)
+
+
+def open_output(
+    path: Path,
+    *,
+    compression: str | None = "auto",
+    binary: bool = False,
+    level: int | None = None,
+) -> IO:
+    """Open path for writing, compressing on the fly.
+
+    compression is "gzip", "zstd", None for plain output, or "auto" to pick
+    from the extension. Text streams are UTF-8 with newlines written as-is.
+    Raises ValueError when the compression is unknown or unavailable.
+    """
+    if compression == "auto":
+        compression = compression_for(path)
+    if compression is None:
+        raw: IO[bytes] = open(path, "wb")
+    elif compression == "gzip":
+        raw = gzip.open(path, "wb", compresslevel=6 if level is None else level)
+    elif compression == "zstd":
+        raw = _open_zstd(path, level)
+    else:
+        raise ValueError(f"Unknown compression {compression!r}")
+    if binary:
+        return raw
+    return io.TextIOWrapper(raw, encoding="utf-8", newline="", write_through=False)
@@ -0,0 +1,111 @@
+"""Per-phase profiling for cat-projects snapshots.
+
+The pipeline overlaps its phases, so they are measured differently: ``walk``
+and ``write`` are wall time spent in the driving thread, while ``read`` and
+``summarise`` are the summed per-file time reported by the workers. ``total``
+is the wall time of the whole run.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, TextIO, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class FileTiming:
+    """Time spent rendering one file."""
+
+    rel: str
+    size: int
+    read_s: float
+    summarise_s: float
+
+    @property
+    def total_s(self) -> float:
+        return self.read_s + self.summarise_s
+
+
+class SnapshotProfile:
+    """Collects phase and per-file timings for one snapshot run."""
+
+    def __init__(self) -> None:
+        self.phases: dict[str, float] = {"walk": 0.0, "read": 0.0, "summarise": 0.0, "write": 0.0}
+        self.files: list[FileTiming] = []
+        self.cached = 0
+        self._start = time.perf_counter()
+        self._end: float | None = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Add the wall time of the enclosed block to phase name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def timed_iter(self, name: str, items: Iterable[T]) -> Iterator[T]:
+        """Yield from items, charging the time spent producing each to phase name."""
+        it = iter(items)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    def add_file(self, rel: str, size: int, read_s: float, summarise_s: float) -> None:
+        self.files.append(FileTiming(rel, size, read_s, summarise_s))
+        self.phases["read"] += read_s
+        self.phases["summarise"] += summarise_s
+
+    def finish(self) -> None:
+        self._end = time.perf_counter()
+
+    @property
+    def total_s(self) -> float:
+        return (self._end or time.perf_counter()) - self._start
+
+    def to_dict(self, top: int = 20) -> dict[str, Any]:
+        total = self.total_s
+        n_files = len(self.files) + self.cached
+        size = sum(f.size for f in self.files)
+        slowest = sorted(self.files, key=lambda f: f.total_s, reverse=True)[:top]
+        return {
+            "total_s": total,
+            "phases_s": dict(self.phases),
+            "files": n_files,
+            "cached_files": self.cached,
+            "bytes_read": size,
+            "files_per_s": n_files / total if total else 0.0,
+            "bytes_per_s": size / total if total else 0.0,
+            "slowest": [
+                {"path": f.rel, "size": f.size, "read_s": f.read_s, "summarise_s": f.summarise_s}
+                for f in slowest
+            ],
+        }
+
+    def report(self, stream: TextIO, top: int = 20) -> None:
+        """Print a human-readable summary to stream."""
+        data = self.to_dict(top)
+        stream.write(f"profile: {data['files']} files in {data['total_s']:.3f}s "
+                     f"({data['files_per_s']:.0f} files/s, "
+                     f"{data['bytes_per_s'] / 1e6:.2f} MB/s, {data['cached_files']} cached)\n")
+        phases = ", ".join(f"{k} {v:.3f}s" for k, v in data["phases_s"].items())
+        stream.write(f"profile: phases: {phases} (read/summarise are summed worker time)\n")
+        if data["slowest"]:
+            stream.write(f"profile: slowest {len(data['slowest'])} files:\n")
+            for f in data["slowest"]:
+                stream.write(f"  {f['read_s'] + f['summarise_s']:8.4f}s  {f['size']:>10}  {f['path']}\n")
+
+    def save(self, path: Path, top: int = 20) -> None:
+        path.write_text(json.dumps(self.to_dict(top), indent=2) + "\n", encoding="utf-8")
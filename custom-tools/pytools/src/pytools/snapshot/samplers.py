@@ -0,0 +1,329 @@
+"""Head/schema samplers for data files in cat-projects snapshots.
+
+Large ``.json``, ``.jsonl``/``.ndjson`` and ``.csv`` files are replaced by
+their first records, a compact schema inferred from those records and a
+row-count estimate from the file size::
+
+    [jsonl sample: 1.8 GB, ~4,200,000 records (estimated)]
+    schema:
+      id: int
+      name: str
+      tags: list[str]
+      meta: {score: float, ok: bool}
+      note: str?
+    first 3 records:
+    {"id": 1, ...}
+
+Files are read as streams and reading stops after the sampled records (or
+SAMPLE_READ_BYTES), so multi-gigabyte files cost the same as small ones.
+Notebooks (``.ipynb``) are converted to their cell sources with outputs
+dropped; they are parsed in full, so notebooks above the file size cap are
+left to the caller's head/tail excerpt instead.
+"""
+
+from __future__ import annotations
+
+import codecs
+import csv
+import json
+from collections.abc import Callable, Iterator
+from typing import IO, Any
+
+SAMPLE_ROWS = 5
+# json/jsonl/csv files below this size are emitted as they are.
+SAMPLE_MIN_BYTES = 64 * 1024
+# Upper bound on the bytes read while sampling one file.
+SAMPLE_READ_BYTES = 4 * 1024 * 1024
+# Line-based row counts are estimated from at least this many leading bytes.
+ESTIMATE_BYTES = 64 * 1024
+MAX_RECORD_CHARS = 400
+MAX_SCHEMA_DEPTH = 2
+_CHUNK = 64 * 1024
+
+# (binary stream, size in bytes, records to keep) -> body
+Sampler = Callable[[IO[bytes], int, int], str]
+
+
+def _human(size: int) -> str:
+    value = float(size)
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{size} B"
+
+
+def _clip(text: str) -> str:
+    return text if len(text) <= MAX_RECORD_CHARS else text[: MAX_RECORD_CHARS - 1] + "…"
+
+
+def _type_of(value: Any, depth: int = 0) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float, str)):
+        return type(value).__name__
+    if isinstance(value, list):
+        inner = sorted({_type_of(v, depth + 1) for v in value[:20]})
+        return f"list[{'|'.join(inner)}]" if inner else "list"
+    if isinstance(value, dict):
+        if depth >= MAX_SCHEMA_DEPTH:
+            return "object"
+        fields = ", ".join(f"{k}: {_type_of(v, depth + 1)}" for k, v in list(value.items())[:20])
+        return f"{{{fields}}}"
+    return type(value).__name__
+
+
+def _schema(records: list[Any]) -> list[str]:
+    """Return one 'key: type' line per key of dict records (else the record types)."""
+    if not records or not all(isinstance(r, dict) for r in records):
+        return ["  " + "|".join(sorted({_type_of(r) for r in records}) or ["empty"])]
+    types: dict[str, set[str]] = {}
+    counts: dict[str, int] = {}
+    for record in records:
+        for key, value in record.items():
+            types.setdefault(key, set()).add(_type_of(value, 1))
+            counts[key] = counts.get(key, 0) + 1
+    return [
+        f"  {key}: {'|'.join(sorted(t))}{'' if counts[key] == len(records) else '?'}"
+        for key, t in types.items()
+    ]
+
+
+def _render(kind: str, size: int, records: list[Any], estimate: int | None, note: str = "") -> str:
+    head = f"[{kind} sample: {_human(size)}"
+    if estimate is not None:
+        head += f", ~{estimate:,} records (estimated)"
+    head += f"{note}]"
+    lines = [head, "schema:", *_schema(records), f"first {len(records)} records:"]
+    lines += [_clip(json.dumps(r, ensure_ascii=False)) for r in records]
+    return "\n".join(lines)
+
+
+def _estimate(size: int, consumed: int, n: int) -> int | None:
+    return round(size / (consumed / n)) if n and consumed else None
+
+
+def _estimate_lines(f: IO[bytes], size: int, consumed: int, lines: int) -> int | None:
+    """Estimate the line count of f by reading on to ESTIMATE_BYTES from consumed."""
+    while consumed < ESTIMATE_BYTES:
+        line = f.readline(ESTIMATE_BYTES)
+        if not line:
+            return lines
+        consumed += len(line)
+        lines += 1
+    return _estimate(size, consumed, lines)
+
+
+class _JsonStream:
+    """Incremental reader for values at the start of a JSON document."""
+
+    def __init__(self, f: IO[bytes]) -> None:
+        self._f = f
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._json = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.read = 0  # bytes read so far
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof or self.read >= SAMPLE_READ_BYTES:
+            return False
+        chunk = self._f.read(_CHUNK)
+        self.read += len(chunk)
+        if not chunk:
+            self.eof = True
+        self.buf = self.buf[self.pos :] + self._decoder.decode(chunk, final=not chunk)
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character ('' at the end)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos : self.pos + 1]
+
+    def take(self, char: str) -> bool:
+        if self.peek() == char:
+            self.pos += 1
+            return True
+        return False
+
+    def value(self) -> Any:
+        """Decode the next value, reading more input as needed (ValueError if too large)."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue  # a number may continue in the next chunk
+            self.pos = end
+            return value
+
+    def consumed(self) -> int:
+        """Approximate bytes consumed so far."""
+        pending = len(self.buf) - self.pos
+        return max(0, self.read - pending)
+
+
+def _array_records(s: _JsonStream, rows: int) -> tuple[list[Any], bool]:
+    """Read up to rows elements of an array whose '[' was consumed; return (records, complete)."""
+    records: list[Any] = []
+    if s.take("]"):
+        return records, True
+    while len(records) < rows:
+        records.append(s.value())
+        if s.take("]"):
+            return records, True
+        if not s.take(","):
+            raise ValueError("malformed JSON array")
+    return records, False
+
+
+def sample_json(f: IO[bytes], size: int, rows: int) -> str:
+    """Sample a JSON document: the first records of its top-level (or first nested) array."""
+    s = _JsonStream(f)
+    if s.take("["):
+        records, complete = _array_records(s, rows)
+        estimate = len(records) if complete else _estimate(size, s.consumed(), len(records))
+        return _render("json", size, records, estimate, ", top-level array")
+    if not s.take("{"):
+        return _render("json", size, [s.value()], None)
+
+    members: dict[str, Any] = {}
+    while s.peek() not in ("}", ""):
+        key = s.value()
+        if not s.take(":"):
+            raise ValueError("malformed JSON object")
+        if s.take("["):
+            start = s.consumed()
+            records, complete = _array_records(s, rows)
+            estimate = (
+                len(records) if complete else _estimate(size - start, s.consumed() - start, len(records))
+            )
+            other = f", other keys: {', '.join(members)}" if members else ""
+            return _render("json", size, records, estimate, f", records under key {key!r}{other}")
+        try:
+            members[key] = s.value()
+        except ValueError:
+            members[key] = "…"
+            break
+        if not s.take(","):
+            break
+    return _render("json", size, [members], None, ", top-level object")
+
+
+def sample_jsonl(f: IO[bytes], size: int, rows: int) -> str:
+    """Sample newline-delimited JSON: the first rows records."""
+    records: list[Any] = []
+    consumed = lines = 0
+    while len(records) < rows and consumed < SAMPLE_READ_BYTES:
+        line = f.readline(SAMPLE_READ_BYTES)
+        if not line:
+            break
+        consumed += len(line)
+        lines += 1
+        if line.strip():
+            records.append(json.loads(line))
+    return _render("jsonl", size, records, _estimate_lines(f, size, consumed, lines))
+
+
+def _cell_type(value: str) -> str:
+    if not value:
+        return "empty"
+    for kind, cast in (("int", int), ("float", float)):
+        try:
+            cast(value)
+        except ValueError:
+            continue
+        return kind
+    return "str"
+
+
+def sample_csv(f: IO[bytes], size: int, rows: int) -> str:
+    """Sample a CSV file: header, inferred column types and the first rows."""
+    consumed = lines = 0
+
+    def _lines() -> Iterator[str]:
+        nonlocal consumed, lines
+        while consumed < SAMPLE_READ_BYTES:
+            line = f.readline(SAMPLE_READ_BYTES)
+            if not line:
+                return
+            consumed += len(line)
+            lines += 1
+            yield line.decode("utf-8", errors="replace")
+
+    reader = csv.reader(_lines())
+    header = next(reader, [])
+    body = [row for _, row in zip(range(rows), reader, strict=False)]
+    columns = []
+    for i, name in enumerate(header):
+        kinds = sorted({_cell_type(row[i]) for row in body if i < len(row)} - {"empty"})
+        columns.append(f"  {name}: {'|'.join(kinds) or 'empty'}")
+    estimate = _estimate_lines(f, size, consumed, lines)
+    head = f"[csv sample: {_human(size)}"
+    if estimate is not None:
+        head += f", ~{max(0, estimate - 1):,} rows (estimated)"
+    lines = [head + "]", "columns:", *columns, f"first {len(body)} rows:", ",".join(header)]
+    lines += [_clip(",".join(row)) for row in body]
+    return "\n".join(lines)
+
+
+def sample_notebook(f: IO[bytes], size: int, rows: int) -> str:
+    """Return a notebook's cell sources in percent format, outputs dropped.
+
+    Raises ValueError when the JSON does not have the shape of a notebook.
+    """
+    nb = json.load(f)
+    cells = nb.get("cells", []) if isinstance(nb, dict) else None
+    if not isinstance(cells, list) or not all(isinstance(cell, dict) for cell in cells):
+        raise ValueError("not a notebook: expected an object with a list of cells")
+    metadata = nb.get("metadata")
+    kernelspec = metadata.get("kernelspec") if isinstance(metadata, dict) else None
+    language = kernelspec.get("language", "python") if isinstance(kernelspec, dict) else "python"
+    parts = [f"[notebook: {language}, {len(cells)} cells, outputs stripped]"]
+    for cell in cells:
+        source = cell.get("source", "")
+        if isinstance(source, list) and all(isinstance(line, str) for line in source):
+            source = "".join(source)
+        if not isinstance(source, str):
+            raise ValueError("not a notebook: cell source is not text")
+        parts.append(f"# %% [{cell.get('cell_type', 'code')}]\n{source.rstrip()}")
+    return "\n\n".join(parts)
+
+
+SAMPLERS: dict[str, Sampler] = {
+    ".json": sample_json,
+    ".jsonl": sample_jsonl,
+    ".ndjson": sample_jsonl,
+    ".csv": sample_csv,
+    ".ipynb": sample_notebook,
+}
+# Sampled whatever their size.
+ALWAYS_SAMPLED = frozenset({".ipynb"})
+
+
+# Parsed in full rather than streamed, so only sampled up to the file size cap.
+PARSED_IN_FULL = frozenset({".ipynb"})
+
+
+def sampler_for(suffix: str, size: int, max_bytes: int | None = None) -> Sampler | None:
+    """Return the sampler for a file with this suffix and size, if it should be sampled.
+
+    max_bytes is the file size cap; files parsed in full are not sampled above it.
+    """
+    suffix = suffix.lower()
+    if suffix not in SAMPLERS or (size < SAMPLE_MIN_BYTES and suffix not in ALWAYS_SAMPLED):
+        return None
+    if max_bytes and size > max_bytes and suffix in PARSED_IN_FULL:
+        return None
+    return SAMPLERS[suffix]
@@ -0,0 +1,127 @@
+"""Persistent BM25 search index for query-driven snapshots.
+
+Every file is reduced to a bag of terms: identifiers (whole, lower-cased,
+and split at underscores and camelCase humps) and the words of comments and
+strings. The term frequencies are stored as postings in SQLite next to the
+block cache. Files are re-scanned only when their size or mtime changes.
+A query reads only the postings of its own terms, so ranking takes
+milliseconds even on large trees::
+
+    cat-projects src/ --query "fix MCP tools/call argument parsing" --top 8
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import re
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from .cache import FileIndex, path_scope
+from .clip import SNIFF_BYTES
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Only the start of larger files is indexed.
+SCAN_MAX_BYTES = 1_000_000
+
+_IDENT = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_PARTS = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+STOPWORDS = frozenset(
+    """
+    a an and are as at be by for from if in is it of on or the this to with
+    def class self return import none true false not elif else pass cls
+    """.split()
+)
+
+
+def terms(text: str) -> Iterator[str]:
+    """Yield the index terms of text (identifiers and their sub-words)."""
+    for ident in _IDENT.findall(text):
+        low = ident.lower().strip("_")
+        if len(low) > 1 and low not in STOPWORDS:
+            yield low
+        parts = _PARTS.findall(ident)
+        if len(parts) > 1:
+            for part in parts:
+                part = part.lower()
+                if len(part) > 1 and part not in STOPWORDS:
+                    yield part
+
+
+def scan_terms(path: Path) -> Counter[str] | None:
+    """Return the term frequencies of path's first SCAN_MAX_BYTES; None for
+    unreadable or binary files."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read(SCAN_MAX_BYTES)
+    except OSError:
+        return None
+    if b"\0" in data[:SNIFF_BYTES]:
+        return None
+    return Counter(terms(data.decode("utf-8", errors="replace")))
+
+
+class SearchIndex(FileIndex):
+    """SQLite inverted index with BM25 ranking."""
+
+    FILENAME = "cat-projects-search.sqlite"
+    VERSION = 1
+    TABLES = ("files", "postings")
+    FILE_TABLES = ("postings",)
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            length INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS postings (
+            term TEXT NOT NULL,
+            file_id INTEGER NOT NULL,
+            tf INTEGER NOT NULL,
+            PRIMARY KEY (term, file_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS postings_file ON postings (file_id);
+    """
+
+    def replace(self, path: Path, st: os.stat_result, counts: Counter[str]) -> None:
+        """Store the term frequencies of path, replacing anything indexed before."""
+        self.remove([path])
+        cur = self._conn.execute(
+            "INSERT INTO files (path, size, mtime_ns, length) VALUES (?, ?, ?, ?)",
+            (str(path), st.st_size, st.st_mtime_ns, sum(counts.values())),
+        )
+        file_id = cur.lastrowid
+        self._conn.executemany(
+            "INSERT INTO postings (term, file_id, tf) VALUES (?, ?, ?)",
+            [(term, file_id, tf) for term, tf in counts.items()],
+        )
+        self._wrote()
+
+    def rank(self, query: str, roots: Iterable[Path] = ()) -> list[tuple[float, Path]]:
+        """Return (BM25 score, path) for files under roots matching query, best first."""
+        scope, scope_args = path_scope(roots, "f.path")
+        n, avgdl = self._conn.execute(
+            f"SELECT COUNT(*), AVG(f.length) FROM files f WHERE {scope}", scope_args
+        ).fetchone()
+        if not n:
+            return []
+        avgdl = avgdl or 1.0
+        scores: dict[str, float] = {}
+        for term in sorted(set(terms(query))):
+            rows = self._conn.execute(
+                "SELECT f.path, p.tf, f.length FROM postings p JOIN files f ON f.id = p.file_id"
+                f" WHERE p.term = ? AND {scope}",
+                [term, *scope_args],
+            ).fetchall()
+            idf = math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            for path, tf, length in rows:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avgdl)
+                scores[path] = scores.get(path, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+        return [(score, Path(path)) for path, score in best]
+
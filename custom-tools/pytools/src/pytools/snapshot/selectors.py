@@ -0,0 +1,164 @@
+"""Symbol selectors (``path::Class.method``) for cat-projects.
+
+A selector names a Python file and a dotted symbol pattern; each component
+is matched with ``fnmatch`` and the number of components must agree::
+
+    src/pkg/mod.py::Registry.get    one method
+    src/pkg/mod.py::Registry.*      every method of Registry
+    src/pkg/mod.py::*               every top-level class and function
+
+Only the exact source lines of the matched symbols (decorators included)
+are emitted, each preceded by the header lines of its enclosing classes.
+The position index (qualname, line span and class header span of every
+class and function) is built with ``ast`` and cached in SQLite per file,
+keyed by size and mtime, so unchanged files are not re-parsed.
+"""
+
+from __future__ import annotations
+
+import ast
+import fnmatch
+import json
+import os
+from collections.abc import Iterable
+from pathlib import Path
+from typing import NamedTuple
+
+from .cache import SQLiteStore, best_effort
+
+SEPARATOR = "::"
+
+
+class SelectorError(ValueError):
+    """Raised when a selector's file cannot be parsed or nothing matches."""
+
+
+class Symbol(NamedTuple):
+    qualname: str
+    kind: str  # class, function, method
+    start: int  # first line, decorators included (1-based)
+    end: int  # last line
+    header_end: int  # last line of a class header, before its body
+
+
+def parse_selector(arg: str) -> tuple[str, str] | None:
+    """Split ``path::pattern`` into (path, pattern), or None for a plain path."""
+    path, sep, pattern = arg.partition(SEPARATOR)
+    if not sep:
+        return None
+    return path, pattern or "*"
+
+
+def _first_line(node: ast.stmt) -> int:
+    """Return the first line of a statement, decorators included."""
+    decorators = getattr(node, "decorator_list", [])
+    return min([node.lineno] + [d.lineno for d in decorators])
+
+
+def index_positions(tree: ast.Module) -> list[Symbol]:
+    """Return the classes and functions of a module with their line spans."""
+    symbols: list[Symbol] = []
+
+    def _visit(body: Iterable[ast.stmt], prefix: str, in_class: bool) -> None:
+        for node in body:
+            if not isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                continue
+            qual = f"{prefix}{node.name}"
+            start = _first_line(node)
+            end = node.end_lineno or node.lineno
+            if isinstance(node, ast.ClassDef):
+                header_end = max(node.lineno, _first_line(node.body[0]) - 1)
+                symbols.append(Symbol(qual, "class", start, end, header_end))
+                _visit(node.body, qual + ".", True)
+            else:
+                kind = "method" if in_class else "function"
+                symbols.append(Symbol(qual, kind, start, end, end))
+                _visit(node.body, qual + ".", False)
+
+    _visit(tree.body, "", False)
+    return symbols
+
+
+class PositionCache(SQLiteStore):
+    """SQLite cache of per-file symbol positions."""
+
+    FILENAME = "cat-projects-positions.sqlite"
+    VERSION = 2
+    TABLES = ("positions",)
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS positions (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            symbols TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        super().__init__(path)
+        self.hits = 0
+        self.misses = 0
+
+    @best_effort()
+    def get(self, path: Path, st: os.stat_result) -> list[Symbol] | None:
+        """Return the cached symbols of path if its size and mtime are unchanged."""
+        row = self._conn.execute(
+            "SELECT size, mtime_ns, symbols FROM positions WHERE path = ?", (str(path),)
+        ).fetchone()
+        if row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            self.hits += 1
+            return [Symbol(*s) for s in json.loads(row[2])]
+        self.misses += 1
+        return None
+
+    @best_effort()
+    def put(self, path: Path, st: os.stat_result, symbols: list[Symbol]) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO positions (path, size, mtime_ns, symbols) VALUES (?, ?, ?, ?)",
+            (str(path), st.st_size, st.st_mtime_ns, json.dumps(symbols)),
+        )
+        self._wrote()
+
+
+def _matches(qualname: str, pattern: str) -> bool:
+    names, pats = qualname.split("."), pattern.split(".")
+    return len(names) == len(pats) and all(fnmatch.fnmatchcase(n, p) for n, p in zip(names, pats, strict=True))
+
+
+def extract(path: Path, pattern: str, cache: PositionCache | None = None) -> str:
+    """Return the source of the symbols of path matching pattern, with class headers.
+
+    Raises FileNotFoundError if path does not exist and SelectorError if it
+    cannot be parsed or no symbol matches.
+    """
+    st = path.stat()
+    data = path.read_bytes()
+    symbols = cache.get(path, st) if cache is not None else None
+    if symbols is None:
+        try:
+            symbols = index_positions(ast.parse(data, filename=str(path)))
+        except (SyntaxError, ValueError) as exc:
+            raise SelectorError(f"Cannot parse {path}: {exc}") from exc
+        if cache is not None:
+            cache.put(path, st, symbols)
+
+    selected = [s for s in symbols if _matches(s.qualname, pattern)]
+    if not selected:
+        raise SelectorError(f"No symbol in {path} matches {pattern!r}")
+    by_name = {s.qualname: s for s in symbols}
+    lines = data.decode("utf-8", errors="replace").splitlines()
+
+    out: list[str] = []
+    emitted: set[int] = set()
+    for sym in sorted(selected, key=lambda s: s.start):
+        if sym.start in emitted:  # inside a symbol already emitted
+            continue
+        parts = sym.qualname.split(".")
+        for i in range(1, len(parts)):
+            parent = by_name.get(".".join(parts[:i]))
+            if parent is not None and parent.kind == "class" and parent.start not in emitted:
+                out.extend(lines[parent.start - 1 : parent.header_end])
+                emitted.add(parent.start)
+        out.extend(lines[sym.start - 1 : sym.end])
+        emitted.update(range(sym.start, sym.end + 1))
+    return "\n".join(out)
@@ -0,0 +1,173 @@
+"""Sharded snapshot output with a size limit per shard.
+
+Blocks are written in walk order to ``snap.001.txt``, ``snap.002.txt``, ...
+(compressed by extension like any output, e.g. ``snap.001.txt.gz``). A block
+is never split, and the blocks of one directory go to the same shard whenever
+they fit in one: a directory that does not fit in the current shard starts a
+new one. Each shard repeats the prefix and is closed as soon as it is full,
+so consumers can start on it while later shards are still being written.
+
+Sizes are measured on the uncompressed text, in UTF-8 bytes or estimated
+tokens. A single block larger than the limit gets a shard of its own.
+
+The shard index (``snap.txt.shards.json``) lists every shard with its size
+and, for each block, its byte offset, length and mode::
+
+    index = load_shard_index(shard_index_path(Path("snap.txt")))
+    for shard in index["shards"]:
+        print(shard["path"], list(shard["files"]))
+"""
+
+from __future__ import annotations
+
+import json
+import posixpath
+from collections.abc import Callable
+from pathlib import Path
+from typing import IO, Any
+
+from .budget import estimate_tokens
+from .output import COMPRESSIONS, open_output
+
+SHARD_INDEX_VERSION = 1
+SHARD_INDEX_SUFFIX = ".shards.json"
+UNITS = ("bytes", "tokens")
+
+
+def shard_path(output: Path, n: int) -> Path:
+    """Return the path of shard n (1-based) for output, e.g. snap.002.txt.gz."""
+    name, comp = output.name, ""
+    if output.suffix.lower() in COMPRESSIONS:
+        name, comp = name[: -len(output.suffix)], output.suffix
+    base = Path(name)
+    return output.with_name(f"{base.stem}.{n:03d}{base.suffix}{comp}")
+
+
+def shard_index_path(output: Path) -> Path:
+    """Return the sidecar shard index path for output."""
+    return output.with_name(output.name + SHARD_INDEX_SUFFIX)
+
+
+def _utf8_len(text: str) -> int:
+    return len(text.encode("utf-8"))
+
+
+class ShardWriter:
+    """Distributes blocks over size-limited shard files."""
+
+    def __init__(
+        self,
+        output: Path,
+        limit: int,
+        *,
+        unit: str = "bytes",
+        prefix: str = "",
+        on_shard: Callable[[Path], None] | None = None,
+    ) -> None:
+        if unit not in UNITS:
+            raise ValueError(f"Unknown shard unit {unit!r}")
+        if limit <= 0:
+            raise ValueError("Shard size must be positive")
+        self.output = output
+        self.limit = limit
+        self.unit = unit
+        self.shards: list[dict[str, Any]] = []
+        self._measure: Callable[[str], int] = _utf8_len if unit == "bytes" else estimate_tokens
+        self._prefix = prefix.strip()
+        self._on_shard = on_shard
+        self._out: IO[str] | None = None
+        self._used = 0  # size of the current shard in self.unit
+        self._offset = 0  # UTF-8 byte offset in the current shard
+        self._dir: str | None = None
+        self._group: list[tuple[str, str, str, int]] = []  # (rel, block, mode, size)
+
+    def _base(self) -> int:
+        return self._measure(self._prefix) if self._prefix else 0
+
+    def _open_next(self) -> None:
+        self._close_current()
+        path = shard_path(self.output, len(self.shards) + 1)
+        self._out = open_output(path)
+        self.shards.append({"path": path.name, "size": 0, "bytes": 0, "files": {}})
+        self._used = self._offset = 0
+        if self._prefix:
+            self._out.write(self._prefix)
+            self._used = self._base()
+            self._offset = _utf8_len(self._prefix)
+
+    def _close_current(self) -> None:
+        if self._out is None:
+            return
+        self._out.close()
+        self._out = None
+        shard = self.shards[-1]
+        shard["size"], shard["bytes"] = self._used, self._offset
+        if self._on_shard is not None:
+            self._on_shard(self.output.with_name(shard["path"]))
+
+    def _fits(self, size: int) -> bool:
+        return self._out is not None and self._used + size <= self.limit
+
+    def _place(self, rel: str, block: str, mode: str, size: int) -> None:
+        if self._out is None or (self.shards[-1]["files"] and not self._fits(size)):
+            self._open_next()
+        assert self._out is not None
+        files = self.shards[-1]["files"]
+        sep = "\n" if files or self._prefix else ""
+        self._out.write(sep + block)
+        self._offset += len(sep)
+        length = _utf8_len(block)
+        files[rel] = {"offset": self._offset, "length": length, "mode": mode}
+        self._offset += length
+        self._used += size
+
+    def _flush_group(self) -> None:
+        if not self._group:
+            return
+        total = sum(item[3] for item in self._group)
+        fresh = self._base() + total <= self.limit
+        if fresh and self._out is not None and self.shards[-1]["files"] and not self._fits(total):
+            self._open_next()  # keep the directory together in a new shard
+        for item in self._group:
+            self._place(*item)
+        self._group.clear()
+
+    def add(self, rel: str, block: str, mode: str) -> None:
+        """Queue block; blocks are written once their directory is complete."""
+        directory = posixpath.dirname(rel)
+        if directory != self._dir:
+            self._flush_group()
+            self._dir = directory
+        self._group.append((rel, block, mode, self._measure("\n" + block)))
+
+    def close(self) -> None:
+        """Write any queued blocks and close the last shard."""
+        self._flush_group()
+        self._close_current()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "version": SHARD_INDEX_VERSION,
+            "snapshot": self.output.name,
+            "limit": self.limit,
+            "unit": self.unit,
+            "shards": self.shards,
+        }
+
+    def save_index(self, path: Path) -> None:
+        """Write the shard index as JSON."""
+        path.write_text(json.dumps(self.to_dict(), indent=1) + "\n", encoding="utf-8")
+
+    def __enter__(self) -> ShardWriter:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def load_shard_index(path: Path) -> dict[str, Any]:
+    """Load a shard index written by :meth:`ShardWriter.save_index`."""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if data.get("version") != SHARD_INDEX_VERSION:
+        raise ValueError(f"Unsupported shard index version in {path}: {data.get('version')}")
+    return data
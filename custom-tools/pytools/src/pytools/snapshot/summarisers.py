@@ -0,0 +1,244 @@
+"""Summariser registry for cat-projects, keyed by file extension.
+
+A summariser takes ``(text, relpath)`` and returns a compact outline of the
+file, or None to emit it raw. The built-in extractors are regex based: each
+file is masked once (comments and string bodies removed) and scanned line by
+line with brace-depth tracking, so no parser is needed and they run in linear
+time. They list top-level declarations and the members of classes,
+interfaces, traits and impls, each with the first line of its doc comment::
+
+    ▸ export class Store extends Base: In-memory key/value store.
+    • async get(key: string): Promise<Value>: Fetch one value.
+
+Register another language with :func:`register_summariser`. Registrations
+made at import time are visible to process-pool workers.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from pathlib import PurePath
+
+Summariser = Callable[[str, str], str | None]
+
+MAX_LINE_LEN = 120
+# Continuation lines joined while looking for the end of a signature.
+MAX_JOIN_LINES = 20
+
+SUMMARISERS: dict[str, Summariser] = {}
+
+
+def register_summariser(exts: Iterable[str], fn: Summariser) -> None:
+    """Use fn to summarise files with any of the given extensions."""
+    for ext in exts:
+        SUMMARISERS[ext.lower()] = fn
+
+
+def summariser_for(path: str | PurePath) -> Summariser | None:
+    """Return the summariser registered for path's extension, if any."""
+    return SUMMARISERS.get(PurePath(path).suffix.lower())
+
+
+def _line(label: str, doc: str | None) -> str:
+    text = re.sub(r"\s+", " ", f"{label}: {doc}" if doc else label).strip()
+    return text if len(text) <= MAX_LINE_LEN else text[: MAX_LINE_LEN - 3] + "…"
+
+
+def _comment_text(comment: str) -> str:
+    """Return the first meaningful line of a // or /* */ comment."""
+    for raw in comment.splitlines():
+        line = raw.strip().lstrip("/*!").rstrip("*/").strip()
+        if line and not line.startswith("@"):
+            return line
+    return ""
+
+
+def _mask(text: str, strings: str) -> tuple[list[str], dict[int, str], set[int]]:
+    """Strip comments and string bodies from C-like source.
+
+    Returns the code lines (line count preserved), the comment text starting
+    on each line and the set of lines covered by comments.
+    """
+    rx = re.compile(rf"(?P<comment>//[^\n]*|/\*.*?\*/)|(?P<string>{strings})", re.S)
+    out: list[str] = []
+    comments: dict[int, str] = {}
+    covered: set[int] = set()
+    pos = lineno = 0
+    for m in rx.finditer(text):
+        out.append(text[pos : m.start()])
+        lineno += text.count("\n", pos, m.start())
+        tok = m.group()
+        newlines = tok.count("\n")
+        if m.lastgroup == "comment":
+            comments.setdefault(lineno, _comment_text(tok))
+            covered.update(range(lineno, lineno + newlines + 1))
+            out.append("\n" * newlines)
+        else:
+            out.append(tok[0] + "\n" * newlines + tok[-1])
+        lineno += newlines
+        pos = m.end()
+    out.append(text[pos:])
+    return "".join(out).split("\n"), comments, covered
+
+
+# Heads of declarations whose braces are the interesting part.
+_KEEP_WHOLE = re.compile(r"export(?:\s+type)?|(?:export\s+)?(?:declare\s+)?type\s+\w[^=]*=")
+
+
+def _header(stmt: str) -> str:
+    """Cut a declaration at the start of its body.
+
+    Only ``export { a, b }`` and ``type T = { ... }`` are kept whole.
+    """
+    full = stmt.rstrip(";,").strip()
+    depth = 0
+    for i, c in enumerate(stmt):
+        if c in "([":
+            depth += 1
+        elif c in ")]":
+            depth -= 1
+        elif depth == 0 and (c == "{" or stmt.startswith("=>", i)):
+            head = (stmt[: i + 2] if c == "=" else stmt[:i]).strip()
+            return full if c == "{" and _KEEP_WHOLE.fullmatch(head) else head
+    return full
+
+
+@dataclass(frozen=True)
+class BraceLanguage:
+    """Declaration patterns for a brace-delimited language."""
+
+    strings: str  # regex for string/char literals
+    top: re.Pattern[str]  # declarations listed at depth 0
+    scope: re.Pattern[str]  # top-level declarations whose members are listed
+    member: re.Pattern[str]  # members listed at depth 1 inside a scope
+    skip: re.Pattern[str]  # lines (decorators, attributes) that keep the pending doc
+    keywords: frozenset[str] = frozenset()  # member-like names that are statements
+    plain: re.Pattern[str] | None = None  # declarations shown up to "=" only
+
+    def summarise(self, text: str, path: str = "") -> str | None:
+        lines, comments, covered = _mask(text, self.strings)
+        out: list[str] = []
+        depth, in_scope = 0, False
+        doc: str | None = None
+        prev_comment = False
+        i, n = 0, len(lines)
+        while i < n:
+            code = lines[i].strip()
+            if not code:
+                if i in comments:
+                    if not prev_comment:
+                        doc = comments[i]
+                    prev_comment = True
+                elif i not in covered:
+                    doc, prev_comment = None, False
+                i += 1
+                continue
+            prev_comment = False
+            if depth == 0 and self.skip.match(code):
+                i += 1
+                continue
+            stmt, j = code, i
+            while stmt.count("(") > stmt.count(")") and j + 1 < n and j - i < MAX_JOIN_LINES:
+                j += 1
+                stmt += " " + lines[j].strip()
+
+            if depth == 0:
+                if self.top.match(stmt):
+                    if self.plain is not None and self.plain.match(stmt):
+                        label = stmt.split("=", 1)[0].strip()
+                    else:
+                        label = _header(stmt)
+                    out.append(_line(f"▸ {label}", doc))
+                    in_scope = self.scope.match(stmt) is not None
+            elif depth == 1 and in_scope:
+                m = self.member.match(stmt)
+                if m and m.group(1) not in self.keywords:
+                    out.append(_line(f"• {_header(stmt)}", doc))
+
+            before = depth
+            depth = max(0, depth + stmt.count("{") - stmt.count("}"))
+            if depth == 0 and before > 0:
+                in_scope = False
+            doc = None
+            i = j + 1
+        return "\n".join(out) or None
+
+
+JAVASCRIPT = BraceLanguage(
+    strings=r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|`(?:\\.|[^`\\])*`',
+    top=re.compile(
+        r"(?:export\s+(?:default\s+)?)?(?:declare\s+)?(?:abstract\s+)?(?:async\s+)?"
+        r"(?:function\b|class\b|interface\b|enum\b|namespace\b|type\s+[\w$]+)"
+        r"|(?:export\s+)?(?:const|let|var)\s+[\w$]+\s*(?::[^=]+)?=\s*(?:async\s+)?"
+        r"(?:function\b|\([^)]*\)\s*(?::[^=]+)?=>|[\w$]+\s*=>)"
+        r"|export\s+(?:default\b|const\b|let\b|var\b|\{|\*)|module\.exports\b|exports\.[\w$]+\s*="
+    ),
+    scope=re.compile(r"(?:export\s+(?:default\s+)?)?(?:declare\s+)?(?:abstract\s+)?(?:class|interface)\b"),
+    member=re.compile(
+        r"(?:(?:public|private|protected|static|readonly|abstract|override|async|get|set|declare)\s+)*"
+        r"\*?(#?[\w$]+)\s*\??\s*(?:<[^>]*>)?\s*\("
+    ),
+    skip=re.compile(r"@[\w$]"),
+    keywords=frozenset({"if", "for", "while", "switch", "catch", "return", "function", "new", "await", "super"}),
+    plain=re.compile(r"export\s+(?:const|let|var)\s+[\w$]+\s*(?::[^=]+)?=(?!.*=>)|module\.exports|exports\."),
+)
+
+GO = BraceLanguage(
+    strings=r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|`[^`]*`',
+    top=re.compile(r"func\b|type\s+\w+|(?:var|const)\s+[A-Z]\w*"),
+    scope=re.compile(r"type\s+\w+(?:\[[^\]]*\])?\s+interface\b"),
+    member=re.compile(r"([A-Za-z_]\w*)\s*\("),
+    skip=re.compile(r"$^"),
+    plain=re.compile(r"(?:var|const)\s"),
+)
+
+RUST = BraceLanguage(
+    # Only single-character quotes, so lifetimes ('a) are left alone.
+    strings=r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\\n])\'',
+    top=re.compile(
+        r"(?:pub(?:\([^)]*\))?\s+)?(?:(?:async|const|unsafe|extern(?:\s+\"\")?)\s+)*"
+        r"(?:fn|struct|enum|trait|type|union|mod|impl)\b|(?:unsafe\s+)?impl\b|macro_rules!"
+    ),
+    scope=re.compile(r"(?:unsafe\s+)?impl\b|(?:pub(?:\([^)]*\))?\s+)?(?:unsafe\s+)?trait\b"),
+    member=re.compile(r"(?:pub(?:\([^)]*\))?\s+)?(?:(?:async|const|unsafe|extern(?:\s+\"\")?)\s+)*fn\s+(\w+)"),
+    skip=re.compile(r"#!?\["),
+)
+
+_SH_FUNC = re.compile(r"\s*(?:function\s+([\w:.-]+)\s*(?:\(\s*\))?|([\w:.-]+)\s*\(\s*\))\s*\{?\s*$")
+_SH_DECL = re.compile(r"(?:export\s+([A-Za-z_]\w*)=|alias\s+([\w.:-]+)=)")
+
+
+def summarise_shell(text: str, path: str = "") -> str | None:
+    """Outline a shell script: header comment, functions, exports and aliases."""
+    out: list[str] = []
+    doc: str | None = None
+    lines = text.splitlines()
+    start = 1 if lines and lines[0].startswith("#!") else 0
+    header = next((ln.lstrip("# ").strip() for ln in lines[start:] if ln.strip()), "")
+    if lines[start:] and lines[start].startswith("#") and header:
+        out.append(_line("▸ Script", header))
+        start += 1  # the header documents the script, not the first declaration
+    for raw in lines[start:]:
+        stripped = raw.strip()
+        if stripped.startswith("#"):
+            if doc is None:
+                doc = stripped.lstrip("# ").strip() or None
+            continue
+        m = _SH_FUNC.match(raw)
+        if m:
+            out.append(_line(f"▸ function {m.group(1) or m.group(2)}", doc))
+        else:
+            m = _SH_DECL.match(stripped)
+            if m:
+                kind = "export" if m.group(1) else "alias"
+                out.append(_line(f"▸ {kind} {m.group(1) or m.group(2)}", doc))
+        doc = None
+    return "\n".join(out) or None
+
+
+register_summariser((".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx", ".mts", ".cts"), JAVASCRIPT.summarise)
+register_summariser((".go",), GO.summarise)
+register_summariser((".rs",), RUST.summarise)
+register_summariser((".sh", ".bash", ".zsh"), summarise_shell)
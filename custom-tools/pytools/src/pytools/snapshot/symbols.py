@@ -0,0 +1,189 @@
+"""Persistent Python symbol index for cat-projects.
+
+Definitions (modules, classes, functions, methods), imports and name
+references are extracted from each file's AST and stored in SQLite next to
+the block cache. Files are re-parsed only when their size or mtime changes,
+and lookups hit indexed columns, so ``cat-projects query --refs Foo`` answers
+without scanning the tree::
+
+    cat-projects index src/
+    cat-projects query --defs Store
+    cat-projects query --refs Store src/pkg
+"""
+
+from __future__ import annotations
+
+import ast
+import os
+from collections.abc import Iterable
+from pathlib import Path
+from typing import NamedTuple
+
+from .cache import FileIndex, path_scope
+
+
+class Definition(NamedTuple):
+    name: str
+    qualname: str
+    kind: str  # module, class, function, method
+    line: int
+
+
+class Reference(NamedTuple):
+    name: str
+    line: int
+    kind: str  # import, name, attr
+
+
+class Hit(NamedTuple):
+    """One query result."""
+
+    path: str
+    line: int
+    name: str
+    kind: str
+
+    def __str__(self) -> str:
+        return f"{self.path}:{self.line}: {self.kind} {self.name}"
+
+
+def extract_symbols(tree: ast.Module, module: str) -> tuple[list[Definition], list[Reference]]:
+    """Return the definitions and references found in a parsed module."""
+    defs = [Definition(module.rsplit(".", 1)[-1], module, "module", 1)]
+    refs: set[Reference] = set()
+
+    def _visit(body: Iterable[ast.stmt], prefix: str, in_class: bool) -> None:
+        for node in body:
+            if isinstance(node, ast.ClassDef):
+                qual = f"{prefix}{node.name}"
+                defs.append(Definition(node.name, qual, "class", node.lineno))
+                _visit(node.body, qual + ".", True)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                qual = f"{prefix}{node.name}"
+                kind = "method" if in_class else "function"
+                defs.append(Definition(node.name, qual, kind, node.lineno))
+                _visit(node.body, qual + ".", False)
+            else:
+                for child in ast.iter_child_nodes(node):
+                    if isinstance(child, ast.stmt):
+                        _visit([child], prefix, in_class)
+
+    _visit(tree.body, "", False)
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                refs.add(Reference(alias.name, node.lineno, "import"))
+                refs.add(Reference(alias.name.rsplit(".", 1)[-1], node.lineno, "import"))
+        elif isinstance(node, ast.ImportFrom):
+            if node.module:
+                refs.add(Reference(node.module, node.lineno, "import"))
+            for alias in node.names:
+                if alias.name != "*":
+                    refs.add(Reference(alias.name, node.lineno, "import"))
+        elif isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Store):
+            refs.add(Reference(node.id, node.lineno, "name"))
+        elif isinstance(node, ast.Attribute):
+            refs.add(Reference(node.attr, node.lineno, "attr"))
+    return defs, sorted(refs, key=lambda r: (r.line, r.name, r.kind))
+
+
+def scan_file(path: Path, module: str) -> tuple[list[Definition], list[Reference]] | None:
+    """Parse path and extract its symbols; None if it cannot be read or parsed."""
+    try:
+        tree = ast.parse(path.read_bytes(), filename=str(path))
+    except (OSError, SyntaxError, ValueError):
+        return None
+    return extract_symbols(tree, module)
+
+
+class SymbolIndex(FileIndex):
+    """SQLite store of per-file definitions and references."""
+
+    FILENAME = "cat-projects-symbols.sqlite"
+    VERSION = 1
+    TABLES = ("files", "defs", "refs")
+    FILE_TABLES = ("defs", "refs")
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            module TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS defs (
+            file_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            qualname TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            line INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS refs (
+            file_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            line INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS defs_name ON defs (name);
+        CREATE INDEX IF NOT EXISTS defs_qualname ON defs (qualname);
+        CREATE INDEX IF NOT EXISTS defs_file ON defs (file_id);
+        CREATE INDEX IF NOT EXISTS refs_name ON refs (name);
+        CREATE INDEX IF NOT EXISTS refs_file ON refs (file_id);
+    """
+
+    def replace(
+        self,
+        path: Path,
+        st: os.stat_result,
+        module: str,
+        defs: Iterable[Definition],
+        refs: Iterable[Reference],
+    ) -> None:
+        """Store the symbols of path, replacing anything indexed before."""
+        self.remove([path])
+        cur = self._conn.execute(
+            "INSERT INTO files (path, size, mtime_ns, module) VALUES (?, ?, ?, ?)",
+            (str(path), st.st_size, st.st_mtime_ns, module),
+        )
+        file_id = cur.lastrowid
+        self._conn.executemany(
+            "INSERT INTO defs (file_id, name, qualname, kind, line) VALUES (?, ?, ?, ?, ?)",
+            [(file_id, *d) for d in defs],
+        )
+        self._conn.executemany(
+            "INSERT INTO refs (file_id, name, kind, line) VALUES (?, ?, ?, ?)",
+            [(file_id, r.name, r.kind, r.line) for r in refs],
+        )
+        self._wrote()
+
+    def _scoped(self, sql: str, args: list, roots: Iterable[Path]) -> list[Hit]:
+        scope, scope_args = path_scope(roots, "f.path")
+        sql += f" AND {scope} ORDER BY f.path, 2"
+        return [Hit(*row) for row in self._conn.execute(sql, args + scope_args)]
+
+    def definitions(self, name: str, roots: Iterable[Path] = ()) -> list[Hit]:
+        """Return definitions whose name or qualified name is name."""
+        sql = (
+            "SELECT f.path, d.line, d.qualname, d.kind FROM defs d JOIN files f ON f.id = d.file_id"
+            " WHERE (d.name = ? OR d.qualname = ?)"
+        )
+        return self._scoped(sql, [name, name], roots)
+
+    def references(self, name: str, roots: Iterable[Path] = ()) -> list[Hit]:
+        """Return imports and uses of name (the last dotted component is matched too)."""
+        names = {name, name.rsplit(".", 1)[-1]}
+        marks = ", ".join("?" * len(names))
+        sql = (
+            "SELECT f.path, r.line, r.name, r.kind FROM refs r JOIN files f ON f.id = r.file_id"
+            f" WHERE r.name IN ({marks})"
+        )
+        return self._scoped(sql, sorted(names), roots)
+
+    def stats(self) -> tuple[int, int, int]:
+        """Return (files, definitions, references) counts."""
+        return tuple(  # type: ignore[return-value]
+            self._conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+            for t in ("files", "defs", "refs")
+        )
+
@@ -0,0 +1,407 @@
+"""Watch-mode snapshot daemon for cat-projects.
+
+The daemon keeps every file's rendered block in memory and re-renders only
+the files whose size or mtime changed. The assembled snapshot is cached as
+bytes and served over a Unix socket (each connection receives the current
+snapshot and is closed) and/or rewritten atomically to a file.
+
+Changes are detected with inotify on Linux: the events name the files that
+changed, and only those are re-stat'ed. The tree is re-walked when the event
+queue overflows, a directory is created, moved or removed, or an ignore file
+changes. Without inotify (or when it runs out of watches) the daemon polls
+and re-walks the tree every interval. Fetch a snapshot with::
+
+    nc -U /tmp/snap.sock > snapshot.txt
+    # or from Python: fetch_snapshot(Path("/tmp/snap.sock"))
+"""
+
+from __future__ import annotations
+
+import concurrent.futures as cf
+import ctypes
+import ctypes.util
+import os
+import select
+import socket
+import socketserver
+import stat
+import struct
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any
+
+from .output import compression_for, open_output
+from .walk import IGNORE_FILES
+
+# inotify event masks (linux/inotify.h)
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+)
+# Directory events that change the set of walked directories.
+DIR_CHANGES = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+# struct inotify_event header: wd, mask, cookie, len (name follows).
+_EVENT = struct.Struct("iIII")
+
+# Files are listed as (path, relpath); directories are reported through the
+# callback so the watcher can follow them.
+ListFiles = Callable[[Callable[[str], None]], Iterable[tuple[Path, Path]]]
+# Render returns the block for a file, or None to leave it out.
+Render = Callable[[Path, Path], str | None]
+# Accept returns the relpath of a new file that belongs in the snapshot, or None.
+Accept = Callable[[Path], Path | None]
+# Files to re-render: (path, relpath, (size, mtime_ns)).
+Stale = list[tuple[Path, Path, tuple[int, int]]]
+
+
+class PollingWatcher:
+    """Fallback watcher: report a possible change every interval seconds."""
+
+    def __init__(self, interval: float = 1.0) -> None:
+        self.interval = interval
+
+    def watch(self, directory: str) -> bool:
+        return True
+
+    def wait(self, timeout: float) -> bool:
+        time.sleep(min(timeout, self.interval))
+        return True
+
+    def changes(self) -> set[str] | None:
+        return None
+
+    def prune(self, keep: set[str]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Directory watcher backed by Linux inotify (through ctypes)."""
+
+    def __init__(self) -> None:
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watched: dict[str, int] = {}  # directory -> watch descriptor
+        self._dirs: dict[int, str] = {}
+        self._changed: set[str] = set()
+        self._rescan = False
+
+    @classmethod
+    def available(cls) -> bool:
+        if not sys.platform.startswith("linux"):
+            return False
+        try:
+            cls().close()
+        except (OSError, AttributeError):
+            return False
+        return True
+
+    def watch(self, directory: str) -> bool:
+        """Add a watch for directory; return False when the kernel refuses."""
+        if directory in self._watched:
+            return True
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            return ctypes.get_errno() == 2  # ENOENT: directory vanished, not fatal
+        old = self._dirs.get(wd)
+        if old is not None and old != directory:  # same directory, moved
+            self._watched.pop(old, None)
+        self._watched[directory] = wd
+        self._dirs[wd] = directory
+        return True
+
+    def prune(self, keep: set[str]) -> None:
+        """Remove the watches of directories that are no longer walked."""
+        for directory in [d for d in self._watched if d not in keep]:
+            wd = self._watched.pop(directory)
+            if self._dirs.get(wd) == directory:
+                del self._dirs[wd]
+                self._libc.inotify_rm_watch(self._fd, wd)
+
+    def wait(self, timeout: float) -> bool:
+        """Block up to timeout seconds; return True if anything changed."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return False
+        # Let a burst of writes settle, then drain everything queued.
+        time.sleep(0.05)
+        while True:
+            try:
+                buf = os.read(self._fd, 1 << 16)
+            except BlockingIOError:
+                break
+            if not buf:
+                break
+            self._parse(buf)
+        return self._rescan or bool(self._changed)
+
+    def _parse(self, buf: bytes) -> None:
+        """Record the files named by the inotify_event records in buf."""
+        pos = 0
+        while pos + _EVENT.size <= len(buf):
+            wd, mask, _, length = _EVENT.unpack_from(buf, pos)
+            name = os.fsdecode(buf[pos + _EVENT.size : pos + _EVENT.size + length].rstrip(b"\0"))
+            pos += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                self._rescan = True
+                continue
+            if mask & IN_IGNORED:  # the watch is gone (directory removed)
+                directory = self._dirs.pop(wd, None)
+                if directory is not None and self._watched.get(directory) == wd:
+                    del self._watched[directory]
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF) or (mask & IN_ISDIR and mask & DIR_CHANGES):
+                self._rescan = True
+            elif not mask & IN_ISDIR:
+                if name in IGNORE_FILES:
+                    self._rescan = True
+                else:
+                    self._changed.add(os.path.join(directory, name))
+
+    def changes(self) -> set[str] | None:
+        """Return the files changed since the last call, or None if the tree must be re-walked."""
+        changed, rescan = self._changed, self._rescan
+        self._changed, self._rescan = set(), False
+        return None if rescan else changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def make_watcher(poll_interval: float = 1.0) -> InotifyWatcher | PollingWatcher:
+    """Return an inotify watcher when possible, else a polling one."""
+    if InotifyWatcher.available():
+        return InotifyWatcher()
+    return PollingWatcher(poll_interval)
+
+
+class SnapshotDaemon:
+    """Keeps a snapshot hot in memory and refreshes only changed files."""
+
+    def __init__(
+        self,
+        list_files: ListFiles,
+        render: Render,
+        prefix: str = "",
+        workers: int = 8,
+        accept: Accept | None = None,
+        order_key: Callable[[Path], Any] | None = None,
+    ) -> None:
+        self._list_files = list_files
+        self._render = render
+        self._prefix = prefix.strip()
+        self._workers = workers
+        self._accept = accept
+        self._order_key = order_key
+        # path -> ((size, mtime_ns), relpath, block or None)
+        self._blocks: dict[Path, tuple[tuple[int, int], Path, str | None]] = {}
+        self._order: list[Path] = []
+        self._snapshot = b""
+        self._lock = threading.Lock()
+        self.watcher: InotifyWatcher | PollingWatcher = PollingWatcher()
+
+    def refresh(self, paths: Iterable[str] | None = None) -> int:
+        """Re-render changed files and return how many changed.
+
+        With paths (the files a watcher reported) only those are re-checked;
+        otherwise, or when a new file cannot be placed, the tree is re-walked.
+        """
+        rechecked = self._recheck(paths) if paths is not None else None
+        order, stale = rechecked if rechecked is not None else self._walk()
+
+        removed = set(self._blocks) - set(order)
+        if not stale and not removed and order == self._order:
+            return 0
+
+        with cf.ThreadPoolExecutor(max_workers=self._workers) as pool:
+            blocks = pool.map(lambda job: self._render(job[0], job[1]), stale)
+            for (path, rel, sig), block in zip(stale, blocks, strict=True):
+                self._blocks[path] = (sig, rel, block)
+        for path in removed:
+            del self._blocks[path]
+        self._order = order
+
+        parts = [self._prefix] if self._prefix else []
+        for path in order:
+            block = self._blocks[path][2]
+            if block is not None:
+                parts.append(block)
+        snapshot = "\n".join(parts).encode("utf-8")
+        with self._lock:
+            self._snapshot = snapshot
+        return len(stale) + len(removed)
+
+    def _recheck(self, paths: Iterable[str]) -> tuple[list[Path], Stale] | None:
+        """Re-stat only paths; return (order, stale), or None if a full walk is needed."""
+        stale: Stale = []
+        gone: set[Path] = set()
+        added: list[Path] = []
+        for path in map(Path, sorted(set(paths))):
+            try:
+                st = path.stat()
+            except OSError:
+                st = None
+            if st is not None and not stat.S_ISREG(st.st_mode):
+                st = None
+            known = self._blocks.get(path)
+            if known is not None:
+                if st is None:
+                    gone.add(path)
+                elif known[0] != (st.st_size, st.st_mtime_ns):
+                    stale.append((path, known[1], (st.st_size, st.st_mtime_ns)))
+                continue
+            if st is None:
+                continue
+            if self._accept is None or self._order_key is None:
+                return None
+            rel = self._accept(path)
+            if rel is not None:
+                stale.append((path, rel, (st.st_size, st.st_mtime_ns)))
+                added.append(path)
+        order = [p for p in self._order if p not in gone] if gone else list(self._order)
+        if added:
+            order.extend(added)
+            order.sort(key=self._order_key)
+        return order, stale
+
+    def _walk(self) -> tuple[list[Path], Stale]:
+        """Re-walk the tree (re-adding watches) and return (order, stale)."""
+        order: list[Path] = []
+        stale: Stale = []
+        walked: set[str] = set()
+        watch_ok = True
+
+        def _on_dir(directory: str) -> None:
+            nonlocal watch_ok
+            walked.add(directory)
+            watch_ok = self.watcher.watch(directory) and watch_ok
+
+        for path, rel in self._list_files(_on_dir):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            sig = (st.st_size, st.st_mtime_ns)
+            order.append(path)
+            known = self._blocks.get(path)
+            if known is None or known[0] != sig:
+                stale.append((path, rel, sig))
+
+        if not watch_ok and not isinstance(self.watcher, PollingWatcher):
+            sys.stderr.write("cat-projects: inotify watch limit reached, falling back to polling\n")
+            self.watcher.close()
+            self.watcher = PollingWatcher()
+        else:
+            self.watcher.prune(walked)
+        return order, stale
+
+    def snapshot(self) -> bytes:
+        """Return the current snapshot as UTF-8 bytes."""
+        with self._lock:
+            return self._snapshot
+
+    def write_file(self, path: Path) -> None:
+        """Atomically replace path with the current snapshot (compressed by extension)."""
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open_output(tmp, compression=compression_for(path), binary=True) as f:
+            f.write(self.snapshot())
+        os.replace(tmp, path)
+
+    def serve_socket(self, path: Path) -> socketserver.BaseServer:
+        """Serve the snapshot on a Unix socket from a background thread.
+
+        A stale socket at path is replaced; raises FileExistsError when
+        anything else is there.
+        """
+        daemon = self
+
+        class _Handler(socketserver.BaseRequestHandler):
+            def handle(self) -> None:
+                self.request.sendall(daemon.snapshot())
+
+        try:
+            mode = path.stat().st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(mode):
+                raise FileExistsError(f"{path} exists and is not a socket")
+            path.unlink()
+        server = socketserver.ThreadingUnixStreamServer(str(path), _Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def run(
+        self,
+        *,
+        socket_path: Path | None = None,
+        output: Path | None = None,
+        poll_interval: float = 1.0,
+        stop: threading.Event | None = None,
+        on_refresh: Callable[[int], None] | None = None,
+    ) -> None:
+        """Refresh on every change until stop is set (or KeyboardInterrupt)."""
+        stop = stop or threading.Event()
+        self.watcher = make_watcher(poll_interval)
+        changed = self.refresh()
+        if output is not None:
+            self.write_file(output)
+        if on_refresh is not None:
+            on_refresh(changed)
+        server = self.serve_socket(socket_path) if socket_path is not None else None
+        try:
+            while not stop.is_set():
+                if not self.watcher.wait(poll_interval):
+                    continue
+                changed = self.refresh(self.watcher.changes())
+                if changed:
+                    if output is not None:
+                        self.write_file(output)
+                    if on_refresh is not None:
+                        on_refresh(changed)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+                if socket_path is not None and socket_path.exists():
+                    socket_path.unlink()
+            self.watcher.close()
+
+
+def fetch_snapshot(path: Path) -> str:
+    """Read the current snapshot from a daemon's Unix socket."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(str(path))
+        chunks = []
+        while True:
+            chunk = sock.recv(1 << 16)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b"".join(chunks).decode("utf-8")
@@ -0,0 +1,788 @@
+"""Tests for the cat-projects snapshot tool."""
+
+from pathlib import Path
+
+from pytools.cat_projects import make_snapshot
+from pytools.snapshot import BlockCache
+
+
+def _make_tree(root: Path) -> None:
+    (root / "pkg").mkdir()
+    (root / "pkg" / "a.py").write_text('def f(x):\n    """Add one."""\n    return x + 1\n')
+    (root / "pkg" / "b.py").write_text("VALUE = 1\n")
+
+
+def test_snapshot_contains_blocks(tmp_path):
+    """Every matched file is wrapped in <relpath> tags."""
+    _make_tree(tmp_path)
+    out = make_snapshot([tmp_path], prefix="")
+    assert "<pkg/a.py>\ndef f(x):" in out
+    assert "<pkg/b.py>\nVALUE = 1\n\n</pkg/b.py>" in out
+
+
+def test_block_cache_hits_and_invalidation(tmp_path):
+    """Unchanged files are served from the cache; edited files are re-read."""
+    src = tmp_path / "src"
+    src.mkdir()
+    _make_tree(src)
+
+    with BlockCache(tmp_path / "cache.sqlite") as cache:
+        first = make_snapshot([src], prefix="", cache=cache)
+        assert (cache.hits, cache.misses) == (0, 2)
+
+    with BlockCache(tmp_path / "cache.sqlite") as cache:
+        assert make_snapshot([src], prefix="", cache=cache) == first
+        assert (cache.hits, cache.misses) == (2, 0)
+
+    (src / "pkg" / "b.py").write_text("VALUE = 22\n")
+    with BlockCache(tmp_path / "cache.sqlite") as cache:
+        out = make_snapshot([src], prefix="", cache=cache)
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert "VALUE = 22" in out
+
+
+def test_iter_paths_prunes_and_honours_gitignore(tmp_path):
+    """Ignored directories are skipped and .gitignore rules apply per directory."""
+    from pytools.cat_projects import iter_paths
+
+    (tmp_path / "node_modules" / "dep").mkdir(parents=True)
+    (tmp_path / "node_modules" / "dep" / "x.py").write_text("")
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "gen.py").write_text("")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "keep.py").write_text("")
+    (tmp_path / "src" / "skip_me.py").write_text("")
+    (tmp_path / "src" / "skip_but_keep.py").write_text("")
+    (tmp_path / ".gitignore").write_text("build/\n/src/skip_*.py\n")
+    (tmp_path / "src" / ".ignore").write_text("!skip_but_keep.py\n")
+
+    found = [p.relative_to(tmp_path).as_posix() for p in iter_paths([tmp_path], [".py"])]
+    assert found == ["src/keep.py", "src/skip_but_keep.py"]
+
+    unfiltered = iter_paths([tmp_path], [".py"], use_gitignore=False)
+    assert len(list(unfiltered)) == 4  # node_modules is still pruned
+
+
+def test_iter_blocks_streams_in_walk_order(tmp_path):
+    """Blocks come out in walk order even with many workers and a small window."""
+    from pytools.cat_projects import iter_blocks
+
+    for i in range(50):
+        (tmp_path / f"m{i:02d}.py").write_text(f"X = {i}\n")
+
+    blocks = iter_blocks([tmp_path], workers=2)
+    assert next(blocks).startswith("<m00.py>")
+    rest = list(blocks)
+    assert [b.split(">", 1)[0] for b in rest] == [f"<m{i:02d}.py" for i in range(1, 50)]
+
+
+def test_process_executor_matches_threads(tmp_path):
+    """Chunked process-pool summarising produces the same snapshot as threads."""
+    for i in range(40):
+        (tmp_path / f"m{i:02d}.py").write_text(f"def f{i}(a, b=1):\n    '''Doc {i}.'''\n")
+
+    threaded = make_snapshot([tmp_path], prefix="", summarise=True, executor="thread")
+    processed = make_snapshot(
+        [tmp_path], prefix="", summarise=True, executor="process", workers=2
+    )
+    assert processed == threaded
+    assert "Doc 39." in processed
+
+
+def test_max_tokens_summarises_and_drops_to_fit(tmp_path):
+    """A tight budget keeps the imported module and degrades the rest."""
+    from pytools.snapshot.budget import estimate_tokens
+
+    pkg = tmp_path / "pkg"
+    pkg.mkdir()
+    (pkg / "core.py").write_text("def helper():\n    '''Shared helper.'''\n" + "    x = 1\n" * 40)
+    for name in ("a", "b", "c"):
+        (pkg / f"{name}.py").write_text(
+            f"from pkg.core import helper\n\ndef {name}():\n    '''Use it.'''\n" + "    y = 2\n" * 40
+        )
+
+    full = make_snapshot([tmp_path], prefix="")
+    out = make_snapshot([tmp_path], prefix="", max_tokens=estimate_tokens(full) // 3)
+    assert estimate_tokens(out) <= estimate_tokens(full) // 3
+    assert "<pkg/core.py>" in out
+    assert "x = 1" in out or "Shared helper." in out
+    assert make_snapshot([tmp_path], prefix="", max_tokens=10**6) == full
+
+
+def _git(repo: Path, *args: str) -> None:
+    import subprocess
+
+    subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        check=True,
+        capture_output=True,
+    )
+
+
+def test_since_and_staged_snapshot_only_changes(tmp_path):
+    """--since lists renames/deletions and --staged reads content from the index."""
+    _make_tree(tmp_path)
+    (tmp_path / "old.py").write_text("OLD = 1\n")
+    (tmp_path / "pkg" / "keep.py").write_text("KEEP = 1\n")
+    _git(tmp_path, "init", "-q")
+    _git(tmp_path, "add", "-A")
+    _git(tmp_path, "commit", "-q", "-m", "init")
+
+    _git(tmp_path, "mv", "old.py", "new.py")
+    _git(tmp_path, "rm", "-q", "pkg/b.py")
+    (tmp_path / "pkg" / "a.py").write_text("STAGED = 1\n")
+    _git(tmp_path, "add", "pkg/a.py")
+    (tmp_path / "pkg" / "a.py").write_text("UNSTAGED = 1\n")
+
+    out = make_snapshot([tmp_path], prefix="", since="HEAD")
+    assert "R old.py -> new.py" in out and "D pkg/b.py" in out
+    assert "<pkg/a.py>\nUNSTAGED = 1" in out and "<pkg/b.py>" not in out
+
+    staged = make_snapshot([tmp_path], prefix="", staged=True)
+    assert "<pkg/a.py>\nSTAGED = 1" in staged
+    assert "<new.py>\nOLD = 1" in staged
+
+    _git(tmp_path, "mv", "pkg/keep.py", "pkg/moved.py")
+    _git(tmp_path, "mv", "new.py", "pkg/outside.py")
+    sub = make_snapshot([tmp_path / "pkg"], prefix="", staged=True)
+    assert "R keep.py -> moved.py" in sub and "R ../old.py -> outside.py" in sub
+
+
+def test_binary_files_skipped_and_large_files_excerpted(tmp_path):
+    """NUL-containing files are dropped; oversized files keep head and tail lines."""
+    from pytools.cat_projects import load_text
+
+    (tmp_path / "blob.py").write_bytes(b"\x00\x01\x02")
+    big = "".join(f"line {i}\n" for i in range(10_000))
+    (tmp_path / "big.py").write_text(big)
+
+    text, note = load_text(tmp_path / "big.py", max_bytes=200)
+    assert note == "truncated"
+    assert text.startswith("line 0\n") and text.endswith("line 9999\n")
+    assert "bytes omitted" in text and len(text) < 300
+
+    out = make_snapshot([tmp_path], prefix="", max_file_bytes=200)
+    assert "<blob.py>" not in out and "<big.py>\nline 0" in out
+
+    (tmp_path / "c.py").write_text("C = 1\n")
+    capped = make_snapshot([tmp_path], prefix="", max_total_bytes=1, workers=1)
+    assert "<big.py>" in capped and "<c.py>" not in capped
+
+
+def test_manifest_offsets_allow_seeking_to_a_block(tmp_path):
+    """Manifest records point at exact byte ranges of each block in the output."""
+    import io
+
+    from pytools.cat_projects import write_snapshot
+    from pytools.snapshot.manifest import Manifest, read_block
+
+    src = tmp_path / "src"
+    src.mkdir()
+    _make_tree(src)
+    (src / "pkg" / "ü.py").write_text("S = 'ünïcode'\n")
+
+    manifest = Manifest("snap.txt")
+    buf = io.StringIO()
+    write_snapshot(buf, [src], manifest=manifest, summarise=True)
+    snap = tmp_path / "snap.txt"
+    snap.write_bytes(buf.getvalue().encode("utf-8"))
+
+    record = manifest.files["pkg/ü.py"]
+    assert read_block(snap, record) == "<pkg/ü.py>\nS = 'ünïcode'\n\n</pkg/ü.py>"
+    assert manifest.files["pkg/a.py"]["mode"] == "summary"
+    assert manifest.files["pkg/b.py"]["mode"] == "raw"
+
+
+def test_dedupe_references_first_copy(tmp_path):
+    """Identical files after the first become references to the first path."""
+    body = "".join(f"def f{i}():\n    return {i}\n" for i in range(30))
+    for vendor in ("a", "b", "c"):
+        (tmp_path / vendor).mkdir()
+        (tmp_path / vendor / "six.py").write_text(body)
+
+    out = make_snapshot([tmp_path], prefix="", dedupe=True)
+    assert out.count("return 29") == 1
+    assert "<b/six.py>\n[duplicate of a/six.py]\n</b/six.py>" in out
+    assert "<c/six.py>\n[duplicate of a/six.py]\n</c/six.py>" in out
+    assert make_snapshot([tmp_path], prefix="").count("return 29") == 3
+
+    from pytools.snapshot.profile import SnapshotProfile
+
+    profile = SnapshotProfile()
+    make_snapshot([tmp_path], prefix="", dedupe=True, summarise=True, profile=profile)
+    assert [f.rel for f in profile.files] == ["a/six.py"]  # copies are never rendered
+
+    budgeted = make_snapshot([tmp_path], prefix="", dedupe=True, max_tokens=10**6)
+    assert budgeted.count("return 29") == 1 and "[duplicate of a/six.py]" in budgeted
+
+
+def test_dedupe_does_not_hold_archive_contents(tmp_path):
+    """Archive members are hashed as they stream past, not kept for later."""
+    import os
+    import tarfile
+    import tracemalloc
+
+    from pytools.cat_projects import write_snapshot
+
+    src = tmp_path / "src"
+    src.mkdir()
+    for i in range(40):
+        (src / f"m{i:02}.py").write_text(f"# {i}\n" + "x = 1\n" * (20_000 + i))
+    (src / "z.py").write_text((src / "m00.py").read_text())
+    with tarfile.open(tmp_path / "src.tar", "w") as tf:
+        tf.add(src, arcname=".")
+
+    tracemalloc.start()
+    try:
+        with open(os.devnull, "w", encoding="utf-8") as out:
+            write_snapshot(out, [tmp_path / "src.tar"], prefix="", workers=1, dedupe=True)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < 2_500_000  # the members add up to 4.8 MB
+
+
+def test_profile_records_phases_and_slowest_files(tmp_path):
+    """Profiling captures every rendered file and the per-phase totals."""
+    from pytools.snapshot.profile import SnapshotProfile
+
+    _make_tree(tmp_path)
+    profile = SnapshotProfile()
+    make_snapshot([tmp_path], prefix="", summarise=True, profile=profile)
+    data = profile.to_dict(top=1)
+
+    assert data["files"] == 2
+    assert set(data["phases_s"]) == {"walk", "read", "summarise", "write"}
+    assert len(data["slowest"]) == 1
+    assert data["slowest"][0]["path"] in ("pkg/a.py", "pkg/b.py")
+
+
+def test_profile_flag_leaves_paths_alone(tmp_path, monkeypatch, capsys):
+    """--profile takes no value; the JSON report is written only with --profile-json."""
+    import json
+    import sys
+
+    from pytools.cat_projects import main
+
+    _make_tree(tmp_path)
+    out = tmp_path / "snap.txt"
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("PYTOOLS_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(sys, "argv", ["cat-projects", "--profile", "pkg", "-o", str(out)])
+    assert main() == 0
+    assert "<a.py>" in out.read_text() and not list(tmp_path.glob("*.json"))
+
+    report = tmp_path / "profile.json"
+    monkeypatch.setattr(sys, "argv", ["cat-projects", "pkg", "--profile-json", str(report), "-o", str(out)])
+    assert main() == 0
+    assert json.loads(report.read_text())["files"] == 2
+
+
+def test_watch_daemon_refreshes_only_changed_files(tmp_path):
+    """The watch daemon re-renders edited files and matches a fresh snapshot."""
+    import os
+
+    import pytest
+
+    from pytools.cat_projects import watch_snapshot
+    from pytools.snapshot.watch import fetch_snapshot
+
+    _make_tree(tmp_path)
+    daemon = watch_snapshot([tmp_path], prefix="")
+    assert daemon.refresh() == 2
+    assert daemon.refresh() == 0
+
+    b = tmp_path / "pkg" / "b.py"
+    b.write_text("VALUE = 2\n")
+    os.utime(b, ns=(1, 1))
+    (tmp_path / "pkg" / "c.py").write_text("C = 3\n")
+    assert daemon.refresh() == 2
+    assert daemon.snapshot().decode("utf-8") == make_snapshot([tmp_path], prefix="")
+
+    # Watcher-reported paths are re-checked without walking the tree.
+    (tmp_path / "pkg" / "a.py").write_text("A = 2\n")
+    (tmp_path / "pkg" / "sub").mkdir()
+    (tmp_path / "pkg" / "sub" / "d.py").write_text("D = 4\n")
+    (tmp_path / "pkg" / "0.py").write_text("ZERO = 0\n")
+    (tmp_path / "pkg" / "c.py").unlink()
+    (tmp_path / "notes.txt").write_text("skipped\n")
+    changed = [tmp_path / "pkg" / n for n in ("a.py", "sub/d.py", "0.py", "c.py")] + [tmp_path / "notes.txt"]
+    assert daemon.refresh([str(p) for p in changed]) == 4
+    assert daemon.snapshot().decode("utf-8") == make_snapshot([tmp_path], prefix="")
+
+    for _ in range(2):  # the second server replaces the stale socket of the first
+        server = daemon.serve_socket(tmp_path / "snap.sock")
+        try:
+            assert "VALUE = 2" in fetch_snapshot(tmp_path / "snap.sock")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    with pytest.raises(FileExistsError):
+        daemon.serve_socket(tmp_path / "notes.txt")
+    assert (tmp_path / "notes.txt").read_text() == "skipped\n"
+
+
+def test_inotify_watcher_reports_changed_files(tmp_path):
+    """inotify events name the changed files; directory changes ask for a re-walk."""
+    import pytest
+
+    from pytools.snapshot.watch import InotifyWatcher
+
+    if not InotifyWatcher.available():
+        pytest.skip("inotify is not available")
+    watcher = InotifyWatcher()
+    try:
+        assert watcher.watch(str(tmp_path))
+        (tmp_path / "a.py").write_text("A = 1\n")
+        assert watcher.wait(1.0)
+        assert watcher.changes() == {str(tmp_path / "a.py")}
+        (tmp_path / "pkg").mkdir()
+        assert watcher.wait(1.0)
+        assert watcher.changes() is None
+        assert not watcher.wait(0.0)
+    finally:
+        watcher.close()
+
+
+def test_summarise_other_languages(tmp_path):
+    """Registered summarisers outline JS/TS, Go and shell files."""
+    (tmp_path / "app.ts").write_text(
+        "// Store things.\nexport class Store {\n  get(key: string): number {\n"
+        "    return 1;\n  }\n}\nconst x = '{';\n"
+    )
+    (tmp_path / "main.go").write_text(
+        "package main\n\n// Run starts it.\nfunc Run(addr string) error {\n\treturn nil\n}\n"
+    )
+    (tmp_path / "setup.sh").write_text(
+        "#!/bin/sh\n# Setup script\nexport PATH=/opt/bin\n# Link one file.\nlink() {\n  ln -s \"$1\"\n}\n"
+    )
+    (tmp_path / "notes.txt").write_text("plain\n")
+
+    out = make_snapshot(
+        [tmp_path], prefix="", summarise=True, exts=[".ts", ".go", ".sh", ".txt"]
+    )
+    assert "<app.ts>\n▸ export class Store: Store things.\n• get(key: string): number\n</app.ts>" in out
+    assert "<main.go>\n▸ func Run(addr string) error: Run starts it.\n</main.go>" in out
+    assert "<setup.sh>\n▸ Script: Setup script\n▸ export PATH\n▸ function link: Link one file.\n</setup.sh>" in out
+    assert "<notes.txt>\nplain\n\n</notes.txt>" in out
+
+    (tmp_path / "app.ts").write_text(
+        "export class Base {\n  constructor(a) { super(a); }\n}\n"
+        "export type Point = { x: number };\nexport { Base as Root };\n"
+    )
+    out = make_snapshot([tmp_path], prefix="", summarise=True, exts=[".ts"])
+    assert "• constructor(a)\n" in out and "super(a)" not in out
+    assert "export type Point = { x: number }" in out and "export { Base as Root }" in out
+
+
+def test_gzip_output_streams_snapshot(tmp_path):
+    """A .gz output target is compressed on the fly and round-trips exactly."""
+    import gzip
+
+    from pytools.cat_projects import write_snapshot
+    from pytools.snapshot.output import open_output
+
+    src = tmp_path / "src"
+    src.mkdir()
+    _make_tree(src)
+    target = tmp_path / "snap.txt.gz"
+    with open_output(target) as out:
+        write_snapshot(out, [src], prefix="")
+
+    assert gzip.decompress(target.read_bytes()).decode("utf-8") == make_snapshot([src], prefix="")
+
+
+def test_parallel_walk_matches_serial_order(tmp_path):
+    """Listing directories on a thread pool yields files in the serial order."""
+    from pytools.snapshot.walk import walk_files
+
+    for d in ("b/z", "b/a", "a", "c/d/e"):
+        (tmp_path / d).mkdir(parents=True)
+        for name in ("y.py", "x.py", "skip.txt"):
+            (tmp_path / d / name).write_text("")
+    (tmp_path / ".gitignore").write_text("c/d/\n")
+
+    serial = list(walk_files([tmp_path], [".py"]))
+    assert list(walk_files([tmp_path], [".py"], workers=4)) == serial
+    assert [p.relative_to(tmp_path).as_posix() for p in serial] == [
+        "a/x.py", "a/y.py", "b/a/x.py", "b/a/y.py", "b/z/x.py", "b/z/y.py",
+    ]
+
+
+def test_symbol_index_queries_and_incremental_update(tmp_path):
+    """The symbol index answers defs/refs queries and re-parses only edited files."""
+    import os
+
+    from pytools.cat_projects import index_tree
+    from pytools.snapshot.symbols import SymbolIndex
+
+    src = tmp_path / "src"
+    (src / "pkg").mkdir(parents=True)
+    (src / "pkg" / "store.py").write_text("class Store:\n    def get(self):\n        return 1\n")
+    (src / "pkg" / "app.py").write_text("from pkg.store import Store\n\nStore().get()\n")
+    (src / "pkg" / "other.py").write_text("X = 1\n")
+
+    with SymbolIndex(tmp_path / "symbols.sqlite") as index:
+        assert index_tree([src], index, executor="thread") == (3, 3, 0)
+        assert [(h.path, h.line, h.name, h.kind) for h in index.definitions("Store.get")] == [
+            (str(src / "pkg" / "store.py"), 2, "Store.get", "method")
+        ]
+        refs = index.references("Store")
+        assert {(Path(h.path).name, h.kind) for h in refs} == {("app.py", "import"), ("app.py", "name")}
+
+        (src / "pkg" / "other.py").write_text("from pkg.store import Store\n")
+        os.utime(src / "pkg" / "other.py", ns=(1, 1))
+        (src / "pkg" / "app.py").unlink()
+        assert index_tree([src], index, executor="thread") == (2, 1, 1)
+        assert [Path(h.path).name for h in index.references("Store")] == ["other.py"]
+
+
+def test_import_closure_in_dependency_order(tmp_path):
+    """--closure keeps only reachable modules, dependencies first, with cached edges."""
+    from pytools.snapshot.closure import EdgeCache
+
+    src = tmp_path / "src"
+    (src / "pkg" / "sub").mkdir(parents=True)
+    (src / "main.py").write_text("from pkg.sub import helpers\nimport pkg.models\n")
+    (src / "pkg" / "__init__.py").write_text("")
+    (src / "pkg" / "sub" / "__init__.py").write_text("")
+    (src / "pkg" / "sub" / "helpers.py").write_text("from ..models import Model\n")
+    (src / "pkg" / "models.py").write_text("class Model:\n    pass\n")
+    (src / "pkg" / "unused.py").write_text("X = 1\n")
+
+    def _rels(out):
+        return [line[1:-1] for line in out.splitlines() if line.startswith("<") and not line.startswith("</")]
+
+    with EdgeCache(tmp_path / "edges.sqlite") as cache:
+        out = make_snapshot([src], prefix="", closure=[src / "main.py"], import_cache=cache)
+        assert _rels(out) == [
+            "pkg/__init__.py", "pkg/sub/__init__.py", "pkg/models.py", "pkg/sub/helpers.py", "main.py",
+        ]
+        assert cache.hits == 0
+    with EdgeCache(tmp_path / "edges.sqlite") as cache:
+        assert make_snapshot([src], prefix="", closure=[src / "main.py"], import_cache=cache) == out
+        assert cache.misses == 0
+
+    app = tmp_path / "repo" / "app"
+    (app / "vendor").mkdir(parents=True)
+    (app / "main.py").write_text("import json, logging\nfrom app.util import f\n")
+    (app / "util.py").write_text("def f():\n    pass\n")
+    (app / "vendor" / "json.py").write_text("")
+    (app / "vendor" / "logging.py").write_text("")
+    out = make_snapshot([tmp_path / "repo"], prefix="", closure=[app / "main.py"])
+    assert _rels(out) == ["app/util.py", "app/main.py"]
+    out = make_snapshot([tmp_path], prefix="", closure=[src / "main.py"])
+    assert "<src/pkg/models.py>" in out and "<repo/app/util.py>" not in out
+
+
+def test_minify_strips_comments_and_docstrings(tmp_path):
+    """Minified Python keeps its AST apart from docstrings and leaves strings intact."""
+    import ast
+
+    from pytools.snapshot.minify import minify_python
+
+    src = (
+        '"""Module doc."""\n\n# comment\nclass A:\n    """Only a docstring."""\n\n\n'
+        'def f(x):  # trailing\n    """Doc."""\n    s = """keep\n    # this\n"""\n'
+        '    return (x +\n            1)\n'
+    )
+    out = minify_python(src)
+    assert "#" not in out.replace("# this", "")
+    assert "Doc." not in out and "Module doc" not in out
+    assert out == 'class A:\n ...\ndef f(x):\n s = """keep\n    # this\n"""\n return (x +\n  1)\n'
+    assert ast.dump(ast.parse(out).body[1]) == ast.dump(
+        ast.parse("def f(x):\n    s = 'keep\\n    # this\\n'\n    return x + 1\n").body[0]
+    )
+
+    (tmp_path / "a.py").write_text(src)
+    (tmp_path / "notes.md").write_text("# heading\n")
+    snap = make_snapshot([tmp_path], prefix="", exts=[".py", ".md"], minify=True)
+    assert f"<a.py>\n{out}\n</a.py>" in snap
+    assert "<notes.md>\n# heading\n\n</notes.md>" in snap
+
+
+def test_shards_respect_size_and_keep_directories_together(tmp_path):
+    """Shards stay under the limit, never split a directory that fits, and are indexed."""
+    from pytools.cat_projects import write_shards
+    from pytools.snapshot.shard import load_shard_index, shard_index_path
+
+    src = tmp_path / "src"
+    for d in ("a", "b", "c"):
+        (src / d).mkdir(parents=True)
+        for name in ("x.py", "y.py"):
+            (src / d / name).write_text("#" * 60 + "\n")
+    (src / "big.py").write_text("#" * 500 + "\n")
+
+    output = tmp_path / "snap.txt"
+    written = []
+    writer = write_shards(output, [src], shard_size=300, prefix="", on_shard=written.append)
+    writer.save_index(shard_index_path(output))
+
+    index = load_shard_index(shard_index_path(output))
+    shards = [list(s["files"]) for s in index["shards"]]
+    assert shards == [["big.py"], ["a/x.py", "a/y.py"], ["b/x.py", "b/y.py"], ["c/x.py", "c/y.py"]]
+    assert [p.name for p in written] == [f"snap.00{i}.txt" for i in range(1, 5)]
+    for shard in index["shards"][1:]:
+        assert shard["bytes"] <= 300
+    text = (tmp_path / "snap.002.txt").read_text()
+    record = index["shards"][1]["files"]["a/y.py"]
+    assert text.encode()[record["offset"]:][: record["length"]].decode().startswith("<a/y.py>")
+
+
+def test_snapshot_from_git_revision_and_archives(tmp_path):
+    """git:REPO@REV and tar/zip roots are read without checkout or extraction."""
+    import tarfile
+    import zipfile
+
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _make_tree(repo)
+    _git(repo, "init", "-q")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "init")
+    expected = make_snapshot([repo], prefix="")
+    with tarfile.open(tmp_path / "src.tar.gz", "w:gz") as tf:
+        tf.add(repo / "pkg", arcname="pkg")
+    with zipfile.ZipFile(tmp_path / "src.zip", "w") as zf:
+        zf.write(repo / "pkg" / "a.py", "pkg/a.py")
+        zf.write(repo / "pkg" / "b.py", "pkg/b.py")
+        zf.writestr("README.md", "skipped\n")
+    (repo / "pkg" / "b.py").write_text("VALUE = 2\n")
+
+    assert make_snapshot([Path(f"git:{repo}@HEAD")], prefix="") == expected
+    assert make_snapshot([tmp_path / "src.tar.gz"], prefix="") == expected
+    assert make_snapshot([tmp_path / "src.zip"], prefix="") == expected
+
+    big = "".join(f"line {i}\n" for i in range(100_000))
+    (repo / "big.py").write_text(big)
+    _git(repo, "add", "big.py")
+    _git(repo, "commit", "-q", "-m", "big")
+    with tarfile.open(tmp_path / "big.tar", "w") as tf:
+        tf.add(repo / "big.py", arcname="big.py")
+    with zipfile.ZipFile(tmp_path / "big.zip", "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.write(repo / "big.py", "big.py")
+
+    def big_section(out):
+        return out.split("<big.py>")[1].split("</big.py>")[0]
+
+    local = big_section(make_snapshot([repo], prefix="", max_file_bytes=2000))
+    assert "bytes omitted" in local and "line 99999" in local
+    for root in (f"git:{repo}@HEAD", tmp_path / "big.tar", tmp_path / "big.zip"):
+        out = make_snapshot([Path(root)], prefix="", max_file_bytes=2000, executor="process")
+        assert big_section(out) == local
+
+
+def test_diff_emits_only_changed_blocks(tmp_path):
+    """Snapshots are diffed per block, from manifests or by parsing, and --against matches."""
+    import io
+
+    from pytools.cat_projects import write_snapshot
+    from pytools.snapshot.diff import diff_snapshots, snapshot_hashes
+    from pytools.snapshot.manifest import Manifest, manifest_path
+
+    src = tmp_path / "src"
+    src.mkdir()
+    _make_tree(src)
+    (src / "gone.py").write_text("GONE = 1\n")
+    old = tmp_path / "old.txt"
+    old.write_text(make_snapshot([src], prefix="PROMPT <not-a-block>"))
+
+    (src / "gone.py").unlink()
+    (src / "pkg" / "b.py").write_text("VALUE = 2\n")
+    (src / "new.py").write_text("NEW = 1\n")
+    new = tmp_path / "new.txt"
+    manifest = Manifest(new.name)
+    with new.open("w", newline="") as f:
+        write_snapshot(f, [src], prefix="", manifest=manifest)
+    manifest.save(manifest_path(new))
+
+    expected = (
+        "<new.py>\nNEW = 1\n\n</new.py>\n<pkg/b.py>\nVALUE = 2\n\n</pkg/b.py>\n"
+        "<snapshot-diff>\n1 added, 1 modified, 1 removed\nA new.py\nM pkg/b.py\nD gone.py\n</snapshot-diff>"
+    )
+    for target in (new, tmp_path / "copy.txt"):  # with and without a manifest
+        if target != new:
+            target.write_bytes(new.read_bytes())
+        buf = io.StringIO()
+        diff_snapshots(old, target, buf)
+        assert buf.getvalue() == expected
+
+    buf = io.StringIO()
+    summary = write_snapshot(buf, [src], prefix="", against=snapshot_hashes(old))
+    assert buf.getvalue() == expected and summary.removed == ["gone.py"]
+
+
+def test_near_duplicates_collapse_to_diffs(tmp_path):
+    """Files similar to an earlier one are emitted as a diff against it."""
+    lines = [f"def handler_{i}(request):\n    return request.get('field_{i}')\n" for i in range(20)]
+    (tmp_path / "a_v1.py").write_text("".join(lines))
+    lines[7] = "def handler_7(request):\n    return request.post('field_7')\n"
+    (tmp_path / "b_v2.py").write_text("".join(lines))
+    (tmp_path / "c_other.py").write_text("".join(f"CONSTANT_{i} = {i * i}\n" for i in range(40)))
+
+    out = make_snapshot([tmp_path], prefix="", near_dupes=True)
+    assert "<a_v1.py>\ndef handler_0(request):" in out
+    assert "<b_v2.py>\n[near-duplicate of a_v1.py]\n@@ " in out
+    assert "-    return request.get('field_7')\n+    return request.post('field_7')" in out
+    assert "<c_other.py>\nCONSTANT_0 = 0" in out
+    assert len(out) < len(make_snapshot([tmp_path], prefix="")) * 0.75
+
+
+def test_budget_keeps_references_only_to_files_kept_in_full(tmp_path):
+    """Under --max-tokens, a diff or duplicate reference needs its original in full."""
+    body = "".join(f"def f{i}(x):\n    return x + {i}\n" for i in range(40))
+    (tmp_path / "a.py").write_text(body)
+    (tmp_path / "b.py").write_text(body.replace("x + 7\n", "x - 7\n"))
+
+    out = make_snapshot([tmp_path], prefix="", near_dupes=True, max_tokens=300)
+    assert "[near-duplicate of a.py]" not in out or "<a.py>\ndef f0(x):" in out
+    out = make_snapshot([tmp_path], prefix="", near_dupes=True, max_tokens=10**6)
+    assert "<a.py>\ndef f0(x):" in out and "<b.py>\n[near-duplicate of a.py]" in out
+
+    (tmp_path / "b.py").write_text(body)
+    out = make_snapshot([tmp_path], prefix="", dedupe=True, summarise=False, max_tokens=300)
+    assert "[duplicate of a.py]" not in out or "<a.py>\ndef f0(x):" in out
+
+
+def test_symbol_selectors_emit_exact_slices(tmp_path):
+    """path::Class.method selectors emit only those symbols under their class headers."""
+    import pytest
+
+    from pytools.snapshot.selectors import PositionCache, SelectorError
+
+    mod = tmp_path / "mod.py"
+    mod.write_text(
+        "import os\n\n\n@register\nclass Registry(Base):\n    \"\"\"Doc.\"\"\"\n\n"
+        "    def get(self, key):\n        return self._items[key]\n\n"
+        "    def put(self, key, value):\n        self._items[key] = value\n\n\n"
+        "def helper():\n    return 1\n"
+    )
+    cache = PositionCache(tmp_path / "positions.sqlite")
+    sel = [f"{mod}::Registry.get", f"{mod}::*"]
+    out = make_snapshot([], prefix="", selectors=sel, position_cache=cache)
+    tag = f"{mod.as_posix().lstrip('/')}::Registry.get"
+    assert (
+        f"<{tag}>\n@register\nclass Registry(Base):\n"
+        "    def get(self, key):\n        return self._items[key]\n"
+        f"</{tag}>"
+    ) in out
+    assert "import os" not in out and out.count("def put") == 1 and "def helper():" in out
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    with pytest.raises(SelectorError):
+        make_snapshot([], prefix="", selectors=[f"{mod}::Missing"], position_cache=cache)
+    cache.close()
+
+    props = tmp_path / "props.py"
+    props.write_text(
+        "class A:\n    @property\n    def x(self):\n        return 1\n\n"
+        "    def y(self):\n        return 2\n"
+    )
+    out = make_snapshot([], prefix="", selectors=[f"{props}::A.y", f"{props}::A.x"])
+    assert "class A:\n    def y(self):\n        return 2\n" in out
+    assert "class A:\n    @property\n    def x(self):" in out and out.count("@property") == 1
+
+
+def test_query_ranks_files_with_bm25(tmp_path):
+    """--query keeps the top files by BM25 and updates the index incrementally."""
+    from pytools.cat_projects import update_search_index
+    from pytools.snapshot.search import SearchIndex
+
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "tools.py").write_text(
+        "def parse_call_arguments(request):\n    # MCP tools/call argument parsing\n    return request\n"
+    )
+    (src / "server.py").write_text("class McpServer:\n    def serve(self):\n        pass\n")
+    (src / "util.py").write_text("def format_bytes(n):\n    return str(n)\n")
+
+    index = SearchIndex(tmp_path / "search.sqlite")
+    out = make_snapshot(
+        [src], prefix="", query="fix MCP tools/call argument parsing", top=2, search_index=index
+    )
+    assert out.startswith("<query-results>\nquery: fix MCP tools/call argument parsing\n")
+    assert out.index("<tools.py>") < out.index("<server.py>") and "<util.py>" not in out
+
+    files = [src / "tools.py", src / "server.py"]
+    assert update_search_index(files, [src], index) == (0, 1)
+    (src / "server.py").write_text("VALUE = 1\n")
+    assert update_search_index(files, [src], index) == (1, 0)
+    assert [p.name for _, p in index.rank("mcp server")] == ["tools.py"]
+    index.close()
+
+
+def test_data_files_are_sampled_not_dumped(tmp_path):
+    """Large JSON/JSONL/CSV files become head + schema; notebooks lose their outputs."""
+    import json
+
+    (tmp_path / "rows.jsonl").write_text(
+        "".join(json.dumps({"id": i, "name": f"n{i:05}", "ok": i % 2 == 0}) + "\n" for i in range(20000))
+    )
+    (tmp_path / "table.csv").write_text(
+        "id,score,label\n" + "".join(f"{i},{i / 4},row{i:05}\n" for i in range(20000))
+    )
+    (tmp_path / "wrapped.json").write_text(json.dumps({"version": 2, "data": [{"k": i} for i in range(20000)]}))
+    (tmp_path / "small.json").write_text('{"small": true}')
+    notebook = {
+        "cells": [
+            {"cell_type": "markdown", "source": ["# Title\n"]},
+            {"cell_type": "code", "source": ["x = 1\n", "x"], "outputs": [{"text": "SECRET OUTPUT"}]},
+        ],
+        "metadata": {},
+    }
+    (tmp_path / "nb.ipynb").write_text(json.dumps(notebook))
+
+    out = make_snapshot([tmp_path], exts=[".json", ".jsonl", ".csv", ".ipynb"], prefix="", sample_rows=3)
+    assert "<rows.jsonl>\n[jsonl sample: " in out and "records (estimated)]" in out
+    assert "schema:\n  id: int\n  name: str\n  ok: bool\nfirst 3 records:\n" in out
+    assert "n00003" not in out and "row00003" not in out
+    assert "columns:\n  id: int\n  score: float\n  label: str\nfirst 3 rows:\nid,score,label\n0,0.0,row00000" in out
+    assert "records under key 'data', other keys: version]" in out
+    assert '<small.json>\n{"small": true}\n</small.json>' in out
+    assert "# %% [code]\nx = 1\nx" in out and "SECRET OUTPUT" not in out
+
+    raw = make_snapshot([tmp_path], exts=[".jsonl"], prefix="", sample_rows=0)
+    assert "n19999" in raw
+
+
+def test_block_cache_survives_a_concurrent_writer(tmp_path, monkeypatch):
+    """A run that finds the cache write-locked reads what it can and continues uncached."""
+    import sqlite3
+
+    from pytools.snapshot import cache as cache_module
+
+    src = tmp_path / "src"
+    src.mkdir()
+    _make_tree(src)
+    db = tmp_path / "cache.sqlite"
+    with BlockCache(db) as cache:
+        expected = make_snapshot([src], prefix="", cache=cache)
+    (src / "pkg" / "b.py").write_text("VALUE = 22\n")
+
+    monkeypatch.setattr(cache_module, "BUSY_TIMEOUT_S", 0.05)
+    other = sqlite3.connect(str(db))
+    other.execute("BEGIN IMMEDIATE")  # another run holding the write lock
+    with BlockCache(db) as cache:
+        out = make_snapshot([src], prefix="", cache=cache)
+        assert cache.hits == 1 and cache.error is not None
+    assert "VALUE = 22" in out and out.split("<pkg/b.py>")[0] == expected.split("<pkg/b.py>")[0]
+    other.rollback()
+    other.close()
+
+
+def test_malformed_and_oversized_notebooks_fall_back_to_text(tmp_path):
+    """A notebook that is not a JSON object, or is above the size cap, is emitted as text."""
+    import json
+
+    (tmp_path / "odd.ipynb").write_text('["a"]')
+    cells = [{"cell_type": "code", "source": f"x{i} = {i}\n"} for i in range(4000)]
+    (tmp_path / "big.ipynb").write_text(json.dumps({"cells": cells, "metadata": {}}))
+
+    for options in ({}, {"max_tokens": 10**6}):
+        out = make_snapshot(
+            [tmp_path], exts=[".ipynb"], prefix="", max_file_bytes=20_000, **options
+        )
+        assert '<odd.ipynb>\n["a"]\n</odd.ipynb>' in out
+        assert "x3999 = 3999" in out and "x2000 = 2000" not in out
+        assert "[notebook:" not in out